@@ -6,7 +6,7 @@ import json
 from typing import Any
 
 from flask import Flask, flash, jsonify, redirect, render_template, request, url_for
-from sqlalchemy import func
+from sqlalchemy import and_, func
 from sqlalchemy.orm import joinedload, selectinload
 
 from crawler import (
@@ -14,9 +14,12 @@ from crawler import (
     parse_snapshot,
     request_stop_task,
     run_task,
+    snapshot_blob_refs,
+    sweep_snapshot_blobs,
 )
 from email_utils import (
     NotificationConfigError,
+    close_smtp_connections,
     send_dingtalk_message,
     send_email,
 )
@@ -36,8 +39,15 @@ from models import (
 )
 from scheduler import MonitorScheduler
 from logging_utils import configure_logging
-from time_utils import format_local_datetime, get_local_timezone, to_local
+from time_utils import format_local_datetime, get_local_timezone, parse_iso_datetime, to_local
 from proxy_service import proxy_manager
+from query_cache import (
+    CONTENT_CATEGORIES_REGION,
+    NOTIFICATION_SETTINGS_REGION,
+    WEBSITES_REGION,
+    FromCache,
+    query_cache,
+)
 
 configure_logging()
 
@@ -102,6 +112,34 @@ def record_notification_log(
     session.commit()
 
 
+def _load_website_choices(session: Session) -> list[Any]:
+    """Return ``(id, name, interval_minutes)`` rows used by selection widgets.
+
+    Plain column rows keep partial ``Website`` instances out of the session's
+    identity map, where later attribute access would trigger deferred loads.
+    """
+
+    return (
+        session.query(Website.id, Website.name, Website.interval_minutes)
+        .options(FromCache(WEBSITES_REGION, "choices"))
+        .all()
+    )
+
+
+def _load_content_categories(session: Session) -> list[ContentCategory]:
+    """Return all categories with their contents, served from the lookup cache."""
+
+    return (
+        session.query(ContentCategory)
+        .options(
+            selectinload(ContentCategory.contents),
+            FromCache(CONTENT_CATEGORIES_REGION, "with_contents"),
+        )
+        .order_by(ContentCategory.name)
+        .all()
+    )
+
+
 def _serialize_datetime(value: datetime | None) -> str | None:
     if value is None:
         return None
@@ -332,10 +370,13 @@ def clear_website_snapshot(website_id: int) -> Any:
             flash("未找到网站", "danger")
             return redirect(url_for("list_websites"))
 
+        released_blobs = snapshot_blob_refs(website.last_snapshot)
         website.last_snapshot = None
+        website.snapshot_digest = None
         website.last_fetched_at = None
         session.add(website)
         session.commit()
+        sweep_snapshot_blobs(session, released_blobs)
         flash("已清空网站快照", "success")
         return redirect(url_for("list_websites"))
     finally:
@@ -386,6 +427,7 @@ def create_website() -> Any:
             )
             session.add(website)
             session.commit()
+            query_cache.invalidate(WEBSITES_REGION)
             flash("网站配置已保存", "success")
             return redirect(url_for("list_websites"))
     return render_template("websites/form.html", website=None)
@@ -431,6 +473,7 @@ def edit_website(website_id: int) -> Any:
         website.api_detail_url_base = request.form.get("api_detail_url_base", "").strip() or None
         session.add(website)
         session.commit()
+        query_cache.invalidate(WEBSITES_REGION)
         flash("网站信息已更新", "success")
         return redirect(url_for("list_websites"))
     return render_template("websites/form.html", website=website)
@@ -441,8 +484,11 @@ def delete_website(website_id: int) -> Any:
     session = SessionLocal()
     website = session.get(Website, website_id)
     if website:
+        released_blobs = snapshot_blob_refs(website.last_snapshot)
         session.delete(website)
         session.commit()
+        sweep_snapshot_blobs(session, released_blobs)
+        query_cache.invalidate(WEBSITES_REGION)
         flash("网站已删除", "success")
     return redirect(url_for("list_websites"))
 
@@ -450,12 +496,7 @@ def delete_website(website_id: int) -> Any:
 @app.route("/contents")
 def list_contents() -> Any:
     session = SessionLocal()
-    categories = (
-        session.query(ContentCategory)
-        .options(selectinload(ContentCategory.contents))
-        .order_by(ContentCategory.name)
-        .all()
-    )
+    categories = _load_content_categories(session)
     total_count = session.query(WatchContent).count()
     selected_category_id = request.args.get("category_id", type=int)
     selected_category = None
@@ -498,6 +539,7 @@ def create_content_category() -> Any:
     session.add(category)
     try:
         session.commit()
+        query_cache.invalidate(CONTENT_CATEGORIES_REGION)
         flash("分类已创建", "success")
     except Exception:  # noqa: BLE001
         session.rollback()
@@ -519,6 +561,7 @@ def delete_content_category(category_id: int) -> Any:
 
     session.delete(category)
     session.commit()
+    query_cache.invalidate(CONTENT_CATEGORIES_REGION)
     flash("分类已删除", "success")
     return redirect(url_for("list_contents"))
 
@@ -564,6 +607,7 @@ def bulk_edit_category_contents(category_id: int) -> Any:
 
         try:
             session.commit()
+            query_cache.invalidate(CONTENT_CATEGORIES_REGION)
             flash("分类关注内容已更新", "success")
             return redirect(url_for("list_contents", category_id=category.id))
         except Exception:  # noqa: BLE001
@@ -582,12 +626,7 @@ def bulk_edit_category_contents(category_id: int) -> Any:
 @app.route("/contents/new", methods=["GET", "POST"])
 def create_content() -> Any:
     session = SessionLocal()
-    categories = (
-        session.query(ContentCategory)
-        .options(selectinload(ContentCategory.contents))
-        .order_by(ContentCategory.name)
-        .all()
-    )
+    categories = _load_content_categories(session)
     selected_category_id = request.args.get("category_id", type=int)
 
     if request.method == "POST":
@@ -608,6 +647,7 @@ def create_content() -> Any:
                 session.add(content)
                 try:
                     session.commit()
+                    query_cache.invalidate(CONTENT_CATEGORIES_REGION)
                     flash("关注内容已添加", "success")
                     return redirect(url_for("list_contents", category_id=category.id))
                 except Exception:  # noqa: BLE001
@@ -630,6 +670,7 @@ def delete_content(content_id: int) -> Any:
     if content:
         session.delete(content)
         session.commit()
+        query_cache.invalidate(CONTENT_CATEGORIES_REGION)
         flash("关注内容已删除", "success")
     return redirect(url_for("list_contents", category_id=category_id))
 
@@ -833,6 +874,8 @@ def manage_notifications() -> Any:
                     setting.smtp_use_tls = smtp_use_tls
                     session.add(setting)
                     session.commit()
+                    query_cache.invalidate(NOTIFICATION_SETTINGS_REGION)
+                    close_smtp_connections()
                     flash("SMTP配置已更新", "success")
                     return redirect(url_for("manage_notifications"))
             elif config_type == "dingtalk":
@@ -844,6 +887,7 @@ def manage_notifications() -> Any:
                     setting.webhook_url = webhook_url
                     session.add(setting)
                     session.commit()
+                    query_cache.invalidate(NOTIFICATION_SETTINGS_REGION)
                     flash("钉钉配置已更新", "success")
                     return redirect(url_for("manage_notifications"))
 
@@ -917,36 +961,62 @@ def delete_notification_logs() -> Any:
 def list_tasks() -> Any:
     session = SessionLocal()
     try:
-        tasks = (
-            session.query(MonitorTask)
+        def _ranked_logs(name: str, *criteria: Any) -> Any:
+            return (
+                session.query(
+                    CrawlLog.task_id.label("task_id"),
+                    CrawlLog.status.label("status"),
+                    CrawlLog.run_finished_at.label("run_finished_at"),
+                    func.row_number()
+                    .over(
+                        partition_by=CrawlLog.task_id,
+                        order_by=(CrawlLog.run_started_at.desc(), CrawlLog.id.desc()),
+                    )
+                    .label("position"),
+                )
+                .filter(*criteria)
+                .cte(name)
+            )
+
+        latest_logs = _ranked_logs("latest_logs")
+        finished_logs = _ranked_logs("finished_logs", CrawlLog.run_finished_at.isnot(None))
+        rows = (
+            session.query(
+                MonitorTask,
+                latest_logs.c.status,
+                latest_logs.c.run_finished_at,
+                finished_logs.c.status,
+                finished_logs.c.run_finished_at,
+            )
+            .outerjoin(
+                latest_logs,
+                and_(latest_logs.c.task_id == MonitorTask.id, latest_logs.c.position == 1),
+            )
+            .outerjoin(
+                finished_logs,
+                and_(finished_logs.c.task_id == MonitorTask.id, finished_logs.c.position == 1),
+            )
             .options(
                 selectinload(MonitorTask.watch_contents).selectinload(WatchContent.category),
                 selectinload(MonitorTask.website),
-                selectinload(MonitorTask.logs),
             )
             .order_by(MonitorTask.created_at.desc())
             .all()
         )
-        websites = session.query(Website).all()
+        websites = _load_website_choices(session)
         local_timezone = get_local_timezone()
+        now_local = datetime.now(local_timezone)
         task_rows: list[dict[str, Any]] = []
 
-        for task in tasks:
+        for task, latest_status, latest_finished_at, finished_status, finished_at in rows:
             website = task.website
             interval = None
             if website and website.interval_minutes:
                 interval = timedelta(minutes=website.interval_minutes)
 
-            now_local = datetime.now(local_timezone)
-            latest_log = task.logs[0] if task.logs else None
-            is_running = bool(
-                latest_log and latest_log.status == "running" and latest_log.run_finished_at is None
-            )
+            is_running = latest_status == "running" and latest_finished_at is None
 
-            last_finished_log = next((log for log in task.logs if log.run_finished_at), None)
-            last_run_time = task.last_run_at
-            if last_finished_log and last_finished_log.run_finished_at:
-                last_run_time = last_finished_log.run_finished_at
+            last_run_time = finished_at or task.last_run_at
 
             next_run_at = None
             if task.is_active and interval:
@@ -962,8 +1032,8 @@ def list_tasks() -> Any:
             if next_run_at and next_run_at < now_local:
                 next_run_at = now_local
 
-            if last_finished_log:
-                last_result_status = last_finished_log.status
+            if finished_at is not None:
+                last_result_status = finished_status
             elif task.last_status:
                 last_result_status = task.last_status
             else:
@@ -998,13 +1068,8 @@ def list_tasks() -> Any:
 @app.route("/tasks/new", methods=["GET", "POST"])
 def create_task() -> Any:
     session = SessionLocal()
-    websites = session.query(Website).all()
-    categories = (
-        session.query(ContentCategory)
-        .options(selectinload(ContentCategory.contents))
-        .order_by(ContentCategory.name)
-        .all()
-    )
+    websites = _load_website_choices(session)
+    categories = _load_content_categories(session)
     has_contents = any(category.contents for category in categories)
     form_data = {
         "name": "",
@@ -1069,13 +1134,8 @@ def edit_task(task_id: int) -> Any:
         flash("未找到任务", "danger")
         return redirect(url_for("list_tasks"))
 
-    websites = session.query(Website).all()
-    categories = (
-        session.query(ContentCategory)
-        .options(selectinload(ContentCategory.contents))
-        .order_by(ContentCategory.name)
-        .all()
-    )
+    websites = _load_website_choices(session)
+    categories = _load_content_categories(session)
     has_contents = any(category.contents for category in categories)
 
     selected_content_ids: set[int] = {content.id for content in task.watch_contents}
@@ -1340,7 +1400,7 @@ def bulk_delete_task_logs(task_id: int) -> Any:
         return redirect(url_for("view_task", task_id=task_id))
 
     try:
-        cutoff_dt = datetime.fromisoformat(cutoff_raw)
+        cutoff_dt = parse_iso_datetime(cutoff_raw)
     except ValueError:
         flash("时间格式不正确，请重新选择", "warning")
         if page and page > 1:
@@ -1420,14 +1480,14 @@ def list_results() -> Any:
 
     if start_date_raw:
         try:
-            start_dt = datetime.fromisoformat(start_date_raw)
+            start_dt = parse_iso_datetime(start_date_raw)
             query = query.filter(CrawlLog.run_started_at >= start_dt)
         except ValueError:
             flash("开始日期格式不正确", "warning")
             start_date = ""
     if end_date_raw:
         try:
-            end_dt = datetime.fromisoformat(end_date_raw)
+            end_dt = parse_iso_datetime(end_date_raw)
             query = query.filter(CrawlLog.run_started_at <= end_dt)
         except ValueError:
             flash("结束日期格式不正确", "warning")
@@ -1435,7 +1495,7 @@ def list_results() -> Any:
 
     query = query.order_by(CrawlLog.run_started_at.desc())
 
-    page = int(request.args.get("page", "1") or 1)
+    page = max(request.args.get("page", 1, type=int) or 1, 1)
     per_page = 10
     total = query.count()
     logs = (
@@ -1451,7 +1511,7 @@ def list_results() -> Any:
     total_pages = (total + per_page - 1) // per_page
 
     tasks = session.query(MonitorTask).all()
-    websites = session.query(Website).all()
+    websites = _load_website_choices(session)
 
     status_choices = {
         "running": "执行中",
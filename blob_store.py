@@ -0,0 +1,102 @@
+"""Content-addressed file store for snapshot page bodies.
+
+Blobs are shared by every snapshot that stores the same body, so they are
+never deleted on behalf of one snapshot; :func:`sweep_blobs` removes the ones
+no stored snapshot references any more.
+"""
+from __future__ import annotations
+
+import hashlib
+import logging
+import os
+import tempfile
+import time
+from pathlib import Path
+from typing import Iterable
+
+from models import compress_bytes, decompress_bytes
+
+LOGGER = logging.getLogger(__name__)
+
+__all__ = ["BLOB_DIR", "BLOB_GC_GRACE_SECONDS", "blob_digest", "get_blob", "put_blob", "sweep_blobs"]
+
+BLOB_DIR = Path(os.getenv("SNAPSHOT_BLOB_DIR", "snapshot_blobs"))
+# Unreferenced blobs younger than this survive a sweep; it must outlast the
+# longest task run between storing a body and committing its snapshot.
+BLOB_GC_GRACE_SECONDS = 3600.0
+
+
+def blob_digest(data: bytes) -> str:
+    return hashlib.blake2b(data, digest_size=20).hexdigest()
+
+
+def _blob_path(digest: str) -> Path:
+    return BLOB_DIR / digest[:2] / digest
+
+
+def put_blob(data: bytes) -> str:
+    """Store ``data`` compressed under its digest and return the digest.
+
+    Identical bodies share one file, across websites too, so rewriting an
+    unchanged page is free. Reusing a file refreshes its mtime, which keeps it
+    out of :func:`sweep_blobs` until the caller has committed its reference.
+    """
+
+    digest = blob_digest(data)
+    path = _blob_path(digest)
+    try:
+        os.utime(path)
+        return digest
+    except FileNotFoundError:
+        pass
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "wb") as handle:
+            handle.write(compress_bytes(data))
+        os.replace(tmp_name, path)
+    except BaseException:
+        Path(tmp_name).unlink(missing_ok=True)
+        raise
+    return digest
+
+
+def get_blob(digest: str) -> bytes | None:
+    """Return the stored bytes for ``digest`` or ``None`` when it is missing."""
+
+    try:
+        data = _blob_path(digest).read_bytes()
+    except FileNotFoundError:
+        return None
+    return decompress_bytes(data)
+
+
+def sweep_blobs(live: set[str], candidates: Iterable[str] | None = None) -> int:
+    """Delete blobs outside ``live`` and return how many were removed.
+
+    Only ``candidates`` are considered when given, otherwise the whole store.
+    Blobs written or reused within :data:`BLOB_GC_GRACE_SECONDS` are kept, so a
+    run that stored a body but has not committed its snapshot yet keeps it.
+    Stale temporary files from interrupted writes are removed as well.
+    """
+
+    if candidates is None:
+        paths = [path for path in BLOB_DIR.glob("*/*") if path.is_file()]
+    else:
+        paths = [_blob_path(digest) for digest in candidates]
+    cutoff = time.time() - BLOB_GC_GRACE_SECONDS
+    removed = 0
+    for path in paths:
+        if path.name in live:
+            continue
+        try:
+            if path.stat().st_mtime > cutoff:
+                continue
+            path.unlink()
+        except FileNotFoundError:
+            continue
+        except OSError:
+            LOGGER.warning("删除快照文件 %s 失败", path.name, exc_info=True)
+            continue
+        removed += 1
+    return removed
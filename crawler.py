@@ -1,18 +1,25 @@
 from __future__ import annotations
 
+import atexit
+import hashlib
 import json
 import logging
+import queue
 import re
 import threading
 import time
-from collections import Counter, OrderedDict
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from functools import lru_cache
 from html import escape as html_escape
-from typing import Any, Callable, Iterable, List, Sequence
+from http.cookiejar import DefaultCookiePolicy
+from itertools import chain
+from typing import Any, Callable, Iterable, Iterator, List, Sequence
 from urllib.parse import urljoin, urlsplit
 
 import requests
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, SoupStrainer
 
 try:  # noqa: SIM105
     from lxml import etree, html as lxml_html  # type: ignore import-not-found
@@ -20,8 +27,38 @@ except ImportError:  # pragma: no cover - optional dependency
     etree = None  # type: ignore[assignment]
     lxml_html = None  # type: ignore[assignment]
 
+# BeautifulSoup tree builder; the C-based lxml parser is much faster than the
+# pure-Python "html.parser" and is used whenever it is installed.
+HTML_PARSER = "lxml" if lxml_html is not None else "html.parser"
+
+try:  # noqa: SIM105
+    import orjson  # type: ignore import-not-found
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None  # type: ignore[assignment]
+
+try:  # noqa: SIM105
+    from selectolax.lexbor import LexborHTMLParser  # type: ignore import-not-found
+except ImportError:  # pragma: no cover - optional dependency
+    LexborHTMLParser = None  # type: ignore[assignment,misc]
+
+try:  # noqa: SIM105
+    import ahocorasick  # type: ignore import-not-found
+except ImportError:  # pragma: no cover - optional dependency
+    ahocorasick = None  # type: ignore[assignment]
+
+try:  # noqa: SIM105
+    import numpy as np  # type: ignore import-not-found
+except ImportError:  # pragma: no cover - optional dependency
+    np = None  # type: ignore[assignment]
+
+# Restrict BeautifulSoup tree construction to the nodes a helper actually reads.
+_LINK_STRAINER = SoupStrainer("a", href=True)
+_IMAGE_STRAINER = SoupStrainer("img")
+
 from database import SessionLocal
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, joinedload
+from blob_store import get_blob, put_blob, sweep_blobs
+from embedding_store import load_content_vectors
 from email_utils import NotificationConfigError, send_dingtalk_message, send_email
 from models import (
     CrawlLog,
@@ -33,11 +70,20 @@ from models import (
     Website,
 )
 
-from nlp import similarity
+from nlp import similarity, similarity_matrix
 from proxy_service import proxy_manager
 from request_profiles import get_profile_headers
 
 SIMILARITY_THRESHOLD = 0.6
+# Maximum number of subpages fetched at the same time within one task run.
+SUBPAGE_FETCH_CONCURRENCY = 8
+# Buffered log details are written once this many are pending or this many
+# seconds have passed, so the live log view keeps updating during long runs.
+DETAIL_FLUSH_BATCH_SIZE = 50
+DETAIL_FLUSH_INTERVAL = 2.0
+# Bodies larger than this are abandoned rather than buffered and decoded; no
+# policy page or JSON listing comes close, but mislinked downloads do.
+MAX_RESPONSE_BYTES = 16 * 1024 * 1024
 LOGGER = logging.getLogger(__name__)
 _PLAYWRIGHT_IMPORT_FAILED = False
 _API_TEMPLATE_PATTERN = re.compile(r"\{\s*([^{}]+?)\s*\}")
@@ -99,40 +145,130 @@ def _normalize_whitespace(text: str) -> str:
     return " ".join(text.split())
 
 
+_BOILERPLATE_TAGS = ("script", "style", "noscript", "nav", "aside", "footer")
+_BOILERPLATE_KEYWORDS = ("menu", "nav", "breadcrumb", "pagination", "footer")
+_BOILERPLATE_ROLES = ("navigation", "contentinfo", "menubar")
+# Class, id and ARIA role filters shared by the lexbor and BeautifulSoup paths.
+_BOILERPLATE_SELECTOR = ",".join(
+    [f'[class*="{keyword}" i],[id*="{keyword}" i]' for keyword in _BOILERPLATE_KEYWORDS]
+    + [f'[role="{role}"]' for role in _BOILERPLATE_ROLES]
+)
+
+
+def _make_soup(html: str, parse_only: SoupStrainer | None = None) -> BeautifulSoup:
+    """Build a BeautifulSoup tree with :data:`HTML_PARSER`."""
+
+    return BeautifulSoup(html, HTML_PARSER, parse_only=parse_only)
+
+
+def _parse_html(html: str) -> Any:
+    """Parse ``html`` once with the fastest available backend.
+
+    The returned tree is shared by the ``*_from_tree`` helpers. Title and body
+    text extraction remove nodes from the tree, so read links first.
+    """
+
+    if LexborHTMLParser is not None:
+        return LexborHTMLParser(html)
+    return _make_soup(html)
+
+
+def _body_text_from_lexbor(tree: Any) -> str:
+    body = tree.body or tree.root
+    if body is None:
+        return ""
+    for node in body.css(",".join(_BOILERPLATE_TAGS)):
+        node.decompose()
+    for node in body.css(_BOILERPLATE_SELECTOR):
+        node.decompose()
+    return _normalize_whitespace(body.text(separator=" ", strip=True))
+
+
+def _body_text_from_soup(soup: BeautifulSoup) -> str:
+    body = soup.body or soup
+    for tag in body.find_all(list(_BOILERPLATE_TAGS)):
+        tag.decompose()
+    for tag in body.select(_BOILERPLATE_SELECTOR):
+        if not tag.decomposed:
+            tag.decompose()
+    text = body.get_text(" ", strip=True)
+    return _normalize_whitespace(text)
+
+
+def _body_text_from_tree(tree: Any) -> str:
+    if isinstance(tree, BeautifulSoup):
+        return _body_text_from_soup(tree)
+    return _body_text_from_lexbor(tree)
+
+
 def extract_body_text(html: str | None) -> str:
     """Return a flattened body text similar to ``$("body")[0].innerText``."""
 
     if not isinstance(html, str):
         return ""
+    return _body_text_from_tree(_parse_html(html))
 
-    soup = BeautifulSoup(html, "html.parser")
-    body = soup.body or soup
-    for tag in body.find_all(["script", "style", "noscript", "nav", "aside", "footer"]):
-        tag.decompose()
-    keywords = ("menu", "nav", "breadcrumb", "pagination", "footer")
 
-    def _contains_keyword(value: str | list[str] | None) -> bool:
-        if not value:
-            return False
-        if isinstance(value, str):
-            candidates = value.split()
-        else:
-            candidates = [item for item in value if isinstance(item, str)]
-        lowered = [candidate.lower() for candidate in candidates]
-        return any(any(keyword in item for keyword in keywords) for item in lowered)
+def _json_dumps(payload: Any) -> str:
+    """Serialize snapshot payloads, preferring the much faster orjson encoder."""
+
+    if orjson is not None:
+        try:
+            return orjson.dumps(payload).decode("utf-8")
+        except TypeError:  # e.g. integers beyond 64 bits or non-string keys in API data
+            pass
+    return json.dumps(payload, ensure_ascii=False)
+
+
+_LONG_DIGITS_RE = re.compile(r"\d{19,}")
+
+
+def _json_loads(text: str) -> Any:
+    """Parse snapshots and API responses, preferring orjson.
+
+    orjson silently turns integers beyond 64 bits into floats, so documents
+    containing a run of 19+ digits are left to :mod:`json`. Raises
+    :class:`json.JSONDecodeError` for invalid input with either backend.
+    """
+
+    if orjson is not None and not _LONG_DIGITS_RE.search(text):
+        try:
+            return orjson.loads(text)
+        except orjson.JSONDecodeError:
+            # orjson is stricter (e.g. lone surrogates); let json decide.
+            pass
+    return json.loads(text)
+
+
+_FINGERPRINT_KEYS = ("main_hash", "link_hashes", "fingerprint_scope")
+
+
+def _html_digest(html: str) -> str:
+    return hashlib.blake2b(html.encode("utf-8"), digest_size=16).hexdigest()
 
-    for tag in body.find_all(class_=_contains_keyword):
-        tag.decompose()
-    for tag in body.find_all(id=lambda value: isinstance(value, str) and any(keyword in value.lower() for keyword in keywords)):
-        tag.decompose()
-    for tag in body.find_all(attrs={"role": ["navigation", "contentinfo", "menubar"]}):
-        tag.decompose()
-    text = body.get_text(" ", strip=True)
-    return _normalize_whitespace(text)
+
+def _link_hash(url: str) -> int:
+    # Signed 64-bit integers survive every JSON encoder unchanged.
+    digest = hashlib.blake2b(url.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big", signed=True)
+
+
+def _fingerprint_scope(website: Website) -> str:
+    """Identify the settings a stored main-page fingerprint was computed with."""
+
+    parts = (
+        website.url,
+        website.content_area_selector_config or "",
+        website.title_selector_config or "",
+        website.content_selector_config or "",
+    )
+    return _html_digest("\n".join(parts))
 
 
 def parse_snapshot(
     snapshot: str | None,
+    titles: bool = True,
+    load_blobs: bool = True,
 ) -> tuple[str | None, list[dict[str, str | None]], str | None, str | None]:
     """Parse a stored snapshot payload.
 
@@ -141,15 +277,95 @@ def parse_snapshot(
     entry is a mapping with ``url``, ``html``, optional ``title`` and ``text``
     keys. The helper is backward-compatible with legacy snapshots that stored
     the main HTML as a plain string.
+
+    Titles missing from the payload are derived from the stored HTML, which
+    costs a full parse per page; pass ``titles=False`` when they are not used.
+    Subpage bodies kept in the blob store are read back unless ``load_blobs``
+    is false, in which case those entries carry ``html=None``.
     """
 
+    return _load_snapshot(snapshot, titles=titles, load_blobs=load_blobs)[0]
+
+
+def _load_snapshot(
+    snapshot: str | None,
+    titles: bool = True,
+    load_blobs: bool = True,
+) -> tuple[
+    tuple[str | None, list[dict[str, str | None]], str | None, str | None],
+    dict[str, Any],
+]:
+    """Return :func:`parse_snapshot`'s tuple and the stored change fingerprint."""
+
     if not snapshot:
-        return None, [], None, None
+        return (None, [], None, None), {}
+
+    try:
+        data = _json_loads(snapshot)
+    except json.JSONDecodeError:
+        return (snapshot, [], None, extract_body_text(snapshot)), {}
+
+    fingerprint: dict[str, Any] = {}
+    if isinstance(data, dict):
+        fingerprint = {key: data[key] for key in _FINGERPRINT_KEYS if key in data}
+    return _parse_snapshot_data(snapshot, data, titles, load_blobs), fingerprint
+
 
+def snapshot_blob_refs(snapshot: str | None) -> set[str]:
+    """Return the blob digests referenced by a stored snapshot payload."""
+
+    if not snapshot:
+        return set()
     try:
-        data = json.loads(snapshot)
+        data = _json_loads(snapshot)
     except json.JSONDecodeError:
-        return snapshot, [], None, extract_body_text(snapshot)
+        return set()
+    subpages = data.get("subpages") if isinstance(data, dict) else None
+    if not isinstance(subpages, list):
+        return set()
+    return {
+        item["html_sha"]
+        for item in subpages
+        if isinstance(item, dict) and isinstance(item.get("html_sha"), str)
+    }
+
+
+def sweep_snapshot_blobs(session: Session, candidates: Iterable[str] | None = None) -> int:
+    """Delete stored blobs that no website snapshot references any more.
+
+    Blobs are shared by digest between websites, so liveness comes from every
+    stored snapshot rather than from the one that stopped using them.
+    ``candidates`` limits the sweep to those digests; ``None`` sweeps the whole
+    store, which also reclaims blobs left by runs that never committed.
+    """
+
+    live: set[str] = set()
+    for (snapshot,) in session.query(Website.last_snapshot).filter(Website.last_snapshot.isnot(None)):
+        live |= snapshot_blob_refs(snapshot)
+    return sweep_blobs(live, candidates)
+
+
+def _load_blob_html(digest: Any) -> str | None:
+    if not isinstance(digest, str):
+        return None
+    data = get_blob(digest)
+    if data is None:
+        LOGGER.warning("快照页面内容 %s 已丢失", digest)
+        return None
+    return data.decode("utf-8")
+
+
+def _parse_snapshot_data(
+    snapshot: str,
+    data: Any,
+    titles: bool = True,
+    load_blobs: bool = True,
+) -> tuple[str | None, list[dict[str, str | None]], str | None, str | None]:
+    def _derive(html: str) -> tuple[str | None, str]:
+        if titles:
+            page_title, _, page_text = summarize_page(html)
+            return page_title, page_text
+        return None, extract_body_text(html)
 
     def _add_entry(
         entries: list[dict[str, str | None]],
@@ -157,15 +373,26 @@ def parse_snapshot(
         html: str | None,
         title: str | None = None,
         text: str | None = None,
+        html_ref: Any = None,
     ) -> None:
-        if not isinstance(url, str) or not isinstance(html, str):
+        if not isinstance(url, str):
             return
+        deferred = False
+        if not isinstance(html, str):
+            if not isinstance(html_ref, str):
+                return
+            if load_blobs:
+                html = _load_blob_html(html_ref)
+                if html is None:
+                    return
+            else:
+                deferred = True
         normalized_title = title.strip() if isinstance(title, str) else ""
-        if not normalized_title:
-            normalized_title = summarize_html(html)[0]
         normalized_text = text.strip() if isinstance(text, str) else ""
-        if not normalized_text:
-            normalized_text = extract_body_text(html)
+        if not deferred and ((titles and not normalized_title) or not normalized_text):
+            page_title, page_text = _derive(html)
+            normalized_title = normalized_title or page_title or ""
+            normalized_text = normalized_text or page_text
         entries.append(
             {
                 "url": url,
@@ -195,6 +422,7 @@ def parse_snapshot(
                         item.get("html"),
                         item.get("title"),
                         item.get("text"),
+                        item.get("html_sha"),
                     )
         if not entries:
             items_data = data.get("items", [])
@@ -240,28 +468,27 @@ def parse_snapshot(
                     html = item.get("html")
                     title = item.get("title")
                     text = item.get("text")
-                    _add_entry(entries, url, html, title, text)
-        if not _is_non_empty_text(main_title) and isinstance(main_html, str):
-            main_title = summarize_html(main_html)[0]
-        if not _is_non_empty_text(main_text) and isinstance(main_html, str):
-            main_text = extract_body_text(main_html)
+                    _add_entry(entries, url, html, title, text, item.get("html_sha"))
+        missing_title = titles and not _is_non_empty_text(main_title)
+        if isinstance(main_html, str) and (missing_title or not _is_non_empty_text(main_text)):
+            page_title, page_text = _derive(main_html)
+            if missing_title:
+                main_title = page_title
+            if not _is_non_empty_text(main_text):
+                main_text = page_text
         return main_html, entries, main_title, main_text
 
     if isinstance(data, str):
-        title, _ = summarize_html(data)
-        text = extract_body_text(data)
+        title, text = _derive(data)
         return data, [], title, text
 
-    title, _ = summarize_html(snapshot)
-    text = extract_body_text(snapshot)
+    title, text = _derive(snapshot)
     return snapshot, [], title, text
 
 
-def build_snapshot(
-    main_html: str,
-    subpages: list[dict[str, str | None]],
-    main_title: str | None = None,
-) -> str:
+def _serialize_subpages(subpages: Iterable[dict[str, str | None]]) -> list[dict[str, str | None]]:
+    """Move subpage bodies into the blob store and keep only their digests."""
+
     serialized_subpages: list[dict[str, str | None]] = []
     for item in subpages:
         url = item.get("url") if isinstance(item, dict) else None
@@ -269,7 +496,7 @@ def build_snapshot(
         title = item.get("title") if isinstance(item, dict) else None
         text = item.get("text") if isinstance(item, dict) else None
         if isinstance(url, str) and isinstance(html, str):
-            serialized: dict[str, str | None] = {"url": url, "html": html}
+            serialized: dict[str, str | None] = {"url": url, "html_sha": put_blob(html.encode("utf-8"))}
             if _is_non_empty_text(title):
                 serialized["title"] = title.strip()
             normalized_text = text.strip() if isinstance(text, str) else ""
@@ -278,15 +505,65 @@ def build_snapshot(
             if normalized_text:
                 serialized["text"] = normalized_text
             serialized_subpages.append(serialized)
+    return serialized_subpages
+
+
+def build_snapshot(
+    main_html: str,
+    subpages: list[dict[str, str | None]],
+    main_title: str | None = None,
+    link_hashes: Iterable[int] | None = None,
+    fingerprint_scope: str | None = None,
+    main_text: str | None = None,
+) -> str:
+    """Serialize the main page and subpages into a snapshot payload.
+
+    ``link_hashes`` and ``fingerprint_scope`` are stored with a digest of
+    ``main_html`` so the next run can detect changes and new links without
+    re-parsing this HTML. Subpage bodies go to the blob store; the payload
+    only keeps their digests. ``main_text`` and each subpage's ``text`` are
+    the body texts the caller already extracted and are only recomputed
+    when missing.
+    """
+
+    serialized_subpages = _serialize_subpages(subpages)
 
     payload = {
-        "version": 3,
+        "version": 4,
         "main_html": main_html,
         "main_title": main_title.strip() if _is_non_empty_text(main_title) else None,
-        "main_text": extract_body_text(main_html),
+        "main_text": main_text if main_text is not None else extract_body_text(main_html),
         "subpages": serialized_subpages,
+        "main_hash": _html_digest(main_html),
     }
-    return json.dumps(payload, ensure_ascii=False)
+    if link_hashes is not None:
+        payload["link_hashes"] = sorted(set(link_hashes))
+    if fingerprint_scope:
+        payload["fingerprint_scope"] = fingerprint_scope
+    return _json_dumps(payload)
+
+
+_STREAM_CHUNK_SIZE = 64 * 1024
+_META_CHARSET_SCAN_LIMIT = 4096
+_META_CHARSET_RE = re.compile(rb"""<meta[^>]+charset\s*=\s*["']?\s*([A-Za-z0-9_.:-]+)""", re.IGNORECASE)
+
+
+_HTTP_SESSIONS = threading.local()
+
+
+def _http_session() -> requests.Session:
+    """Return this thread's keep-alive HTTP session.
+
+    Fetch workers reuse pooled connections across requests; cookies are never
+    stored so requests stay as independent as one-off ``requests.get`` calls.
+    """
+
+    session = getattr(_HTTP_SESSIONS, "session", None)
+    if session is None:
+        session = requests.Session()
+        session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+        _HTTP_SESSIONS.session = session
+    return session
 
 
 class CrawlError(RuntimeError):
@@ -408,12 +685,14 @@ def _fetch_html_with_requests(
             )
         status_timestamp = time.monotonic()
         try:
-            response = requests.get(url, timeout=20, headers=headers, proxies=proxies)
+            response = _http_session().get(url, timeout=20, headers=headers, proxies=proxies, stream=True)
             response.raise_for_status()
             status_timestamp = time.monotonic()
             break
         except requests.HTTPError as exc:
             status_timestamp = time.monotonic()
+            if response is not None:
+                _discard_response(response)
             status = response.status_code if response is not None else exc.response.status_code if exc.response else None
             if status == 403 and attempt < len(headers_sequence):
                 LOGGER.info("请求 %s 返回 403，尝试使用更接近浏览器的请求头重试", url)
@@ -457,63 +736,259 @@ def _fetch_html_with_requests(
     if request_interval > 0 and throttle_key is not None:
         with _REQUEST_THROTTLE_LOCK:
             _LAST_REQUEST_AT[throttle_key] = time.monotonic()
-    if not response.encoding or response.encoding.lower() == "iso-8859-1":
-        apparent = response.apparent_encoding
-        if apparent:
-            response.encoding = apparent
-    return response.text
+    return _read_response_text(response)
 
 
-def fetch_html(url: str, website: Website | None = None) -> str:
-    global _PLAYWRIGHT_IMPORT_FAILED
+def _content_length(response: requests.Response) -> int | None:
+    try:
+        return int(response.headers.get("Content-Length", ""))
+    except ValueError:
+        return None
+
 
-    request_options = _build_request_options(website)
-    if website is not None and request_options["use_proxy"]:
-        return _fetch_html_with_requests(url, **request_options)
+def _discard_response(response: requests.Response) -> None:
+    """Release an unwanted response, keeping its connection alive when cheap.
 
+    Small error bodies are drained so the pooled connection can serve the
+    retry; unknown or large ones are dropped together with the socket.
+    """
+
+    length = _content_length(response)
+    if length is not None and length <= _STREAM_CHUNK_SIZE:
+        try:
+            response.content  # noqa: B018 - reading releases the connection
+        except requests.RequestException:
+            pass
+    response.close()
+
+
+def _read_response_text(response: requests.Response) -> str:
+    """Stream the body into one buffer and decode it exactly once.
+
+    The declared ``<meta charset>`` is preferred over statistical detection
+    when the HTTP headers carry no usable encoding. Bodies larger than
+    :data:`MAX_RESPONSE_BYTES` raise :class:`CrawlError` instead.
+    """
+
+    too_large = f"页面 {response.url} 超过 {MAX_RESPONSE_BYTES // (1024 * 1024)}MB 上限，已放弃"
+    if (_content_length(response) or 0) > MAX_RESPONSE_BYTES:
+        response.close()
+        raise CrawlError(too_large)
+    body = bytearray()
+    with response:
+        for chunk in response.iter_content(_STREAM_CHUNK_SIZE):
+            body.extend(chunk)
+            if len(body) > MAX_RESPONSE_BYTES:
+                raise CrawlError(too_large)
+    encoding = response.encoding
+    if not encoding or encoding.lower() == "iso-8859-1":
+        match = _META_CHARSET_RE.search(body, 0, _META_CHARSET_SCAN_LIMIT)
+        if match:
+            encoding = match.group(1).decode("ascii")
+        else:
+            encoding = requests.compat.chardet.detect(body)["encoding"] or encoding
     try:
-        from playwright.sync_api import (  # type: ignore import-not-found
-            Error as PlaywrightError,
-            TimeoutError as PlaywrightTimeoutError,
-            sync_playwright,
-        )
-    except ImportError:
-        if not _PLAYWRIGHT_IMPORT_FAILED:
-            LOGGER.info("Playwright 未安装，回退到 requests 抓取，后续请求将继续使用 requests")
-            _PLAYWRIGHT_IMPORT_FAILED = True
-        return _fetch_html_with_requests(url, **request_options)
-
-    browser = None
-    context = None
-    try:
-        with sync_playwright() as playwright:
-            browser = playwright.chromium.launch(
+        return str(body, encoding or "utf-8", errors="replace")
+    except LookupError:
+        return str(body, "utf-8", errors="replace")
+
+
+class BrowserPool:
+    """Reuse one headless Chromium browser and context for several fetches.
+
+    Playwright's sync API is bound to the thread that started it, so a pool
+    must be created, used and closed on the same thread. The browser is only
+    launched on the first fetch that needs it; failures fall back to
+    ``requests`` exactly like a one-off :func:`fetch_html` call.
+    """
+
+    def __init__(self, request_options: dict[str, Any], *, use_browser: bool = True) -> None:
+        self.request_options = request_options
+        self.use_browser = use_browser
+        self._playwright: Any | None = None
+        self._browser: Any | None = None
+        self._context: Any | None = None
+        self._errors: tuple[type[BaseException], type[BaseException]] | None = None
+
+    @classmethod
+    def for_website(cls, website: Website | None) -> BrowserPool:
+        """Build a pool with the request options and browser policy of ``website``."""
+
+        request_options = _build_request_options(website)
+        use_browser = website is None or not request_options["use_proxy"]
+        return cls(request_options, use_browser=use_browser)
+
+    def __enter__(self) -> BrowserPool:
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    def _start(self) -> bool:
+        global _PLAYWRIGHT_IMPORT_FAILED
+
+        if self._context is not None:
+            return True
+        try:
+            from playwright.sync_api import (  # type: ignore import-not-found
+                Error as PlaywrightError,
+                TimeoutError as PlaywrightTimeoutError,
+                sync_playwright,
+            )
+        except ImportError:
+            if not _PLAYWRIGHT_IMPORT_FAILED:
+                LOGGER.info("Playwright 未安装，回退到 requests 抓取，后续请求将继续使用 requests")
+                _PLAYWRIGHT_IMPORT_FAILED = True
+            self.use_browser = False
+            return False
+
+        self._errors = (PlaywrightTimeoutError, PlaywrightError)
+        try:
+            self._playwright = sync_playwright().start()
+            self._browser = self._playwright.chromium.launch(
                 headless=True,
                 args=["--no-sandbox", "--disable-gpu", "--disable-dev-shm-usage"],
             )
-            context = browser.new_context()
+            self._context = self._browser.new_context()
+        except PlaywrightError as exc:
+            LOGGER.warning("无头浏览器启动失败：%s，改用 requests", exc)
+            self.close()
+            self.use_browser = False
+            return False
+        return True
+
+    def fetch(self, url: str) -> str:
+        if not self.use_browser or not self._start():
+            return _fetch_html_with_requests(url, **self.request_options)
+
+        assert self._context is not None and self._errors is not None
+        timeout_error, playwright_error = self._errors
+        page = None
+        try:
+            page = self._context.new_page()
+            page.goto(url, wait_until="domcontentloaded", timeout=30_000)
             try:
-                page = context.new_page()
-                page.goto(url, wait_until="domcontentloaded", timeout=30_000)
+                page.wait_for_load_state("networkidle", timeout=30_000)
+            except timeout_error:
+                LOGGER.debug("等待 %s 的 networkidle 状态超时，继续尝试获取页面内容", url)
+            page.wait_for_load_state("load", timeout=30_000)
+            page.wait_for_timeout(2_000)
+            return page.content()
+        except timeout_error as exc:
+            LOGGER.warning("使用无头浏览器抓取 %s 超时：%s，改用 requests", url, exc)
+        except playwright_error as exc:
+            LOGGER.warning("使用无头浏览器抓取 %s 失败：%s，改用 requests", url, exc)
+        finally:
+            if page is not None:
                 try:
-                    page.wait_for_load_state("networkidle", timeout=30_000)
-                except PlaywrightTimeoutError:
-                    LOGGER.debug("等待 %s 的 networkidle 状态超时，继续尝试获取页面内容", url)
-                page.wait_for_load_state("load", timeout=30_000)
-                page.wait_for_timeout(2_000)
-                html = page.content()
-                return html
-            finally:
-                if context is not None:
-                    context.close()
-                if browser is not None:
-                    browser.close()
-    except PlaywrightTimeoutError as exc:
-        LOGGER.warning("使用无头浏览器抓取 %s 超时：%s，改用 requests", url, exc)
-        return _fetch_html_with_requests(url, **request_options)
-    except PlaywrightError as exc:
-        LOGGER.warning("使用无头浏览器抓取 %s 失败：%s，改用 requests", url, exc)
-        return _fetch_html_with_requests(url, **request_options)
+                    page.close()
+                except playwright_error:  # pragma: no cover - browser already gone
+                    pass
+        return _fetch_html_with_requests(url, **self.request_options)
+
+    def close(self) -> None:
+        for resource, method in ((self._context, "close"), (self._browser, "close"), (self._playwright, "stop")):
+            if resource is None:
+                continue
+            try:
+                getattr(resource, method)()
+            except Exception:  # noqa: BLE001 - best effort cleanup
+                LOGGER.debug("关闭无头浏览器资源失败", exc_info=True)
+        self._context = None
+        self._browser = None
+        self._playwright = None
+
+
+def fetch_html(url: str, website: Website | None = None, pool: BrowserPool | None = None) -> str:
+    """Fetch one page, through ``pool`` when the caller keeps one open."""
+
+    if pool is not None:
+        return pool.fetch(url)
+    with BrowserPool.for_website(website) as one_off_pool:
+        return one_off_pool.fetch(url)
+
+
+def iter_many_html(
+    urls: Sequence[str],
+    website: Website | None = None,
+    should_stop: Callable[[], bool] | None = None,
+    pool: BrowserPool | None = None,
+) -> Iterator[str | BaseException]:
+    """Yield the HTML or the raised error per URL, in the order of ``urls``.
+
+    Pages are fetched by a small thread pool while the caller processes the
+    results already yielded, so parsing overlaps with the remaining fetches.
+    Request options are resolved up front so the worker threads never touch
+    ORM state. Websites with a request interval are fetched one at a time to
+    honour the throttle. A ``pool`` opened by the caller on this thread is
+    used to fetch pending URLs whenever the next result is not ready yet.
+    """
+
+    if not urls:
+        return
+    request_options = _build_request_options(website)
+    use_browser = website is None or not request_options["use_proxy"]
+    concurrency = 1 if request_options["request_interval"] > 0 else SUBPAGE_FETCH_CONCURRENCY
+    results: list[str | BaseException] = [TaskCancelledError("任务已被取消")] * len(urls)
+    ready = [threading.Event() for _ in urls]
+    pending: queue.SimpleQueue[int] = queue.SimpleQueue()
+    for index in range(len(urls)):
+        pending.put(index)
+
+    def _next_index() -> int | None:
+        try:
+            return pending.get_nowait()
+        except queue.Empty:
+            return None
+
+    def _fetch(fetch_pool: BrowserPool, index: int) -> None:
+        try:
+            if should_stop is None or not should_stop():
+                results[index] = fetch_pool.fetch(urls[index])
+        except Exception as exc:  # noqa: BLE001 - reported per URL
+            results[index] = exc
+        finally:
+            ready[index].set()
+
+    def _worker() -> None:
+        # Each worker thread keeps its own browser for every URL it handles.
+        with BrowserPool(request_options, use_browser=use_browser) as worker_pool:
+            while (index := _next_index()) is not None:
+                _fetch(worker_pool, index)
+
+    # The caller's pool is bound to this thread, so it stands in for one worker.
+    workers = min(concurrency, len(urls)) - (pool is not None)
+    executor = ThreadPoolExecutor(max_workers=max(workers, 1), thread_name_prefix="fetch")
+    try:
+        for _ in range(workers):
+            executor.submit(_worker)
+        for index in range(len(urls)):
+            while not ready[index].is_set():
+                own_index = _next_index() if pool is not None else None
+                if own_index is None:
+                    ready[index].wait()
+                else:
+                    _fetch(pool, own_index)
+            yield results[index]
+    finally:
+        # Stop handing out URLs when the caller gives up early.
+        while _next_index() is not None:
+            pass
+        executor.shutdown(wait=True)
+
+
+def fetch_many_html(
+    urls: Sequence[str],
+    website: Website | None = None,
+    should_stop: Callable[[], bool] | None = None,
+    pool: BrowserPool | None = None,
+) -> list[str | BaseException]:
+    """Fetch ``urls`` concurrently and return the HTML or the raised error per URL.
+
+    See :func:`iter_many_html`; this waits for every page.
+    """
+
+    return list(iter_many_html(urls, website, should_stop, pool))
 
 
 def fetch_json_content(url: str, website: Website | None = None) -> tuple[str, Any]:
@@ -526,75 +1001,261 @@ def fetch_json_content(url: str, website: Website | None = None) -> tuple[str, A
         **request_options,
     )
     try:
-        data = json.loads(text)
+        data = _json_loads(text)
     except json.JSONDecodeError as exc:  # pragma: no cover - unexpected format
         raise CrawlError(f"接口 {url} 返回的内容不是合法的 JSON：{exc}") from exc
     return text, data
 
 
-def extract_links(html: str, base_url: str) -> List[str]:
-    soup = BeautifulSoup(html, "html.parser")
+# Hrefs that never lead to a crawlable page: empty, in-page anchors and
+# non-navigational schemes.
+_SKIP_HREF_RE = re.compile(r"^(?:javascript:|mailto:|tel:|data:|#|$)", re.IGNORECASE)
+# Hrefs that urljoin rewrites rather than concatenates: dot segments, stripped
+# tab/newline characters, ``;params`` and empty query or fragment markers.
+_URLJOIN_REWRITE_RE = re.compile(r"/\.|[\t\r\n;]|\?#|[?#]$")
+
+
+@lru_cache(maxsize=64)
+def _url_resolver(base_url: str) -> Callable[[str], str]:
+    """Return ``resolve(href)`` that absolutises hrefs against ``base_url``.
+
+    Absolute, protocol-relative, root-relative and plain relative hrefs are
+    resolved by string concatenation; everything urljoin would rewrite (dot or
+    empty segments, empty hosts, ``;params``, empty ``?``/``#`` markers,
+    query- or fragment-only and scheme-like hrefs) falls back to
+    :func:`urljoin`, so the result is always identical to it. Bases whose path
+    has empty or dot segments always use urljoin, which cleans them up.
+    Resolvers are cached per base URL since each site is crawled repeatedly.
+    """
+
+    parts = urlsplit(base_url)
+    scheme = parts.scheme
+    root = f"{scheme}://{parts.netloc}" if scheme and parts.netloc else ""
+    base_dir = root + parts.path.rpartition("/")[0] + "/"
+    segments = parts.path.split("/")
+    concatenate = bool(root) and not (
+        any(segment in ("", ".", "..") for segment in segments[1:-1]) or segments[-1] in (".", "..")
+    )
+    needs_urljoin = _URLJOIN_REWRITE_RE.search
+
+    def resolve(href: str) -> str:
+        if concatenate and not needs_urljoin(href):
+            if href.startswith(("http://", "https://", "//")):
+                # urljoin keeps the base host when the href's host is empty.
+                if href.partition("//")[2][:1] not in ("", "/", "?", "#"):
+                    return f"{scheme}:{href}" if href.startswith("//") else href
+            elif href.startswith("/"):
+                return root + href
+            elif href[0] not in ".?#" and "//" not in href and ":" not in href.partition("/")[0]:
+                return base_dir + href
+        return urljoin(base_url, href)
+
+    return resolve
+
+
+def _resolve_unique_links(hrefs: Iterable[str | None], base_url: str) -> List[str]:
+    resolve = _url_resolver(base_url)
+    skip = _SKIP_HREF_RE.match
+    seen: set[str] = set()
     links: List[str] = []
-    for anchor in soup.find_all("a", href=True):
-        href = anchor.get("href")
-        if href:
-            absolute = urljoin(base_url, href)
-            links.append(absolute)
+    for href in hrefs:
+        if not href:
+            continue
+        href = href.strip()
+        if skip(href):
+            continue
+        link = resolve(href)
+        if link not in seen:
+            seen.add(link)
+            links.append(link)
     return links
 
 
-def _extract_display_title(soup: BeautifulSoup) -> str:
-    for tag in soup.find_all(["script", "style", "noscript"]):
-        tag.decompose()
+def extract_links_from_tree(tree: Any, base_url: str) -> List[str]:
+    """Return the unique absolute links of ``tree`` in page order."""
+
+    if isinstance(tree, BeautifulSoup):
+        return _links_from_soup(tree, base_url)
+    return _resolve_unique_links(
+        (anchor.attributes.get("href") for anchor in tree.css("a[href]")), base_url
+    )
+
+
+def extract_links(html: str, base_url: str) -> List[str]:
+    if LexborHTMLParser is not None:
+        return extract_links_from_tree(LexborHTMLParser(html), base_url)
+    return _links_from_soup(_make_soup(html, _LINK_STRAINER), base_url)
+
+
+def _links_from_soup(soup: BeautifulSoup, base_url: str) -> List[str]:
+    return _resolve_unique_links(
+        (anchor.get("href") for anchor in soup.find_all("a", href=True)), base_url
+    )
+
+
+# Display-title candidates in priority order: headings by level, ARIA
+# headings, then the og/twitter meta titles and finally <title>.
+_HEADING_TITLE_RANKS = {"h1": 0, "h2": 1, "h3": 2, "h4": 3}
+_ROLE_HEADING_RANK = 4
+_META_TITLE_RANKS = {
+    ("property", "og:title"): 5,
+    ("name", "og:title"): 6,
+    ("property", "twitter:title"): 7,
+    ("name", "twitter:title"): 8,
+}
+_DOCUMENT_TITLE_RANK = 9
+_TITLE_CANDIDATE_SELECTOR = ",".join(
+    [*_HEADING_TITLE_RANKS, '[role="heading"]']
+    + [f'meta[{attribute}="{value}"]' for attribute, value in _META_TITLE_RANKS]
+    + ["title"]
+)
 
-    heading_levels = ["h1", "h2", "h3", "h4"]
-    for level in heading_levels:
-        for heading in soup.find_all(level):
-            text = heading.get_text(" ", strip=True)
-            if _is_non_empty_text(text):
-                return text
 
-    for heading in soup.find_all(attrs={"role": "heading"}):
-        text = heading.get_text(" ", strip=True)
+def _title_candidate_rank(name: str, attrs: dict[str, Any]) -> int | None:
+    rank = _HEADING_TITLE_RANKS.get(name)
+    if rank is not None:
+        return rank
+    if attrs.get("role") == "heading":
+        return _ROLE_HEADING_RANK
+    if name == "meta":
+        ranks = [
+            meta_rank
+            for (attribute, value), meta_rank in _META_TITLE_RANKS.items()
+            if attrs.get(attribute) == value
+        ]
+        return min(ranks) if ranks else None
+    if name == "title":
+        return _DOCUMENT_TITLE_RANK
+    return None
+
+
+def _extract_display_title_lexbor(tree: Any) -> str:
+    tree.strip_tags(["script", "style", "noscript"])
+
+    best_rank = _DOCUMENT_TITLE_RANK + 1
+    best_text = ""
+    title_seen = False
+    for node in tree.css(_TITLE_CANDIDATE_SELECTOR):
+        attrs = node.attributes
+        rank = _title_candidate_rank(node.tag, attrs)
+        if rank is None or rank >= best_rank:
+            continue
+        if rank == _DOCUMENT_TITLE_RANK:
+            if title_seen:
+                continue
+            title_seen = True
+            text = (node.text() or "").strip()
+        elif node.tag == "meta":
+            text = (attrs.get("content") or "").strip()
+        else:
+            text = node.text(separator=" ", strip=True).strip()
         if _is_non_empty_text(text):
-            return text
+            best_rank, best_text = rank, text
+            if rank == 0:
+                break
+    return best_text
 
-    for attribute in ("og:title", "twitter:title"):  # Meta fallbacks
-        meta = soup.find("meta", attrs={"property": attribute}) or soup.find("meta", attrs={"name": attribute})
-        if meta and _is_non_empty_text(meta.get("content")):
-            return meta.get("content", "").strip()
 
-    if soup.title and _is_non_empty_text(soup.title.string):
-        return soup.title.string.strip()
+def _extract_display_title(soup: BeautifulSoup) -> str:
+    tags = soup.find_all(True)
+    for tag in tags:
+        if tag.name in ("script", "style", "noscript") and not tag.decomposed:
+            tag.decompose()
+
+    best_rank = _DOCUMENT_TITLE_RANK + 1
+    best_text = ""
+    title_seen = False
+    for tag in tags:
+        if tag.decomposed:
+            continue
+        rank = _title_candidate_rank(tag.name, tag.attrs)
+        if rank is None or rank >= best_rank:
+            continue
+        if rank == _DOCUMENT_TITLE_RANK:
+            if title_seen:
+                continue
+            title_seen = True
+            text = (tag.string or "").strip()
+        elif tag.name == "meta":
+            text = (tag.get("content") or "").strip()
+        else:
+            text = tag.get_text(" ", strip=True)
+        if _is_non_empty_text(text):
+            best_rank, best_text = rank, text
+            if rank == 0:
+                break
+    return best_text
+
 
-    return ""
+_SUMMARY_TOKEN_RE = re.compile(r"[\u4e00-\u9fff]|[a-zA-Z0-9]+")
+_SENTENCE_SPLIT_RE = re.compile(r"(?<=[。！？!?])\s+|[\n\r]+")
 
 
 def _tokenize_for_summary(text: str) -> list[str]:
     if not text:
         return []
-    tokens = re.findall(r"[\u4e00-\u9fff]|[a-zA-Z0-9]+", text.lower())
-    return tokens
+    return _SUMMARY_TOKEN_RE.findall(text.lower())
 
 
 def _split_sentences(text: str) -> list[str]:
     if not text:
         return []
-    separators = r"(?<=[。！？!?])\s+|[\n\r]+"
-    sentences = [segment.strip() for segment in re.split(separators, text) if segment.strip()]
+    sentences = [segment.strip() for segment in _SENTENCE_SPLIT_RE.split(text) if segment.strip()]
     if sentences:
         return sentences
     return [text.strip()]
 
 
-def _select_representative_sentence(sentences: Sequence[str], tokens: Counter[str]) -> str:
+# Below this many sentences the plain loop beats building the NumPy arrays.
+_VECTORIZED_SENTENCE_THRESHOLD = 16
+
+
+def _sentence_scores(
+    sentences: Sequence[str],
+    tokens: Counter[str],
+    sentence_tokens: Sequence[list[str]],
+) -> Any:
+    """Score every sentence in one vectorized pass; token-less ones get ``-inf``.
+
+    Sentences are laid out CSR-style as one flat array of token ids, so the
+    per-sentence sums come from a single ``np.add.reduceat``.
+    """
+
+    token_ids = {token: index for index, token in enumerate(tokens)}
+    counts = np.fromiter(tokens.values(), dtype=np.int64, count=len(tokens))
+    lengths = np.fromiter(map(len, sentence_tokens), dtype=np.int64, count=len(sentence_tokens))
+    flat_ids = np.fromiter(
+        (token_ids[token] for tokens_in_sentence in sentence_tokens for token in tokens_in_sentence),
+        dtype=np.int64,
+        count=int(lengths.sum()),
+    )
+    starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+    present = lengths > 0
+    sums = np.add.reduceat(counts[flat_ids], starts[present])
+    char_lengths = np.fromiter(map(len, sentences), dtype=np.float64, count=len(sentences))
+    scores = np.full(len(sentences), -np.inf)
+    scores[present] = sums / lengths[present] + np.minimum(char_lengths[present] / 120.0, 1.0)
+    return scores
+
+
+def _select_representative_sentence(
+    sentences: Sequence[str],
+    tokens: Counter[str],
+    sentence_tokens: Sequence[list[str]],
+) -> str:
+    if np is not None and len(sentences) >= _VECTORIZED_SENTENCE_THRESHOLD and tokens:
+        scores = _sentence_scores(sentences, tokens, sentence_tokens)
+        best = int(np.argmax(scores))
+        if scores[best] != -np.inf:
+            return sentences[best]
+        return sentences[0]
+
     best_sentence = ""
     best_score = float("-inf")
-    for sentence in sentences:
-        sentence_tokens = _tokenize_for_summary(sentence)
-        if not sentence_tokens:
+    for sentence, tokens_in_sentence in zip(sentences, sentence_tokens):
+        if not tokens_in_sentence:
             continue
-        score = sum(tokens[token] for token in sentence_tokens) / len(sentence_tokens)
+        score = sum(tokens[token] for token in tokens_in_sentence) / len(tokens_in_sentence)
         length_bonus = min(len(sentence) / 120.0, 1.0)
         score += length_bonus
         if score > best_score:
@@ -608,12 +1269,15 @@ def _generate_main_idea(text: str, fallback_title: str) -> str:
     if not normalized_text:
         return fallback_title
 
+    # Sentence splitting only drops whitespace, so the per-sentence tokens add
+    # up to the document's tokens and each sentence is tokenized exactly once.
     sentences = _split_sentences(normalized_text)
-    tokens = Counter(_tokenize_for_summary(normalized_text))
+    sentence_tokens = [_tokenize_for_summary(sentence) for sentence in sentences]
+    tokens = Counter(chain.from_iterable(sentence_tokens))
     if not tokens:
         return sentences[0] if sentences else fallback_title
 
-    representative = _select_representative_sentence(sentences, tokens)
+    representative = _select_representative_sentence(sentences, tokens, sentence_tokens)
     representative = representative.strip()
     if representative:
         return representative[:120]
@@ -668,15 +1332,61 @@ def _parse_selector_config(config: str | None) -> list[tuple[str, str]]:
     return selectors
 
 
-def _extract_text_by_selectors(html: str, selectors: list[tuple[str, str]]) -> str | None:
+class _SelectorDocument:
+    """One HTML document with its BeautifulSoup and lxml trees parsed on demand.
+
+    Selector helpers share an instance so that several CSS/XPath rules applied
+    to the same page parse it at most once per backend.
+    """
+
+    __slots__ = ("html", "_soup", "_lxml_tree", "_lxml_parsed")
+
+    def __init__(self, html: str) -> None:
+        self.html = html
+        self._soup: BeautifulSoup | None = None
+        self._lxml_tree: Any | None = None
+        self._lxml_parsed = False
+
+    @property
+    def soup(self) -> BeautifulSoup:
+        if self._soup is None:
+            self._soup = _make_soup(self.html)
+        return self._soup
+
+    @property
+    def lxml_tree(self) -> Any | None:
+        if not self._lxml_parsed:
+            self._lxml_parsed = True
+            try:
+                self._lxml_tree = lxml_html.fromstring(self.html)
+            except Exception:  # noqa: BLE001
+                LOGGER.debug("解析 HTML 失败，无法应用 XPath 规则", exc_info=True)
+        return self._lxml_tree
+
+
+@lru_cache(maxsize=256)
+def _compile_xpath(expression: str) -> Any:
+    """Compile an XPath rule once; website configs repeat on every run."""
+
+    return etree.XPath(expression)
+
+
+def _selector_document(source: str | _SelectorDocument) -> _SelectorDocument:
+    return source if isinstance(source, _SelectorDocument) else _SelectorDocument(source)
+
+
+def _extract_text_by_selectors(
+    source: str | _SelectorDocument,
+    selectors: list[tuple[str, str]],
+) -> str | None:
     if not selectors:
         return None
-    soup = BeautifulSoup(html, "html.parser")
+    document = _selector_document(source)
     for method, value in selectors:
         element_text = ""
         if method == "css":
             try:
-                element = soup.select_one(value)
+                element = document.soup.select_one(value)
             except Exception:  # noqa: BLE001
                 LOGGER.debug("CSS 选择器 %s 解析失败", value, exc_info=True)
                 continue
@@ -687,13 +1397,11 @@ def _extract_text_by_selectors(html: str, selectors: list[tuple[str, str]]) -> s
             if lxml_html is None or etree is None:
                 LOGGER.debug("XPath 规则 %s 被忽略，缺少 lxml 依赖", value)
                 continue
-            try:
-                tree = lxml_html.fromstring(html)
-            except Exception:  # noqa: BLE001
-                LOGGER.debug("解析 HTML 失败，无法应用 XPath %s", value, exc_info=True)
+            tree = document.lxml_tree
+            if tree is None:
                 continue
             try:
-                results = tree.xpath(value)
+                results = _compile_xpath(value)(tree)
             except Exception:  # noqa: BLE001
                 LOGGER.debug("执行 XPath %s 失败", value, exc_info=True)
                 continue
@@ -711,19 +1419,18 @@ def _extract_text_by_selectors(html: str, selectors: list[tuple[str, str]]) -> s
     return None
 
 
-def _extract_region_html(html: str, selectors: list[tuple[str, str]]) -> str | None:
+def _extract_region_html(
+    source: str | _SelectorDocument,
+    selectors: list[tuple[str, str]],
+) -> str | None:
     if not selectors:
         return None
 
-    soup: BeautifulSoup | None = None
-    tree: Any | None = None
-
+    document = _selector_document(source)
     for method, value in selectors:
         if method == "css":
-            if soup is None:
-                soup = BeautifulSoup(html, "html.parser")
             try:
-                element = soup.select_one(value)
+                element = document.soup.select_one(value)
             except Exception:  # noqa: BLE001
                 LOGGER.debug("CSS 选择器 %s 解析失败", value, exc_info=True)
                 continue
@@ -734,16 +1441,11 @@ def _extract_region_html(html: str, selectors: list[tuple[str, str]]) -> str | N
             if lxml_html is None or etree is None:
                 LOGGER.debug("XPath 规则 %s 被忽略，缺少 lxml 依赖", value)
                 continue
-            if tree is None:
-                try:
-                    tree = lxml_html.fromstring(html)
-                except Exception:  # noqa: BLE001
-                    LOGGER.debug("解析 HTML 失败，无法应用 XPath %s", value, exc_info=True)
-                    tree = None
+            tree = document.lxml_tree
             if tree is None:
                 continue
             try:
-                results = tree.xpath(value)
+                results = _compile_xpath(value)(tree)
             except Exception:  # noqa: BLE001
                 LOGGER.debug("执行 XPath %s 失败", value, exc_info=True)
                 continue
@@ -765,49 +1467,99 @@ def _extract_region_html(html: str, selectors: list[tuple[str, str]]) -> str | N
     return None
 
 
-def _summarize_without_preferences(html: str) -> tuple[str, str]:
-    soup = BeautifulSoup(html, "html.parser")
-    fallback_title = _extract_display_title(soup)
-    text_content = extract_body_text(html)
-    main_idea = _generate_main_idea(text_content, fallback_title)
+def _display_title_and_text(tree: Any) -> tuple[str, str]:
+    if isinstance(tree, BeautifulSoup):
+        display_title = _extract_display_title(tree)
+    else:
+        display_title = _extract_display_title_lexbor(tree)
+    return display_title, _body_text_from_tree(tree)
+
+
+def _summarize_tree_without_preferences(tree: Any) -> tuple[str, str, str]:
+    display_title, text_content = _display_title_and_text(tree)
+    main_idea = _generate_main_idea(text_content, display_title)
     summary = text_content[:1000]
+    return main_idea, summary, text_content
+
+
+def _summarize_without_preferences(html: str) -> tuple[str, str]:
+    main_idea, summary, _ = _summarize_tree_without_preferences(_parse_html(html))
     return main_idea, summary
 
 
-def summarize_html(html: str, website: Website | None = None) -> tuple[str, str]:
-    fallback_title, fallback_summary = _summarize_without_preferences(html)
+def summarize_page(
+    html: str,
+    website: Website | None = None,
+    tree: Any | None = None,
+    document: _SelectorDocument | None = None,
+) -> tuple[str, str, str]:
+    """Return ``(title, summary, body_text)`` from a single parse of ``html``.
+
+    ``tree`` may be a tree already returned by :func:`_parse_html` for the same
+    HTML; it is consumed by the summary. ``document`` may likewise carry the
+    selector trees already built for ``html`` by region extraction.
+    """
 
+    if tree is None:
+        tree = _parse_html(html)
     if not website:
-        return fallback_title, fallback_summary
+        return _summarize_tree_without_preferences(tree)
 
+    display_title, text_content = _display_title_and_text(tree)
     title_selectors = _parse_selector_config(website.title_selector_config)
     content_selectors = _parse_selector_config(website.content_selector_config)
 
-    preferred_title = _extract_text_by_selectors(html, title_selectors)
-    preferred_body = _extract_text_by_selectors(html, content_selectors)
+    if document is None:
+        document = _SelectorDocument(html)
+    preferred_title = _extract_text_by_selectors(document, title_selectors)
+    preferred_body = _extract_text_by_selectors(document, content_selectors)
 
-    title = fallback_title
-    summary = fallback_summary
+    if _is_non_empty_text(preferred_title):
+        # A configured title always wins, so no main idea has to be scored.
+        title = preferred_title
+    else:
+        title = _generate_main_idea(text_content, display_title)
+        if _is_non_empty_text(preferred_body):
+            idea = _generate_main_idea(preferred_body, preferred_title or title)
+            if _is_non_empty_text(idea):
+                title = idea
 
     if _is_non_empty_text(preferred_body):
         summary = preferred_body[:1000]
-        idea = _generate_main_idea(preferred_body, preferred_title or fallback_title)
-        if _is_non_empty_text(preferred_title):
-            title = preferred_title
-        elif _is_non_empty_text(idea):
-            title = idea
-    elif _is_non_empty_text(preferred_title):
-        title = preferred_title
+    else:
+        summary = text_content[:1000]
+    return title, summary, text_content
+
 
+def summarize_html(html: str, website: Website | None = None) -> tuple[str, str]:
+    title, summary, _ = summarize_page(html, website)
     return title, summary
 
 
-def compare_links(old_html: str | None, new_html: str, base_url: str) -> List[str]:
-    current_links = set(extract_links(new_html, base_url))
-    if not old_html:
-        return list(current_links)
-    previous_links = set(extract_links(old_html, base_url))
-    return list(current_links - previous_links)
+def compare_links(
+    old_html: str | None,
+    new_html: str,
+    base_url: str,
+    current_links: Iterable[str] | None = None,
+    previous_link_hashes: Iterable[int] | None = None,
+) -> List[str]:
+    """Return links in ``new_html`` that were not present previously, in page order.
+
+    Both sides are keyed by 64-bit link hashes, so a snapshot that stored
+    ``previous_link_hashes`` never needs its old HTML parsed again.
+    """
+
+    if current_links is None:
+        current_links = extract_links(new_html, base_url)
+    current_by_hash: dict[int, str] = {}
+    for link in current_links:
+        current_by_hash.setdefault(_link_hash(link), link)
+    if previous_link_hashes is None:
+        if not old_html:
+            return list(current_by_hash.values())
+        previous_link_hashes = {_link_hash(link) for link in extract_links(old_html, base_url)}
+    known = set(previous_link_hashes)
+    return [link for link_hash, link in current_by_hash.items() if link_hash not in known]
 
 
 def _split_json_path(path: str) -> list[str | int]:
@@ -958,7 +1710,7 @@ def _load_previous_api_urls(snapshot: str | None) -> set[str]:
     if not snapshot:
         return set()
     try:
-        payload = json.loads(snapshot)
+        payload = _json_loads(snapshot)
     except json.JSONDecodeError:
         return set()
     if isinstance(payload, dict) and payload.get("mode") == "json_api":
@@ -997,8 +1749,8 @@ def build_json_api_snapshot(
         "items": serialized_items,
     }
     if detail_snapshots:
-        payload["subpages"] = detail_snapshots
-    return json.dumps(payload, ensure_ascii=False)
+        payload["subpages"] = _serialize_subpages(detail_snapshots)
+    return _json_dumps(payload)
 
 
 KEYWORD_SPLIT_PATTERN = re.compile(r"[,\u3001，;；、\s]+")
@@ -1014,6 +1766,49 @@ def _extract_keywords(text: str) -> list[str]:
     return parts or [text.strip()]
 
 
+@lru_cache(maxsize=1024)
+def _keyword_pattern(text: str) -> re.Pattern[str] | None:
+    """Return one alternation matching any lower-cased keyword of ``text``.
+
+    Cached per watch-content text, so keywords are split and lowered once
+    rather than for every scored page.
+    """
+
+    keywords = {keyword.lower() for keyword in _extract_keywords(text)}
+    keywords.discard("")
+    if not keywords:
+        return None
+    # Longest first keeps the alternation's result independent of set order.
+    return re.compile("|".join(re.escape(keyword) for keyword in sorted(keywords, key=len, reverse=True)))
+
+
+@lru_cache(maxsize=64)
+def _keyword_matcher(texts: tuple[str, ...]) -> Callable[[str], set[int]]:
+    """Return a function giving the indices of ``texts`` whose keywords occur.
+
+    With ``pyahocorasick`` every keyword of every content is found in one
+    pass over the page text; otherwise each content's alternation is tried.
+    The input page text must already be lower-cased.
+    """
+
+    if ahocorasick is not None:
+        owners: dict[str, set[int]] = {}
+        for index, text in enumerate(texts):
+            for keyword in _extract_keywords(text) if text else ():
+                if keyword:
+                    owners.setdefault(keyword.lower(), set()).add(index)
+        if not owners:
+            return lambda haystack: set()
+        automaton = ahocorasick.Automaton()
+        for keyword, indices in owners.items():
+            automaton.add_word(keyword, frozenset(indices))
+        automaton.make_automaton()
+        return lambda haystack: set().union(*(indices for _, indices in automaton.iter(haystack)))
+
+    patterns = [(index, _keyword_pattern(text)) for index, text in enumerate(texts) if text]
+    return lambda haystack: {index for index, pattern in patterns if pattern is not None and pattern.search(haystack)}
+
+
 def score_contents(
     article_title: str | None,
     article_summary: str | None,
@@ -1023,72 +1818,113 @@ def score_contents(
     if not contents_list:
         return []
 
-    normalized_title = (article_title or "").lower()
-    normalized_summary = (article_summary or "").lower()
+    results, unmatched_contents = _keyword_scores(article_title, article_summary, contents_list)
+
+    if unmatched_contents:
+        candidate_texts = [content.text for _, content in unmatched_contents]
+        scores = similarity((article_summary or "").lower(), candidate_texts)
+        for (index, content), score in zip(unmatched_contents, scores):
+            results[index] = (content, score)
+
+    return results
+
+
+def score_contents_batch(
+    articles: Sequence[tuple[str | None, str | None]],
+    contents: Iterable[WatchContent],
+    content_vectors: Any | None = None,
+) -> list[list[tuple[WatchContent, float]]]:
+    """Score several ``(title, summary)`` pairs with one similarity call.
+
+    Equivalent to calling :func:`score_contents` per article, but every summary
+    that still needs a semantic score is embedded in the same batch.
+    ``content_vectors`` are optional precomputed embeddings of ``contents``.
+    """
+
+    contents_list = list(contents)
+    if not contents_list:
+        return [[] for _ in articles]
+
+    keyword_results = [_keyword_scores(title, summary, contents_list) for title, summary in articles]
+    pending_rows = [row for row, (_, unmatched) in enumerate(keyword_results) if unmatched]
+    if pending_rows:
+        summaries = [(articles[row][1] or "").lower() for row in pending_rows]
+        if content_vectors is not None:
+            # Precomputed embeddings make scoring every content free.
+            columns = list(range(len(contents_list)))
+        else:
+            # Only contents some article left unmatched need a score; keyword
+            # matches and empty contents would be computed and thrown away.
+            columns = sorted({index for row in pending_rows for index, _ in keyword_results[row][1]})
+        candidate_texts = [contents_list[index].text for index in columns]
+        matrix = similarity_matrix(summaries, candidate_texts, candidate_vectors=content_vectors)
+        for row, scores in zip(pending_rows, matrix):
+            results, unmatched = keyword_results[row]
+            column_scores = dict(zip(columns, scores))
+            for index, content in unmatched:
+                results[index] = (content, column_scores[index])
+
+    return [results for results, _ in keyword_results]
+
+
+def _keyword_scores(
+    article_title: str | None,
+    article_summary: str | None,
+    contents_list: list[WatchContent],
+) -> tuple[list[tuple[WatchContent, float]], list[tuple[int, WatchContent]]]:
+    texts = tuple(content.text.strip() for content in contents_list)
+    # Keywords never contain whitespace, so joining cannot create new matches.
+    haystack = f"{article_title or ''}\n{article_summary or ''}".lower()
+    matched = _keyword_matcher(texts)(haystack)
     results: list[tuple[WatchContent, float]] = []
     unmatched_contents: list[tuple[int, WatchContent]] = []
 
-    for index, content in enumerate(contents_list):
-        text = content.text.strip()
+    for index, (content, text) in enumerate(zip(contents_list, texts)):
         if not text:
             results.append((content, 0.0))
             continue
 
-        keywords = _extract_keywords(text)
-        matched = False
-        for keyword in keywords:
-            keyword_lower = keyword.lower()
-            if not keyword_lower:
-                continue
-            if keyword_lower in normalized_title or keyword_lower in normalized_summary:
-                results.append((content, 1.0))
-                matched = True
-                break
-
-        if not matched:
+        if index in matched:
+            results.append((content, 1.0))
+        else:
             results.append((content, 0.0))
             unmatched_contents.append((index, content))
 
-    if unmatched_contents:
-        candidate_texts = [content.text for _, content in unmatched_contents]
-        scores = similarity(normalized_summary, candidate_texts)
-        for (index, content), score in zip(unmatched_contents, scores):
-            results[index] = (content, score)
+    return results, unmatched_contents
 
-    return results
 
+def _first_image_src(tree: Any) -> str | None:
+    """Return the ``src`` of the first ``<img>`` in a :func:`_parse_html` tree.
 
-def _extract_first_image_url(html: str | None, base_url: str | None) -> str | None:
-    if not html:
-        return None
-    soup = BeautifulSoup(html, "html.parser")
-    body = soup.body or soup
-    image = body.find("img")
-    if not image:
-        return None
-    src = image.get("src")
+    Read it before the tree is consumed by the summary helpers.
+    """
+
+    if isinstance(tree, BeautifulSoup):
+        image = tree.find("img")
+        return image.get("src") if image is not None else None
+    image = tree.css_first("img")
+    return image.attributes.get("src") if image is not None else None
+
+
+def _resolve_image_url(src: str | None, base_url: str | None) -> str | None:
     if not src:
         return None
     if base_url:
-        return urljoin(base_url, src)
+        return _url_resolver(base_url)(src.strip())
     return src
 
 
-def _build_notification_email_html(task: MonitorTask, items: list[dict[str, str]]) -> str:
-    blocks: list[str] = [
-        f"<h3 style=\"margin:0 0 16px 0;\">监控任务：{html_escape(task.name)}</h3>",
-        "<p style=\"margin:0 0 16px 0;\">发现以下符合关注内容的更新：</p>",
-    ]
-    for item in items:
-        image_html = (
-            f"<div style=\"flex:0 0 120px;margin-right:12px;\"><img src=\"{html_escape(item['pic'])}\" alt=\"预览图\" style=\"max-width:120px;border-radius:4px;\"/></div>"
-            if item["pic"]
-            else ""
-        )
-        summary = html_escape(item["summary"])
-        matches = html_escape(item["matches"])
-        blocks.append(
-            """
+def _extract_first_image_url(html: str | None, base_url: str | None) -> str | None:
+    if not html:
+        return None
+    if LexborHTMLParser is not None:
+        tree = LexborHTMLParser(html)
+    else:
+        tree = _make_soup(html, _IMAGE_STRAINER)
+    return _resolve_image_url(_first_image_src(tree), base_url)
+
+
+_EMAIL_ITEM_TEMPLATE = """
 <div style="display:flex;align-items:flex-start;border:1px solid #e0e0e0;border-radius:8px;padding:12px;margin-bottom:12px;background:#fafafa;">
   {image}
   <div style="flex:1;min-width:0;">
@@ -1100,14 +1936,28 @@ def _build_notification_email_html(task: MonitorTask, items: list[dict[str, str]
     </p>
   </div>
 </div>
-            """.format(
-                image=image_html,
-                title=html_escape(item["title"]),
-                matches=matches or "无",
-                summary=summary,
-                url=html_escape(item["url"]),
-            )
+            """.format
+_EMAIL_IMAGE_TEMPLATE = (
+    "<div style=\"flex:0 0 120px;margin-right:12px;\"><img src=\"{src}\" alt=\"预览图\" "
+    "style=\"max-width:120px;border-radius:4px;\"/></div>"
+).format
+
+
+def _build_notification_email_html(task: MonitorTask, items: list[dict[str, str]]) -> str:
+    blocks: list[str] = [
+        f"<h3 style=\"margin:0 0 16px 0;\">监控任务：{html_escape(task.name)}</h3>",
+        "<p style=\"margin:0 0 16px 0;\">发现以下符合关注内容的更新：</p>",
+    ]
+    blocks.extend(
+        _EMAIL_ITEM_TEMPLATE(
+            image=_EMAIL_IMAGE_TEMPLATE(src=html_escape(item["pic"])) if item["pic"] else "",
+            title=html_escape(item["title"]),
+            matches=html_escape(item["matches"]) or "无",
+            summary=html_escape(item["summary"]),
+            url=html_escape(item["url"]),
         )
+        for item in items
+    )
     return "".join(blocks)
 
 
@@ -1131,6 +1981,7 @@ def _record_notification_log(
     message: str | None,
     *,
     payload: Any | None = None,
+    commit: bool = True,
 ) -> None:
     log_entry = NotificationLog(
         task=task,
@@ -1141,7 +1992,14 @@ def _record_notification_log(
         payload=_serialize_notification_payload(payload),
     )
     session.add(log_entry)
-    session.commit()
+    if commit:
+        session.commit()
+
+
+def _split_recipients(raw: str | None) -> list[str]:
+    if not raw:
+        return []
+    return [email for email in map(str.strip, raw.split(",")) if email]
 
 
 def _send_task_notifications(
@@ -1149,7 +2007,18 @@ def _send_task_notifications(
     task: MonitorTask,
     payload_items: list[dict[str, str]],
     detail_callback: Callable[[str, str], None] | None = None,
+    *,
+    commit: bool = True,
 ) -> None:
+    """Send ``payload_items`` over the task's channel and log the outcome.
+
+    With ``commit=False`` the notification log rows are left for the caller's
+    next commit.
+    """
+
+    def _record(*args: Any, **kwargs: Any) -> None:
+        _record_notification_log(session, *args, commit=commit, **kwargs)
+
     if task.notification_method == "dingtalk":
         links = [
             {
@@ -1159,94 +2028,63 @@ def _send_task_notifications(
             }
             for item in payload_items
         ]
+        # Built once and shared by the request and whichever log row follows.
+        message = {
+            "msgtype": "feedCard",
+            "title": f"监控任务：{task.name}",
+            "feedCard": {"links": links},
+        }
+        log_payload = {"format": "dingtalk", "links": links, "payload": message}
         if detail_callback:
             detail_callback(
                 f"准备发送钉钉通知，共 {len(payload_items)} 条", "info"
             )
         LOGGER.info("Task %s sending DingTalk notification", task.id)
         try:
-            webhook_url = send_dingtalk_message(
-                {
-                    "msgtype": "feedCard",
-                    "title": f"监控任务：{task.name}",
-                    "feedCard": {"links": links},
-                }
-            )
+            webhook_url = send_dingtalk_message(message)
         except NotificationConfigError as exc:
             LOGGER.warning("钉钉通知配置缺失，任务 %s 无法发送", task.id)
             if detail_callback:
                 detail_callback("钉钉通知配置缺失，未能发送", "warning")
-            _record_notification_log(
-                session,
+            _record(
                 task,
                 channel="dingtalk",
                 target=None,
                 status="failed",
                 message=str(exc) or "钉钉通知配置缺失",
-                payload={
-                    "format": "dingtalk",
-                    "links": links,
-                    "payload": {
-                        "msgtype": "feedCard",
-                        "title": f"监控任务：{task.name}",
-                        "feedCard": {"links": links},
-                    },
-                },
+                payload=log_payload,
             )
         except Exception as exc:  # noqa: BLE001
             LOGGER.exception("任务 %s 发送钉钉通知失败", task.id)
             if detail_callback:
                 detail_callback("钉钉通知发送失败", "error")
-            _record_notification_log(
-                session,
+            _record(
                 task,
                 channel="dingtalk",
                 target=None,
                 status="failed",
                 message=str(exc) or "钉钉通知发送失败",
-                payload={
-                    "format": "dingtalk",
-                    "links": links,
-                    "payload": {
-                        "msgtype": "feedCard",
-                        "title": f"监控任务：{task.name}",
-                        "feedCard": {"links": links},
-                    },
-                },
+                payload=log_payload,
             )
         else:
             if detail_callback:
                 detail_callback("钉钉通知发送成功", "success")
-            _record_notification_log(
-                session,
+            _record(
                 task,
                 channel="dingtalk",
                 target=webhook_url,
                 status="success",
                 message=f"已成功发送 {len(payload_items)} 条更新",
-                payload={
-                    "format": "dingtalk",
-                    "links": links,
-                    "payload": {
-                        "msgtype": "feedCard",
-                        "title": f"监控任务：{task.name}",
-                        "feedCard": {"links": links},
-                    },
-                },
+                payload=log_payload,
             )
         return
 
-    recipients = [
-        email.strip()
-        for email in (task.notification_email or "").split(",")
-        if email.strip()
-    ]
+    recipients = _split_recipients(task.notification_email)
     if not recipients:
         LOGGER.warning("Task %s has no notification email", task.id)
         if detail_callback:
             detail_callback("任务未配置通知邮箱，无法发送邮件", "warning")
-        _record_notification_log(
-            session,
+        _record(
             task,
             channel="email",
             target=None,
@@ -1270,6 +2108,7 @@ def _send_task_notifications(
             text_lines.append(f"  匹配关注项：{item['matches']}")
         if item["summary"]:
             text_lines.append(f"  摘要：{item['summary']}")
+    text_body = "\n".join(text_lines)
 
     if detail_callback:
         detail_callback(
@@ -1283,14 +2122,13 @@ def _send_task_notifications(
             subject=f"监控任务 {task.name} 有新内容",
             recipients=recipients,
             html_body=html_body,
-            text_body="\n".join(text_lines),
+            text_body=text_body,
         )
     except NotificationConfigError as exc:
         LOGGER.warning("邮件通知配置缺失，任务 %s 无法发送", task.id)
         if detail_callback:
             detail_callback("邮件通知配置缺失，未能发送", "warning")
-        _record_notification_log(
-            session,
+        _record(
             task,
             channel="email",
             target=", ".join(recipients),
@@ -1300,7 +2138,7 @@ def _send_task_notifications(
                 "format": "email",
                 "subject": f"监控任务 {task.name} 有新内容",
                 "html": html_body,
-                "text": "\n".join(text_lines),
+                "text": text_body,
                 "recipients": recipients,
             },
         )
@@ -1308,8 +2146,7 @@ def _send_task_notifications(
         LOGGER.exception("任务 %s 发送邮件失败", task.id)
         if detail_callback:
             detail_callback("邮件通知发送失败", "error")
-        _record_notification_log(
-            session,
+        _record(
             task,
             channel="email",
             target=", ".join(recipients),
@@ -1319,15 +2156,14 @@ def _send_task_notifications(
                 "format": "email",
                 "subject": f"监控任务 {task.name} 有新内容",
                 "html": html_body,
-                "text": "\n".join(text_lines),
+                "text": text_body,
                 "recipients": recipients,
             },
         )
     else:
         if detail_callback:
             detail_callback("邮件通知发送成功", "success")
-        _record_notification_log(
-            session,
+        _record(
             task,
             channel="email",
             target=", ".join(recipients),
@@ -1337,12 +2173,109 @@ def _send_task_notifications(
                 "format": "email",
                 "subject": f"监控任务 {task.name} 有新内容",
                 "html": html_body,
-                "text": "\n".join(text_lines),
+                "text": text_body,
                 "recipients": recipients,
             },
         )
 
 
+# At interpreter exit queued notifications get this many seconds to be sent;
+# whatever is left is dropped so a hung sender cannot block shutdown.
+NOTIFICATION_SHUTDOWN_TIMEOUT = 30.0
+_NOTIFICATION_QUEUE: queue.Queue[tuple[int, int, list[dict[str, str]]]] = queue.Queue(maxsize=1024)
+_NOTIFICATION_WORKER: threading.Thread | None = None
+_NOTIFICATION_WORKER_LOCK = threading.Lock()
+
+
+def _deliver_task_notifications(task_id: int, log_id: int, payload_items: list[dict[str, str]]) -> None:
+    """Send one run's notifications and log them against the run's ``CrawlLog``."""
+
+    session = SessionLocal()
+    details: list[dict[str, Any]] = []
+
+    def add_detail(message: str, level: str = "info") -> None:
+        details.append({"log_id": log_id, "message": message, "level": level, "created_at": datetime.utcnow()})
+
+    try:
+        task = session.get(MonitorTask, task_id)
+        if task is None:
+            return
+        _send_task_notifications(session, task, payload_items, add_detail, commit=False)
+        if details:
+            session.bulk_insert_mappings(CrawlLogDetail, details)
+        session.commit()
+    except Exception:
+        session.rollback()
+        raise
+    finally:
+        SessionLocal.remove()
+
+
+def _notification_worker() -> None:
+    while True:
+        job = _NOTIFICATION_QUEUE.get()
+        try:
+            _deliver_task_notifications(*job)
+        except Exception:  # noqa: BLE001
+            LOGGER.exception("Failed to send notifications for task %s", job[0])
+        finally:
+            _NOTIFICATION_QUEUE.task_done()
+
+
+def _queue_task_notifications(task_id: int, log_id: int, payload_items: list[dict[str, str]]) -> None:
+    """Hand a finished run's notifications to the background sender.
+
+    A slow SMTP server or webhook then delays neither the run nor the next
+    scheduled task. The sender thread is started on first use.
+    """
+
+    global _NOTIFICATION_WORKER
+    with _NOTIFICATION_WORKER_LOCK:
+        if _NOTIFICATION_WORKER is None or not _NOTIFICATION_WORKER.is_alive():
+            _NOTIFICATION_WORKER = threading.Thread(
+                target=_notification_worker, name="task-notifications", daemon=True
+            )
+            _NOTIFICATION_WORKER.start()
+    try:
+        _NOTIFICATION_QUEUE.put_nowait((task_id, log_id, payload_items))
+    except queue.Full:
+        LOGGER.warning(
+            "Notification queue is full; dropping %d notifications for task %s", len(payload_items), task_id
+        )
+
+
+def wait_for_notifications(timeout: float | None = None) -> bool:
+    """Block until every queued notification has been sent and logged.
+
+    With ``timeout`` the wait gives up after that many seconds, drops the
+    notifications that are still queued and returns ``False``.
+    """
+
+    deadline = None if timeout is None else time.monotonic() + timeout
+    with _NOTIFICATION_QUEUE.all_tasks_done:
+        while _NOTIFICATION_QUEUE.unfinished_tasks:
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                break
+            _NOTIFICATION_QUEUE.all_tasks_done.wait(remaining)
+        else:
+            return True
+
+    while True:
+        try:
+            task_id, log_id, payload_items = _NOTIFICATION_QUEUE.get_nowait()
+        except queue.Empty:
+            break
+        _NOTIFICATION_QUEUE.task_done()
+        LOGGER.warning(
+            "Dropping %d unsent notifications for task %s (log %s)", len(payload_items), task_id, log_id
+        )
+    return False
+
+
+atexit.register(wait_for_notifications, NOTIFICATION_SHUTDOWN_TIMEOUT)
+
+
 def run_task(task_id: int) -> None:
     cancel_event = _register_running_task(task_id)
     if cancel_event is None:
@@ -1350,15 +2283,44 @@ def run_task(task_id: int) -> None:
         return
 
     session = SessionLocal()
+    # Loaded rows stay usable after each commit, so nothing is lazily reloaded
+    # (and no pooled connection checked out again) while pages are fetched.
+    # This thread's scoped session gets the default back in ``finally``.
+    session.expire_on_commit = False
+    browser_pool: BrowserPool | None = None
+    log_entry: CrawlLog | None = None
     log_entry_id: int | None = None
     cancellation_noted = False
+    notification_items: list[dict[str, str]] | None = None
+    pending_details: list[dict[str, Any]] = []
+    last_detail_flush = time.monotonic()
+
+    def flush_details() -> None:
+        nonlocal last_detail_flush
+        last_detail_flush = time.monotonic()
+        if pending_details:
+            session.bulk_insert_mappings(CrawlLogDetail, pending_details)
+            pending_details.clear()
+        # Always ends the transaction, which hands the connection back to the pool.
+        session.commit()
 
     def add_detail(message: str, level: str = "info") -> None:
         if log_entry_id is None:
             return
-        detail = CrawlLogDetail(log_id=log_entry_id, message=message, level=level)
-        session.add(detail)
-        session.commit()
+        pending_details.append(
+            {
+                "log_id": log_entry_id,
+                "message": message,
+                "level": level,
+                "created_at": datetime.utcnow(),
+            }
+        )
+        if (
+            level == "error"
+            or len(pending_details) >= DETAIL_FLUSH_BATCH_SIZE
+            or time.monotonic() - last_detail_flush >= DETAIL_FLUSH_INTERVAL
+        ):
+            flush_details()
 
     def ensure_not_cancelled() -> None:
         nonlocal cancellation_noted
@@ -1370,7 +2332,8 @@ def run_task(task_id: int) -> None:
 
     try:
         ensure_not_cancelled()
-        task = session.get(MonitorTask, task_id)
+        # watch_contents is joined-loaded by the mapping; the website comes with it.
+        task = session.get(MonitorTask, task_id, options=[joinedload(MonitorTask.website)])
         if not task:
             LOGGER.error("Task %s not found", task_id)
             return
@@ -1389,14 +2352,73 @@ def run_task(task_id: int) -> None:
 
         add_detail(f"准备抓取网站：{website.url}")
         LOGGER.info("Running task %s on %s", task.name, website.url)
+        # One browser serves the main page and this thread's share of subpages.
+        browser_pool = BrowserPool.for_website(website)
         matched_results: list[dict[str, Any]] = []
+        # Inserted in one batch with the final commit, so failed runs leave none behind.
+        pending_results: list[dict[str, Any]] = []
         subpage_errors: list[str] = []
         subpage_snapshots: list[dict[str, str | None]] = []
         snapshot_payload: str | None = None
 
+        def record_page_matches(
+            pages: list[dict[str, Any]],
+            label: str,
+            score_summary: bool = False,
+        ) -> None:
+            if not pages:
+                return
+            ensure_not_cancelled()
+            watch_contents = list(task.watch_contents)
+            page_scores = score_contents_batch(
+                [(page["title"], page["summary"] if score_summary else page["title"]) for page in pages],
+                watch_contents,
+                content_vectors=load_content_vectors(session, watch_contents),
+            )
+            for page, scores in zip(pages, page_scores):
+                ensure_not_cancelled()
+                matches = [
+                    (content, score)
+                    for content, score in scores
+                    if score >= SIMILARITY_THRESHOLD
+                ]
+                if not matches:
+                    continue
+                matched_contents = ", ".join(
+                    f"{content.text}({score:.2f})" for content, score in matches
+                )
+                add_detail(f"{label}命中关注项：{matched_contents}", "success")
+                best_match = max(matches, key=lambda item: item[1])
+                pending_results.append(
+                    {
+                        "task_id": task.id,
+                        "website_id": website.id,
+                        "content_id": best_match[0].id,
+                        "discovered_url": page["url"],
+                        "link_title": page["title"],
+                        "content_summary": page["summary"],
+                        "similarity_score": best_match[1],
+                        "created_at": datetime.utcnow(),
+                    }
+                )
+                matched_results.append(
+                    {
+                        "title": page["title"] or page["url"],
+                        "url": page["url"],
+                        "summary": page["summary"] or "",
+                        # Plain values, so merging after the final commit needs no refresh.
+                        "matches": [
+                            (getattr(content, "id", None) or content.text, content.text, score)
+                            for content, score in matches
+                        ],
+                        "image_url": page["image_url"],
+                    }
+                )
+
         if website.is_json_api:
             ensure_not_cancelled()
             add_detail("以 JSON API 模式抓取")
+            flush_details()
             api_text, api_data = fetch_json_content(website.url, website)
             add_detail("接口响应获取成功")
             list_source: Any = api_data
@@ -1431,31 +2453,39 @@ def run_task(task_id: int) -> None:
             else:
                 add_detail("未发现新的链接")
             area_selectors = _parse_selector_config(website.content_area_selector_config)
-            for item in new_items:
+            ensure_not_cancelled()
+            flush_details()
+            fetched_pages = iter_many_html(
+                [item["url"] for item in new_items], website, cancel_event.is_set, browser_pool
+            )
+            fetched_details: list[dict[str, Any]] = []
+            for item, fetched in zip(new_items, fetched_pages):
                 ensure_not_cancelled()
                 link = item["url"]
                 add_detail(f"抓取详情页：{link}")
                 try:
                     ensure_not_cancelled()
-                    link_html_full = fetch_html(link, website)
+                    if isinstance(fetched, BaseException):
+                        raise fetched
+                    link_html_full = fetched
                     add_detail(f"详情页抓取成功：{link}")
-                    link_area_html = _extract_region_html(link_html_full, area_selectors)
+                    link_document = _SelectorDocument(link_html_full)
+                    link_area_html = _extract_region_html(link_document, area_selectors)
                     if area_selectors and link_area_html is None:
                         add_detail(f"详情页内容采集区域未匹配：{link}", "warning")
                     link_html = link_area_html or link_html_full
-                    subpage_snapshots.append(
-                        {
-                            "url": link,
-                            "html": link_html,
-                            "text": extract_body_text(link_html),
-                        }
-                    )
+                    subpage_snapshots.append({"url": link, "html": link_html})
                 except Exception:  # noqa: BLE001
                     LOGGER.exception("Failed to fetch API detail %s", link)
                     add_detail(f"详情页抓取失败：{link}", "warning")
                     subpage_errors.append(link)
                     continue
-                page_title, summary = summarize_html(link_html, website)
+                link_tree = _parse_html(link_html)
+                image_url = _resolve_image_url(_first_image_src(link_tree), link)
+                page_title, summary, page_text = summarize_page(
+                    link_html, website, tree=link_tree, document=None if link_area_html else link_document
+                )
+                subpage_snapshots[-1]["text"] = page_text
                 api_title = item.get("title")
                 if website.api_title_path:
                     title = api_title if _is_non_empty_text(api_title) else page_title
@@ -1472,54 +2502,35 @@ def run_task(task_id: int) -> None:
                 else:
                     add_detail("详情页未发现标题", "warning")
                 subpage_snapshots[-1]["title"] = title
-                scores = score_contents(title, title, task.watch_contents)
-                matches = [
-                    (content, score)
-                    for content, score in scores
-                    if score >= SIMILARITY_THRESHOLD
-                ]
-                if matches:
-                    matched_contents = ", ".join(
-                        f"{content.text}({score:.2f})" for content, score in matches
-                    )
-                    add_detail(f"详情页命中关注项：{matched_contents}", "success")
-                    best_match = max(matches, key=lambda item: item[1])
-                    result = CrawlResult(
-                        task=task,
-                        website=website,
-                        content=best_match[0],
-                        discovered_url=link,
-                        link_title=title,
-                        content_summary=summary,
-                        similarity_score=best_match[1],
-                    )
-                    session.add(result)
-                    matched_results.append(
-                        {
-                            "title": title or link,
-                            "url": link,
-                            "summary": summary or "",
-                            "matches": matches,
-                            "html": link_html,
-                            "base_url": link,
-                        }
-                    )
+                fetched_details.append({"url": link, "title": title, "summary": summary, "image_url": image_url})
+            record_page_matches(fetched_details, "详情页")
             snapshot_payload = build_json_api_snapshot(api_text, items, subpage_snapshots)
         else:
-            previous_main_html, _, _, previous_main_text = parse_snapshot(website.last_snapshot)
+            previous_snapshot, previous_fingerprint = _load_snapshot(
+                website.last_snapshot, titles=False, load_blobs=False
+            )
+            previous_main_html, _, _, previous_main_text = previous_snapshot
+            fingerprint_scope = _fingerprint_scope(website)
+            if previous_fingerprint.get("fingerprint_scope") != fingerprint_scope:
+                previous_fingerprint = {}
+            previous_link_hashes = previous_fingerprint.get("link_hashes")
+            if not isinstance(previous_link_hashes, list):
+                previous_link_hashes = None
             ensure_not_cancelled()
-            new_html = fetch_html(website.url, website)
+            flush_details()
+            new_html = fetch_html(website.url, website, browser_pool)
             add_detail("主页面抓取成功")
 
             area_selectors = _parse_selector_config(website.content_area_selector_config)
             previous_effective_html = previous_main_html
-            if previous_main_html and area_selectors:
+            if previous_main_html and area_selectors and previous_link_hashes is None:
                 previous_region_html = _extract_region_html(previous_main_html, area_selectors)
                 if previous_region_html is not None:
                     previous_effective_html = previous_region_html
                 else:
                     add_detail("历史快照内容采集区域未匹配，使用整个页面", "warning")
-            effective_main_html = _extract_region_html(new_html, area_selectors)
+            main_document = _SelectorDocument(new_html)
+            effective_main_html = _extract_region_html(main_document, area_selectors)
             if effective_main_html is None:
                 effective_main_html = new_html
                 if area_selectors:
@@ -1527,8 +2538,24 @@ def run_task(task_id: int) -> None:
             elif area_selectors:
                 add_detail("已应用内容采集区域定位，仅分析匹配区域")
 
-            main_title, main_summary = summarize_html(effective_main_html, website)
-            current_main_text = extract_body_text(effective_main_html)
+            main_hash = _html_digest(effective_main_html)
+            main_unchanged = previous_fingerprint.get("main_hash") == main_hash
+            main_tree = _parse_html(effective_main_html)
+            current_links: list[str] | None = None
+            link_hashes: Iterable[int] | None = None
+            if website.fetch_subpages:
+                if main_unchanged and previous_link_hashes is not None:
+                    link_hashes = previous_link_hashes
+                else:
+                    current_links = extract_links_from_tree(main_tree, website.url)
+                    link_hashes = {_link_hash(link) for link in current_links}
+            main_image_url = _resolve_image_url(_first_image_src(main_tree), website.url)
+            main_title, main_summary, current_main_text = summarize_page(
+                effective_main_html,
+                website,
+                tree=main_tree,
+                document=main_document if effective_main_html is new_html else None,
+            )
             LOGGER.info("Task %s fetched main page title: %s", task.name, main_title or "<无标题>")
             if main_title:
                 add_detail(f"主页面标题：{main_title}")
@@ -1536,34 +2563,49 @@ def run_task(task_id: int) -> None:
                 add_detail("主页面未发现标题", "warning")
 
             if website.fetch_subpages:
-                new_links = compare_links(previous_effective_html, effective_main_html, website.url)
+                if current_links is None:
+                    new_links = []
+                else:
+                    new_links = compare_links(
+                        previous_effective_html,
+                        effective_main_html,
+                        website.url,
+                        current_links=current_links,
+                        previous_link_hashes=previous_link_hashes,
+                    )
                 LOGGER.debug("Found %d new links", len(new_links))
                 add_detail(f"发现新链接 {len(new_links)} 个")
 
-                for link in new_links:
+                ensure_not_cancelled()
+                flush_details()
+                fetched_pages = iter_many_html(new_links, website, cancel_event.is_set, browser_pool)
+                fetched_subpages: list[dict[str, Any]] = []
+                for link, fetched in zip(new_links, fetched_pages):
                     ensure_not_cancelled()
                     add_detail(f"抓取子链接：{link}")
                     try:
                         ensure_not_cancelled()
-                        link_html_full = fetch_html(link, website)
+                        if isinstance(fetched, BaseException):
+                            raise fetched
+                        link_html_full = fetched
                         add_detail(f"子链接抓取成功：{link}")
-                        link_area_html = _extract_region_html(link_html_full, area_selectors)
+                        link_document = _SelectorDocument(link_html_full)
+                        link_area_html = _extract_region_html(link_document, area_selectors)
                         if area_selectors and link_area_html is None:
                             add_detail(f"子链接内容采集区域未匹配：{link}", "warning")
                         link_html = link_area_html or link_html_full
-                        subpage_snapshots.append(
-                            {
-                                "url": link,
-                                "html": link_html,
-                                "text": extract_body_text(link_html),
-                            }
-                        )
+                        subpage_snapshots.append({"url": link, "html": link_html})
                     except Exception:  # noqa: BLE001
                         LOGGER.exception("Failed to fetch sub link %s", link)
                         add_detail(f"子链接抓取失败：{link}", "warning")
                         subpage_errors.append(link)
                         continue
-                    title, summary = summarize_html(link_html, website)
+                    link_tree = _parse_html(link_html)
+                    image_url = _resolve_image_url(_first_image_src(link_tree), link)
+                    title, summary, page_text = summarize_page(
+                        link_html, website, tree=link_tree, document=None if link_area_html else link_document
+                    )
+                    subpage_snapshots[-1]["text"] = page_text
                     LOGGER.info(
                         "Task %s fetched sub page %s title: %s",
                         task.name,
@@ -1575,81 +2617,41 @@ def run_task(task_id: int) -> None:
                     else:
                         add_detail("子链接未发现标题", "warning")
                     subpage_snapshots[-1]["title"] = title
-                    scores = score_contents(title, title, task.watch_contents)
-                    matches = [
-                        (content, score)
-                        for content, score in scores
-                        if score >= SIMILARITY_THRESHOLD
-                    ]
-                    if matches:
-                        matched_contents = ", ".join(
-                            f"{content.text}({score:.2f})" for content, score in matches
-                        )
-                        add_detail(f"子链接命中关注项：{matched_contents}", "success")
-                        best_match = max(matches, key=lambda item: item[1])
-                        result = CrawlResult(
-                            task=task,
-                            website=website,
-                            content=best_match[0],
-                            discovered_url=link,
-                            link_title=title,
-                            content_summary=summary,
-                            similarity_score=best_match[1],
-                        )
-                        session.add(result)
-                        matched_results.append(
-                            {
-                                "title": title or link,
-                                "url": link,
-                                "summary": summary or "",
-                                "matches": matches,
-                                "html": link_html,
-                                "base_url": link,
-                            }
-                        )
+                    fetched_subpages.append(
+                        {"url": link, "title": title, "summary": summary, "image_url": image_url}
+                    )
+                record_page_matches(fetched_subpages, "子链接")
             else:
-                previous_text_to_compare = previous_main_text
-                if not _is_non_empty_text(previous_text_to_compare) and isinstance(previous_main_html, str):
-                    previous_text_to_compare = extract_body_text(previous_main_html)
-                has_changed = (previous_text_to_compare or "") != current_main_text
+                if main_unchanged:
+                    has_changed = False
+                else:
+                    previous_text_to_compare = previous_main_text
+                    if not _is_non_empty_text(previous_text_to_compare) and isinstance(previous_main_html, str):
+                        previous_text_to_compare = extract_body_text(previous_main_html)
+                    has_changed = (previous_text_to_compare or "") != current_main_text
                 add_detail("检测到页面发生变化" if has_changed else "页面内容无变化")
                 if has_changed:
-                    ensure_not_cancelled()
-                    title, summary = main_title, main_summary
-                    scores = score_contents(title, summary, task.watch_contents)
-                    matches = [
-                        (content, score)
-                        for content, score in scores
-                        if score >= SIMILARITY_THRESHOLD
-                    ]
-                    if matches:
-                        matched_contents = ", ".join(
-                            f"{content.text}({score:.2f})" for content, score in matches
-                        )
-                        add_detail(f"主页面命中关注项：{matched_contents}", "success")
-                        best_match = max(matches, key=lambda item: item[1])
-                        result = CrawlResult(
-                            task=task,
-                            website=website,
-                            content=best_match[0],
-                            discovered_url=website.url,
-                            link_title=title,
-                            content_summary=summary,
-                            similarity_score=best_match[1],
-                        )
-                        session.add(result)
-                        matched_results.append(
+                    record_page_matches(
+                        [
                             {
-                                "title": title or website.url,
                                 "url": website.url,
-                                "summary": summary or "",
-                                "matches": matches,
-                                "html": effective_main_html,
-                                "base_url": website.url,
+                                "title": main_title,
+                                "summary": main_summary,
+                                "image_url": main_image_url,
                             }
-                        )
+                        ],
+                        "主页面",
+                        score_summary=True,
+                    )
 
-            snapshot_payload = build_snapshot(effective_main_html, subpage_snapshots, main_title)
+            snapshot_payload = build_snapshot(
+                effective_main_html,
+                subpage_snapshots,
+                main_title,
+                link_hashes=link_hashes,
+                fingerprint_scope=fingerprint_scope,
+                main_text=current_main_text,
+            )
 
         ensure_not_cancelled()
         if matched_results:
@@ -1658,24 +2660,23 @@ def run_task(task_id: int) -> None:
             add_detail("未发现符合条件的内容")
 
         if snapshot_payload is not None:
-            website.last_snapshot = snapshot_payload
-        website.last_fetched_at = datetime.utcnow()
-        task.last_run_at = datetime.utcnow()
+            # An identical payload needs neither the old snapshot nor a rewrite.
+            snapshot_digest = _html_digest(snapshot_payload)
+            if snapshot_digest != website.snapshot_digest:
+                website.last_snapshot = snapshot_payload
+                website.snapshot_digest = snapshot_digest
+        finished_at = datetime.utcnow()
+        website.last_fetched_at = finished_at
+        task.last_run_at = finished_at
         task.last_status = "success" if matched_results else "completed"
 
         session.add(website)
         session.add(task)
-
-        if log_entry_id is None:
-            session.flush()
-            log_entry_id = log_entry.id
-
-        log_entry = session.get(CrawlLog, log_entry_id)
-        if log_entry is None:
-            raise CrawlError("日志记录不存在")
+        if pending_results:
+            session.bulk_insert_mappings(CrawlResult, pending_results)
 
         log_entry.status = task.last_status
-        log_entry.run_finished_at = datetime.utcnow()
+        log_entry.run_finished_at = finished_at
         message_parts = [f"发现匹配结果 {len(matched_results)} 条"]
         if subpage_errors:
             message_parts.append(f"子链接抓取失败 {len(subpage_errors)} 个: {'; '.join(subpage_errors)}")
@@ -1685,59 +2686,50 @@ def run_task(task_id: int) -> None:
 
         if matched_results:
             ensure_not_cancelled()
-            merged_payload: OrderedDict[str, dict[str, Any]] = OrderedDict()
+            merged_payload: dict[str, dict[str, Any]] = {}
             for item in matched_results:
                 ensure_not_cancelled()
                 url = item["url"]
-                summary_text = (item["summary"] or "")[:200]
-                image_url = _extract_first_image_url(item.get("html"), item.get("base_url")) or ""
-                if url not in merged_payload:
-                    merged_payload[url] = {
-                        "title": item["title"] or url,
+                summary_text = item["summary"][:200]
+                entry = merged_payload.get(url)
+                if entry is None:
+                    entry = merged_payload[url] = {
+                        "title": item["title"],
                         "url": url,
                         "summary": summary_text,
-                        "pic": image_url,
-                        "matches_map": OrderedDict(),
+                        "pic": item["image_url"] or "",
+                        "scores": {},
                     }
-                entry = merged_payload[url]
-                if entry["title"] == entry["url"] and item["title"]:
-                    entry["title"] = item["title"]
-                if not entry["summary"] and summary_text:
-                    entry["summary"] = summary_text
-                if image_url and not entry["pic"]:
-                    entry["pic"] = image_url
-                matches_map: OrderedDict[Any, dict[str, Any]] = entry["matches_map"]
-                for content, score in item["matches"]:
-                    ensure_not_cancelled()
-                    identifier = getattr(content, "id", None) or content.text
-                    existing = matches_map.get(identifier)
-                    if existing is None:
-                        matches_map[identifier] = {"text": content.text, "score": score}
-                    elif score > existing["score"]:
-                        existing["score"] = score
-
-            payload_items: list[dict[str, str]] = []
-            for entry in merged_payload.values():
-                ensure_not_cancelled()
-                matches_label = "、".join(
-                    f"{value['text']}({value['score']:.2f})" for value in entry["matches_map"].values()
-                )
-                payload_items.append(
-                    {
-                        "title": entry["title"],
-                        "url": entry["url"],
-                        "summary": entry["summary"],
-                        "matches": matches_label,
-                        "pic": entry["pic"],
-                    }
-                )
+                else:
+                    if entry["title"] == url:
+                        entry["title"] = item["title"]
+                    if not entry["summary"]:
+                        entry["summary"] = summary_text
+                    if not entry["pic"]:
+                        entry["pic"] = item["image_url"] or ""
+                scores: dict[Any, tuple[str, float]] = entry["scores"]
+                for identifier, text, score in item["matches"]:
+                    best = scores.get(identifier)
+                    if best is None or score > best[1]:
+                        scores[identifier] = (text, score)
+
+            payload_items = [
+                {
+                    "title": entry["title"],
+                    "url": entry["url"],
+                    "summary": entry["summary"],
+                    "matches": "、".join(f"{text}({score:.2f})" for text, score in entry["scores"].values()),
+                    "pic": entry["pic"],
+                }
+                for entry in merged_payload.values()
+            ]
             ensure_not_cancelled()
-            _send_task_notifications(session, task, payload_items, add_detail)
+            notification_items = payload_items
     except TaskCancelledError:
         session.rollback()
         LOGGER.info("Task %s cancelled by request", task_id)
 
-        if log_entry_id is None:
+        if log_entry is None or log_entry_id is None:
             log_entry = CrawlLog(task_id=task_id)
             session.add(log_entry)
             session.commit()
@@ -1745,21 +2737,15 @@ def run_task(task_id: int) -> None:
 
         add_detail("任务执行已被停止", "warning")
 
+        finished_at = datetime.utcnow()
         task = session.get(MonitorTask, task_id)
         if task:
             task.last_status = "cancelled"
-            task.last_run_at = datetime.utcnow()
+            task.last_run_at = finished_at
             session.add(task)
 
-        log_entry = session.get(CrawlLog, log_entry_id)
-        if log_entry is None:
-            log_entry = CrawlLog(task_id=task_id)
-            session.add(log_entry)
-            session.commit()
-            log_entry_id = log_entry.id
-
         log_entry.status = "cancelled"
-        log_entry.run_finished_at = datetime.utcnow()
+        log_entry.run_finished_at = finished_at
         log_entry.message = "任务被手动终止"
         session.add(log_entry)
         session.commit()
@@ -1767,7 +2753,7 @@ def run_task(task_id: int) -> None:
         session.rollback()
         LOGGER.exception("Task %s failed", task_id)
 
-        if log_entry_id is None:
+        if log_entry is None or log_entry_id is None:
             log_entry = CrawlLog(task_id=task_id)
             session.add(log_entry)
             session.commit()
@@ -1776,24 +2762,30 @@ def run_task(task_id: int) -> None:
         add_detail("任务执行失败，已回滚未完成操作", "error")
         add_detail(f"错误信息：{exc}", "error")
 
+        finished_at = datetime.utcnow()
         task = session.get(MonitorTask, task_id)
         if task:
             task.last_status = "failed"
-            task.last_run_at = datetime.utcnow()
+            task.last_run_at = finished_at
             session.add(task)
 
-        log_entry = session.get(CrawlLog, log_entry_id)
-        if log_entry is None:
-            log_entry = CrawlLog(task_id=task_id)
-            session.add(log_entry)
-            session.commit()
-            log_entry_id = log_entry.id
-
         log_entry.status = "failed"
-        log_entry.run_finished_at = datetime.utcnow()
+        log_entry.run_finished_at = finished_at
         log_entry.message = str(exc)
         session.add(log_entry)
         session.commit()
     finally:
+        try:
+            flush_details()
+        except Exception:  # noqa: BLE001
+            LOGGER.exception("Failed to write log details for task %s", task_id)
+            session.rollback()
+        if notification_items is not None and log_entry_id is not None:
+            # Queued only once the run's own details are written, so the
+            # notification details follow them in the log.
+            _queue_task_notifications(task_id, log_entry_id, notification_items)
+        if browser_pool is not None:
+            browser_pool.close()
         session.close()
+        session.expire_on_commit = True
         _unregister_running_task(task_id)
@@ -2,7 +2,7 @@ from __future__ import annotations
 
 import os
 
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import scoped_session, sessionmaker, declarative_base
 
 
@@ -22,10 +22,73 @@ engine = create_engine(
     connect_args={"check_same_thread": False},
     pool_pre_ping=True,
 )
+
+# WAL lets the web UI keep reading while a task commits; with WAL, NORMAL sync
+# only fsyncs at checkpoints and still keeps the database consistent on crash.
+_SQLITE_PRAGMAS = (
+    "journal_mode=WAL",
+    "synchronous=NORMAL",
+    "temp_store=MEMORY",
+    "mmap_size=268435456",
+    "cache_size=-65536",
+)
+
+
+@event.listens_for(engine, "connect")
+def _apply_sqlite_pragmas(dbapi_connection, connection_record) -> None:  # noqa: ANN001
+    if engine.dialect.name != "sqlite":
+        return
+    cursor = dbapi_connection.cursor()
+    try:
+        for pragma in _SQLITE_PRAGMAS:
+            cursor.execute(f"PRAGMA {pragma}")
+    finally:
+        cursor.close()
+
+
 SessionLocal = scoped_session(sessionmaker(bind=engine, autoflush=False, autocommit=False))
 Base = declarative_base()
 
 
+# Columns added after their table was first released, as ``{table: {column: DDL type}}``.
+# ``init_db`` adds whichever of them an existing database is missing.
+ADDED_COLUMNS: dict[str, dict[str, str]] = {
+    "websites": {
+        "title_selector_config": "TEXT",
+        "content_selector_config": "TEXT",
+        "content_area_selector_config": "TEXT",
+        "is_json_api": "BOOLEAN DEFAULT 0",
+        "api_list_path": "TEXT",
+        "api_title_path": "TEXT",
+        "api_url_path": "TEXT",
+        "api_url_template": "TEXT",
+        "api_detail_url_base": "TEXT",
+        "use_proxy": "BOOLEAN DEFAULT 0",
+        "proxy_request_interval": "INTEGER DEFAULT 0",
+        "proxy_user_agent": "VARCHAR(255)",
+        "snapshot_digest": "VARCHAR(64)",
+    },
+    "notification_logs": {
+        "payload": "TEXT",
+    },
+}
+
+
+def _compress_legacy_snapshots(connection) -> None:  # noqa: ANN001
+    """Rewrite snapshots stored as plain TEXT as ``CompressedText`` bytes."""
+
+    from models import compress_bytes
+
+    rows = connection.exec_driver_sql(
+        "SELECT id, last_snapshot FROM websites WHERE typeof(last_snapshot) = 'text'"
+    ).fetchall()
+    if rows:
+        connection.exec_driver_sql(
+            "UPDATE websites SET last_snapshot = ? WHERE id = ?",
+            [(compress_bytes(snapshot.encode("utf-8")), website_id) for website_id, snapshot in rows],
+        )
+
+
 def init_db() -> None:
     """Create database tables."""
     import models  # noqa: F401
@@ -33,38 +96,14 @@ def init_db() -> None:
     Base.metadata.create_all(bind=engine)
 
     with engine.begin() as connection:
-        existing_columns = {
-            row[1]
-            for row in connection.exec_driver_sql("PRAGMA table_info(websites)").fetchall()
-        }
-
-        website_alter_statements = {
-            "title_selector_config": "ALTER TABLE websites ADD COLUMN title_selector_config TEXT",
-            "content_selector_config": "ALTER TABLE websites ADD COLUMN content_selector_config TEXT",
-            "content_area_selector_config": "ALTER TABLE websites ADD COLUMN content_area_selector_config TEXT",
-            "is_json_api": "ALTER TABLE websites ADD COLUMN is_json_api BOOLEAN DEFAULT 0",
-            "api_list_path": "ALTER TABLE websites ADD COLUMN api_list_path TEXT",
-            "api_title_path": "ALTER TABLE websites ADD COLUMN api_title_path TEXT",
-            "api_url_path": "ALTER TABLE websites ADD COLUMN api_url_path TEXT",
-            "api_url_template": "ALTER TABLE websites ADD COLUMN api_url_template TEXT",
-            "api_detail_url_base": "ALTER TABLE websites ADD COLUMN api_detail_url_base TEXT",
-            "use_proxy": "ALTER TABLE websites ADD COLUMN use_proxy BOOLEAN DEFAULT 0",
-            "proxy_request_interval": "ALTER TABLE websites ADD COLUMN proxy_request_interval INTEGER DEFAULT 0",
-            "proxy_user_agent": "ALTER TABLE websites ADD COLUMN proxy_user_agent VARCHAR(255)",
-        }
-
-        for column_name, statement in website_alter_statements.items():
-            if column_name not in existing_columns:
-                connection.exec_driver_sql(statement)
-
-        notification_columns = {
-            row[1]
-            for row in connection.exec_driver_sql("PRAGMA table_info(notification_logs)").fetchall()
-        }
-        if "payload" not in notification_columns:
-            connection.exec_driver_sql(
-                "ALTER TABLE notification_logs ADD COLUMN payload TEXT"
-            )
+        for table, columns in ADDED_COLUMNS.items():
+            existing_columns = {
+                row[1] for row in connection.exec_driver_sql(f"PRAGMA table_info({table})").fetchall()
+            }
+            for column_name, column_type in columns.items():
+                if column_name not in existing_columns:
+                    connection.exec_driver_sql(f"ALTER TABLE {table} ADD COLUMN {column_name} {column_type}")
+        _compress_legacy_snapshots(connection)
 
     from models import ProxyEndpoint
 
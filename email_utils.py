@@ -1,11 +1,16 @@
 from __future__ import annotations
 
+import atexit
+import hashlib
 import os
 import smtplib
+import threading
+import time
 from dataclasses import dataclass, replace
 import logging
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
+from email.policy import compat32
 from typing import Any, Iterable
 
 import requests
@@ -14,9 +19,11 @@ from ssl import create_default_context
 
 from database import SessionLocal
 from models import NotificationSetting
+from query_cache import NOTIFICATION_SETTINGS_REGION, FromCache
 
 
 LOGGER = logging.getLogger(__name__)
+_SMTP_POLICY = compat32.clone(linesep="\r\n")
 
 
 class NotificationConfigError(RuntimeError):
@@ -73,6 +80,7 @@ def _load_email_settings() -> EmailSettings:
         setting = (
             session.query(NotificationSetting)
             .filter(NotificationSetting.channel == "email")
+            .options(FromCache(NOTIFICATION_SETTINGS_REGION, "email"))
             .one_or_none()
         )
     finally:
@@ -136,6 +144,7 @@ def _get_dingtalk_webhook() -> str:
         setting = (
             session.query(NotificationSetting)
             .filter(NotificationSetting.channel == "dingtalk")
+            .options(FromCache(NOTIFICATION_SETTINGS_REGION, "dingtalk"))
             .one_or_none()
         )
     finally:
@@ -185,45 +194,176 @@ def send_email(
     LOGGER.info("Email sent successfully: %s", subject)
 
 
-def _deliver_email(
-    settings: EmailSettings,
-    recipient_list: list[str],
-    message: MIMEMultipart,
-) -> None:
+def _smtp_error(name: str) -> type[BaseException]:
+    return getattr(smtplib, name, getattr(smtplib, "SMTPException", Exception))
+
+
+def _close_quietly(server: Any) -> None:
+    try:
+        server.quit()
+    except Exception:  # noqa: BLE001 - the connection is being dropped anyway
+        try:
+            server.close()
+        except Exception:  # noqa: BLE001
+            pass
+
+
+@dataclass
+class _PooledConnection:
+    server: Any
+    sent: int = 0
+    idle_since: float = 0.0
+
+
+class _SmtpPool:
+    """Keep authenticated SMTP connections for the next notification.
+
+    A connection is lent to one sender at a time and checked with ``NOOP``
+    before reuse. Idle connections are dropped after ``max_idle`` seconds and
+    any connection is retired after ``max_messages`` messages.
+    """
+
+    def __init__(self, max_idle: float = 60.0, max_messages: int = 100) -> None:
+        self.max_idle = max_idle
+        self.max_messages = max_messages
+        self._lock = threading.Lock()
+        self._idle: dict[tuple[Any, ...], list[_PooledConnection]] = {}
+
+    def acquire(self, key: tuple[Any, ...]) -> _PooledConnection | None:
+        while True:
+            with self._lock:
+                connections = self._idle.get(key)
+                if not connections:
+                    return None
+                connection = connections.pop()
+            if time.monotonic() - connection.idle_since > self.max_idle:
+                _close_quietly(connection.server)
+                continue
+            try:
+                healthy = connection.server.noop()[0] == 250
+            except Exception:  # noqa: BLE001
+                healthy = False
+            if healthy:
+                return connection
+            _close_quietly(connection.server)
+
+    def release(self, key: tuple[Any, ...], connection: _PooledConnection) -> None:
+        if connection.sent >= self.max_messages:
+            _close_quietly(connection.server)
+            return
+        connection.idle_since = time.monotonic()
+        with self._lock:
+            self._idle.setdefault(key, []).append(connection)
+
+    def close_all(self) -> None:
+        with self._lock:
+            connections = [connection for pooled in self._idle.values() for connection in pooled]
+            self._idle.clear()
+        for connection in connections:
+            _close_quietly(connection.server)
+
+
+_SMTP_POOL = _SmtpPool()
+atexit.register(_SMTP_POOL.close_all)
+
+
+def close_smtp_connections() -> None:
+    """Close pooled SMTP connections, e.g. after the SMTP settings changed."""
+
+    _SMTP_POOL.close_all()
+
+
+def _connect_smtp(settings: EmailSettings) -> Any:
+    """Open, secure and log in a new SMTP connection for ``settings``."""
+
     smtp_client_cls = smtplib.SMTP_SSL if settings.use_ssl else smtplib.SMTP
     smtp_kwargs: dict[str, Any] = {"timeout": 30}
     if settings.use_ssl:
         smtp_kwargs["context"] = create_default_context()
 
-    smtp_disconnected_exc = getattr(
-        smtplib,
-        "SMTPServerDisconnected",
-        getattr(smtplib, "SMTPException", Exception),
-    )
+    try:
+        server = smtp_client_cls(settings.host, settings.port, **smtp_kwargs)
+    except TypeError:
+        LOGGER.debug(
+            "SMTP client %s does not accept optional kwargs, retrying without",
+            smtp_client_cls,
+        )
+        server = smtp_client_cls(settings.host, settings.port)
 
     try:
-        try:
-            smtp_connection = smtp_client_cls(settings.host, settings.port, **smtp_kwargs)
-        except TypeError:
-            LOGGER.debug(
-                "SMTP client %s does not accept optional kwargs, retrying without",
-                smtp_client_cls,
-            )
-            smtp_connection = smtp_client_cls(settings.host, settings.port)
-
-        with smtp_connection as server:
+        server.ehlo()
+        if settings.use_tls:
+            try:
+                server.starttls(context=create_default_context())
+            except TypeError:
+                LOGGER.debug(
+                    "SMTP server.starttls does not accept context argument, retrying without",
+                )
+                server.starttls()
             server.ehlo()
-            if settings.use_tls:
-                try:
-                    server.starttls(context=create_default_context())
-                except TypeError:
-                    LOGGER.debug(
-                        "SMTP server.starttls does not accept context argument, retrying without",
-                    )
-                    server.starttls()
-                server.ehlo()
-            server.login(settings.username, settings.password)
-            server.sendmail(settings.sender, recipient_list, message.as_string())
+        server.login(settings.username, settings.password)
+    except BaseException:
+        _close_quietly(server)
+        raise
+    return server
+
+
+def _send_on(
+    key: tuple[Any, ...],
+    connection: _PooledConnection,
+    sender: str,
+    recipient_list: list[str],
+    message_bytes: bytes,
+) -> None:
+    rejected_exc = (_smtp_error("SMTPResponseException"), _smtp_error("SMTPRecipientsRefused"))
+    try:
+        connection.server.sendmail(sender, recipient_list, message_bytes)
+    except _smtp_error("SMTPServerDisconnected"):
+        _close_quietly(connection.server)
+        raise
+    except rejected_exc:
+        # The server refused this message only; RSET clears the transaction so
+        # the session can carry the next one.
+        try:
+            connection.server.rset()
+        except Exception:  # noqa: BLE001
+            _close_quietly(connection.server)
+        else:
+            _SMTP_POOL.release(key, connection)
+        raise
+    except BaseException:
+        _close_quietly(connection.server)
+        raise
+    connection.sent += 1
+    _SMTP_POOL.release(key, connection)
+
+
+def _deliver_email(
+    settings: EmailSettings,
+    recipient_list: list[str],
+    message: MIMEMultipart,
+) -> None:
+    smtp_disconnected_exc = _smtp_error("SMTPServerDisconnected")
+    # Serialised once with SMTP line endings, so sendmail sends the bytes as-is
+    # for the first try, a reconnect and the SSL fallback alike.
+    message_bytes = message.as_bytes(policy=_SMTP_POLICY)
+    # Connections are pooled per account and transport; a connection that fell
+    # back to implicit SSL is kept under the configured key it now serves. The
+    # password digest keeps sessions logged in with old credentials out of use.
+    password_digest = hashlib.sha256(settings.password.encode("utf-8")).hexdigest()
+    key = (settings.host, settings.port, settings.username, password_digest, settings.use_ssl, settings.use_tls)
+
+    connection = _SMTP_POOL.acquire(key)
+    if connection is not None:
+        try:
+            _send_on(key, connection, settings.sender, recipient_list, message_bytes)
+            return
+        except smtp_disconnected_exc:
+            LOGGER.info("Pooled SMTP connection to %s:%s was closed, reconnecting", settings.host, settings.port)
+
+    try:
+        connection = _PooledConnection(_connect_smtp(settings))
+        _send_on(key, connection, settings.sender, recipient_list, message_bytes)
     except smtp_disconnected_exc as exc:
         LOGGER.warning(
             "SMTP connection closed unexpectedly when using ssl=%s starttls=%s: %s",
@@ -239,30 +379,10 @@ def _deliver_email(
             fallback_settings.host,
             fallback_settings.port,
         )
-        fallback_kwargs: dict[str, Any] = {"timeout": 30, "context": create_default_context()}
-        try:
-            fallback_connection = smtplib.SMTP_SSL(
-                fallback_settings.host,
-                fallback_settings.port,
-                **fallback_kwargs,
-            )
-        except TypeError:
-            LOGGER.debug(
-                "SMTP_SSL does not accept optional kwargs, retrying without extra parameters",
-            )
-            fallback_connection = smtplib.SMTP_SSL(
-                fallback_settings.host,
-                fallback_settings.port,
-            )
-
-        with fallback_connection as server:
-            server.ehlo()
-            server.login(fallback_settings.username, fallback_settings.password)
-            server.sendmail(
-                fallback_settings.sender,
-                recipient_list,
-                message.as_string(),
-            )
+        connection = _PooledConnection(_connect_smtp(fallback_settings))
+        _send_on(key, connection, fallback_settings.sender, recipient_list, message_bytes)
+
+
 def send_dingtalk_message(payload: dict[str, Any]) -> str:
     webhook_url = _get_dingtalk_webhook()
     LOGGER.info("Sending DingTalk message to %s", webhook_url)
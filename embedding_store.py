@@ -0,0 +1,113 @@
+"""Persistent cache of watch-content embeddings shared across task runs."""
+from __future__ import annotations
+
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Iterable
+
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+import nlp
+from models import WatchContent, WatchContentEmbedding
+
+LOGGER = logging.getLogger(__name__)
+
+__all__ = ["load_content_vectors"]
+
+# Vectors depend only on the model and the text, so recent ones are also kept
+# in memory and repeated runs skip the database round trip.
+_MEMORY_CACHE_SIZE = 1024
+_MEMORY_CACHE: OrderedDict[tuple[str, str], Any] = OrderedDict()
+_MEMORY_CACHE_LOCK = threading.Lock()
+
+
+def _text_hash(text: str) -> str:
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+def _cached_vector(key: tuple[str, str]) -> Any | None:
+    with _MEMORY_CACHE_LOCK:
+        vector = _MEMORY_CACHE.get(key)
+        if vector is not None:
+            _MEMORY_CACHE.move_to_end(key)
+        return vector
+
+
+def _remember_vector(key: tuple[str, str], vector: Any) -> None:
+    with _MEMORY_CACHE_LOCK:
+        _MEMORY_CACHE[key] = vector
+        _MEMORY_CACHE.move_to_end(key)
+        while len(_MEMORY_CACHE) > _MEMORY_CACHE_SIZE:
+            _MEMORY_CACHE.popitem(last=False)
+
+
+def _stack(vectors: list[Any]) -> Any | None:
+    if len({vector.shape[0] for vector in vectors}) != 1:
+        return None
+    return nlp.np.vstack(vectors)
+
+
+def load_content_vectors(session: Session, contents: Iterable[WatchContent]) -> Any | None:
+    """Return an ``(M, d)`` float32 matrix of normalized embeddings for ``contents``.
+
+    Stored vectors are reused while the content text and model are unchanged;
+    missing or stale rows are encoded in one batch and written back. Returns
+    ``None`` when the embedding model is unavailable.
+    """
+
+    contents = list(contents)
+    if not contents or nlp.np is None or nlp.get_model() is None:
+        return None
+
+    np = nlp.np
+    keys = [(nlp.MODEL_NAME, _text_hash(content.text)) for content in contents]
+    vectors: list[Any] = [_cached_vector(key) for key in keys]
+    missing = [index for index, vector in enumerate(vectors) if vector is None]
+    if not missing:
+        return _stack(vectors)
+
+    store = Session(bind=session.get_bind())
+    try:
+        rows = {
+            row.content_id: row
+            for row in store.query(WatchContentEmbedding).filter(
+                WatchContentEmbedding.content_id.in_([contents[index].id for index in missing])
+            )
+        }
+        stale: list[int] = []
+        for index in missing:
+            row = rows.get(contents[index].id)
+            if row is not None and row.model_name == nlp.MODEL_NAME and row.text_hash == keys[index][1]:
+                vectors[index] = np.frombuffer(row.vector, dtype=np.float32)
+                _remember_vector(keys[index], vectors[index])
+            else:
+                stale.append(index)
+
+        if stale:
+            encoded = nlp.encode_texts([contents[index].text for index in stale])
+            if encoded is None:
+                return None
+            for index, vector in zip(stale, encoded):
+                content = contents[index]
+                vectors[index] = vector
+                _remember_vector(keys[index], vector)
+                row = rows.get(content.id)
+                if row is None:
+                    row = WatchContentEmbedding(content_id=content.id)
+                    store.add(row)
+                row.model_name = nlp.MODEL_NAME
+                row.text_hash = keys[index][1]
+                row.dimensions = int(vector.shape[0])
+                row.vector = vector.astype(np.float32).tobytes()
+            try:
+                store.commit()
+            except SQLAlchemyError:
+                store.rollback()
+                LOGGER.warning("保存关注内容向量失败，下次运行时将重新计算", exc_info=True)
+
+        return _stack(vectors)
+    finally:
+        store.close()
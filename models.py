@@ -1,7 +1,8 @@
 from __future__ import annotations
 
+import zlib
 from datetime import datetime
-from typing import List
+from typing import Any, List
 
 from sqlalchemy import (
     Boolean,
@@ -10,15 +11,65 @@ from sqlalchemy import (
     Float,
     ForeignKey,
     Integer,
+    LargeBinary,
     String,
     Table,
     Text,
+    TypeDecorator,
     UniqueConstraint,
 )
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from database import Base
 
+try:  # noqa: SIM105
+    import zstandard  # type: ignore import-not-found
+except ImportError:  # pragma: no cover - optional dependency
+    zstandard = None  # type: ignore[assignment]
+
+_ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+
+
+def compress_bytes(data: bytes) -> bytes:
+    """Compress ``data`` with zstd when available and zlib otherwise."""
+
+    if zstandard is not None:
+        return zstandard.ZstdCompressor(level=3).compress(data)
+    return zlib.compress(data, 6)
+
+
+def decompress_bytes(data: bytes) -> bytes:
+    """Reverse :func:`compress_bytes`, detecting the codec from the frame."""
+
+    if data.startswith(_ZSTD_MAGIC):
+        if zstandard is None:
+            raise RuntimeError("快照使用 zstd 压缩，需要安装 zstandard 才能读取")
+        return zstandard.ZstdDecompressor().decompress(data)
+    return zlib.decompress(data)
+
+
+class CompressedText(TypeDecorator):
+    """Text column stored as compressed UTF-8 bytes in a binary column.
+
+    Values are compressed with zstd when ``zstandard`` is installed and with
+    zlib otherwise. ``init_db`` compresses rows written as plain TEXT before
+    compression was introduced; a string that is still read back is returned
+    unchanged.
+    """
+
+    impl = LargeBinary
+    cache_ok = True
+
+    def process_bind_param(self, value: Any, dialect: Any) -> Any:
+        if value is None:
+            return None
+        return compress_bytes(value.encode("utf-8"))
+
+    def process_result_value(self, value: Any, dialect: Any) -> Any:
+        if value is None or isinstance(value, str):
+            return value
+        return decompress_bytes(bytes(value)).decode("utf-8")
+
 
 monitor_task_contents = Table(
     "monitor_task_contents",
@@ -37,7 +88,8 @@ class Website(Base):
     fetch_subpages: Mapped[bool] = mapped_column(Boolean, default=False)
     interval_minutes: Mapped[int] = mapped_column(Integer, default=60)
     last_fetched_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
-    last_snapshot: Mapped[str | None] = mapped_column(Text, nullable=True)
+    last_snapshot: Mapped[str | None] = mapped_column(CompressedText, nullable=True)
+    snapshot_digest: Mapped[str | None] = mapped_column(String(64), nullable=True)
     use_proxy: Mapped[bool] = mapped_column(Boolean, default=False)
     proxy_request_interval: Mapped[int] = mapped_column(Integer, default=0)
     proxy_user_agent: Mapped[str | None] = mapped_column(String(255), nullable=True)
@@ -87,6 +139,30 @@ class WatchContent(Base):
         secondary=monitor_task_contents,
         back_populates="watch_contents",
     )
+    embedding: Mapped["WatchContentEmbedding | None"] = relationship(
+        "WatchContentEmbedding",
+        back_populates="content",
+        cascade="all, delete-orphan",
+        uselist=False,
+    )
+
+
+class WatchContentEmbedding(Base):
+    __tablename__ = "watch_content_embeddings"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    content_id: Mapped[int] = mapped_column(
+        ForeignKey("watch_contents.id"), nullable=False, unique=True
+    )
+    model_name: Mapped[str] = mapped_column(String(100), nullable=False)
+    text_hash: Mapped[str] = mapped_column(String(40), nullable=False)
+    dimensions: Mapped[int] = mapped_column(Integer, nullable=False)
+    vector: Mapped[bytes] = mapped_column(LargeBinary, nullable=False)
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime, default=datetime.utcnow, onupdate=datetime.utcnow
+    )
+
+    content: Mapped[WatchContent] = relationship("WatchContent", back_populates="embedding")
 
 
 class MonitorTask(Base):
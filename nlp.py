@@ -3,7 +3,7 @@ from __future__ import annotations
 import logging
 from difflib import SequenceMatcher
 from functools import lru_cache
-from typing import Iterable
+from typing import Iterable, Sequence
 
 try:
     import numpy as np
@@ -18,6 +18,10 @@ except ImportError:  # pragma: no cover - optional dependency
 
 LOGGER = logging.getLogger(__name__)
 _FALLBACK_NOTICE_EMITTED = False
+MODEL_NAME = "all-MiniLM-L6-v2"
+# The embedding model truncates its input at 256 word pieces; longer text
+# only costs tokenizer time, so encoded queries are capped with some slack.
+SIMILARITY_TEXT_LIMIT = 512
 
 
 @lru_cache(maxsize=1)
@@ -26,7 +30,7 @@ def get_model() -> SentenceTransformer | None:
 
     if SentenceTransformer is None:
         return None
-    return SentenceTransformer("all-MiniLM-L6-v2")
+    return SentenceTransformer(MODEL_NAME)
 
 
 def cosine_similarity(vec_a: "np.ndarray", vec_b: "np.ndarray") -> float:
@@ -36,26 +40,85 @@ def cosine_similarity(vec_a: "np.ndarray", vec_b: "np.ndarray") -> float:
     return float(np.dot(vec_a, vec_b) / denom)
 
 
-def similarity(text: str, candidates: Iterable[str]) -> list[float]:
+def _emit_fallback_notice() -> None:
+    global _FALLBACK_NOTICE_EMITTED
+    if not _FALLBACK_NOTICE_EMITTED:
+        LOGGER.warning(
+            "sentence-transformers not available; falling back to basic text similarity."
+        )
+        _FALLBACK_NOTICE_EMITTED = True
+
+
+def _encoder_text(text: str) -> str:
+    """Return the whitespace-normalized prefix of ``text`` worth embedding."""
+
+    return " ".join(text[:SIMILARITY_TEXT_LIMIT].split())
+
+
+def encode_texts(texts: Sequence[str]) -> "np.ndarray | None":
+    """Return L2-normalized float32 embeddings, or ``None`` without a model."""
+
     model = get_model()
-    if not candidates:
-        return []
+    if model is None or np is None:
+        return None
+    embeddings = model.encode(
+        list(texts),
+        batch_size=32,
+        convert_to_numpy=True,
+        normalize_embeddings=True,
+    )
+    return np.asarray(embeddings, dtype=np.float32)
+
 
+def similarity_matrix(
+    texts: Sequence[str],
+    candidates: Sequence[str],
+    candidate_vectors: "np.ndarray | None" = None,
+) -> list[list[float]]:
+    """Score every text against every candidate with a single encoder pass.
+
+    Returns one row of candidate scores per text. ``candidate_vectors`` may
+    hold precomputed normalized embeddings of ``candidates`` (one row each),
+    in which case only ``texts`` are encoded.
+    """
+
+    texts = list(texts)
+    candidates = list(candidates)
+    if not texts or not candidates:
+        return [[] for _ in texts]
+
+    model = get_model()
     if model is None or np is None:
-        global _FALLBACK_NOTICE_EMITTED
-        if not _FALLBACK_NOTICE_EMITTED:
-            LOGGER.warning(
-                "sentence-transformers not available; falling back to basic text similarity."
-            )
-            _FALLBACK_NOTICE_EMITTED = True
-
-        baseline = text.lower()
-        return [SequenceMatcher(None, baseline, candidate.lower()).ratio() for candidate in candidates]
-
-    sentences = [text, *candidates]
-    embeddings = model.encode(sentences, convert_to_numpy=True, normalize_embeddings=False)
-    base_vec = embeddings[0]
-    scores: list[float] = []
-    for idx in range(1, len(embeddings)):
-        scores.append(cosine_similarity(base_vec, embeddings[idx]))
-    return scores
+        _emit_fallback_notice()
+        lowered_texts = [text.lower() for text in texts]
+        text_chars = [set(text) for text in lowered_texts]
+        # SequenceMatcher indexes its second sequence, so build one matcher per
+        # candidate and only swap the texts in. Pairs without a shared
+        # character have no matching block and score 0 without a match run.
+        columns = []
+        for candidate in candidates:
+            lowered = candidate.lower()
+            matcher = SequenceMatcher(None, b=lowered)
+            candidate_chars = set(lowered)
+            column = []
+            for text, chars in zip(lowered_texts, text_chars):
+                if (text or lowered) and candidate_chars.isdisjoint(chars):
+                    column.append(0.0)
+                    continue
+                matcher.set_seq1(text)
+                column.append(matcher.ratio())
+            columns.append(column)
+        return [list(row) for row in zip(*columns)]
+
+    texts = [_encoder_text(text) for text in texts]
+    if candidate_vectors is not None and len(candidate_vectors) == len(candidates):
+        query_vectors = encode_texts(texts)
+        return (query_vectors @ candidate_vectors.T).tolist()
+
+    embeddings = encode_texts([*texts, *candidates])
+    scores = embeddings[: len(texts)] @ embeddings[len(texts) :].T
+    return scores.tolist()
+
+
+def similarity(text: str, candidates: Iterable[str]) -> list[float]:
+    return similarity_matrix([text], list(candidates))[0]
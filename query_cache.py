@@ -0,0 +1,97 @@
+"""In-process second-level cache for rarely changing lookup queries."""
+from __future__ import annotations
+
+import logging
+import threading
+from typing import Any
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session, loading
+from sqlalchemy.orm.interfaces import UserDefinedOption
+
+from database import SessionLocal
+
+LOGGER = logging.getLogger(__name__)
+
+__all__ = ["FromCache", "QueryCache", "query_cache"]
+
+WEBSITES_REGION = "websites"
+CONTENT_CATEGORIES_REGION = "content_categories"
+NOTIFICATION_SETTINGS_REGION = "notification_settings"
+
+
+class FromCache(UserDefinedOption):
+    """Query option that serves the statement result from a cache region."""
+
+    propagate_to_loaders = False
+
+    def __init__(self, region: str, key: str) -> None:
+        super().__init__()
+        self.region = region
+        self.key = key
+
+
+class QueryCache:
+    """Cache frozen ORM results per region and merge them into callers' sessions.
+
+    Results are loaded through a dedicated short-lived session so that the
+    cached instances stay detached and are never mutated by request handlers;
+    every hit is merged into the caller's session with ``load=False`` which does
+    not emit any SQL.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._regions: dict[str, dict[str, Any]] = {}
+
+    def listen_on_session(self, session_factory: Any) -> None:
+        event.listen(session_factory, "do_orm_execute", self._do_orm_execute)
+
+    def _do_orm_execute(self, orm_context: Any) -> Any:
+        for option in orm_context.user_defined_options:
+            if isinstance(option, FromCache):
+                frozen_result = self._get_or_load(orm_context, option)
+                return loading.merge_frozen_result(
+                    orm_context.session,
+                    orm_context.statement,
+                    frozen_result,
+                    load=False,
+                )()
+        return None
+
+    def _get_or_load(self, orm_context: Any, option: FromCache) -> Any:
+        with self._lock:
+            cached = self._regions.get(option.region, {}).get(option.key)
+        if cached is not None:
+            return cached
+
+        loader = Session(bind=orm_context.session.get_bind())
+        try:
+            frozen_result = loader.execute(
+                orm_context.statement,
+                orm_context.parameters,
+            ).freeze()
+        finally:
+            loader.close()
+
+        with self._lock:
+            self._regions.setdefault(option.region, {})[option.key] = frozen_result
+        return frozen_result
+
+    def invalidate(self, region: str) -> None:
+        """Drop every cached result stored in ``region``."""
+
+        with self._lock:
+            removed = self._regions.pop(region, None)
+        if removed:
+            LOGGER.debug("已清除缓存区域 %s 中的 %d 条缓存", region, len(removed))
+
+    def clear(self) -> None:
+        """Drop every cached result in all regions."""
+
+        with self._lock:
+            self._regions.clear()
+
+
+query_cache = QueryCache()
+query_cache.listen_on_session(SessionLocal.session_factory)
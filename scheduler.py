@@ -8,9 +8,12 @@ from datetime import datetime, timedelta
 from database import SessionLocal
 from models import MonitorTask
 from sqlalchemy.orm import selectinload
-from crawler import run_task
+from crawler import run_task, sweep_snapshot_blobs
 
 LOGGER = logging.getLogger(__name__)
+# Full blob-store sweeps reclaim bodies that updated snapshots no longer use
+# and those left by runs that never committed.
+BLOB_SWEEP_INTERVAL = 24 * 60 * 60
 
 
 class MonitorScheduler:
@@ -18,6 +21,7 @@ class MonitorScheduler:
         self.poll_interval = poll_interval
         self._stop_event = threading.Event()
         self._thread: threading.Thread | None = None
+        self._last_blob_sweep: float | None = None
 
     def start(self) -> None:
         if self._thread and self._thread.is_alive():
@@ -64,3 +68,18 @@ class MonitorScheduler:
         for task_id in scheduled_task_ids:
             LOGGER.info("Scheduling task %s", task_id)
             run_task(task_id)
+
+        self._sweep_blobs_if_due()
+
+    def _sweep_blobs_if_due(self) -> None:
+        now = time.monotonic()
+        if self._last_blob_sweep is not None and now - self._last_blob_sweep < BLOB_SWEEP_INTERVAL:
+            return
+        self._last_blob_sweep = now
+        session = SessionLocal()
+        try:
+            removed = sweep_snapshot_blobs(session)
+        finally:
+            session.close()
+        if removed:
+            LOGGER.info("Removed %d unreferenced snapshot blobs", removed)
@@ -0,0 +1,22 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+import pytest
+
+import blob_store
+from database import engine
+
+
+@pytest.fixture(autouse=True)
+def _isolated_blob_store(tmp_path, monkeypatch):
+    monkeypatch.setattr(blob_store, "BLOB_DIR", tmp_path / "snapshot_blobs")
+
+
+@pytest.fixture(autouse=True)
+def _fresh_sqlite_files():
+    # Test cases unlink data.db themselves; a WAL left beside it would be
+    # replayed into the next freshly created database.
+    engine.dispose()
+    for suffix in ("", "-wal", "-shm"):
+        Path(f"data.db{suffix}").unlink(missing_ok=True)
@@ -62,5 +62,72 @@ class EnsureSetupTestCase(unittest.TestCase):
         self.assertEqual(marker.count, 1)
 
 
+class InitDbMigrationTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        from database import engine
+
+        self.engine = engine
+        self.db_path = Path("data.db")
+        engine.dispose()
+        if self.db_path.exists():
+            self.db_path.unlink()
+
+    def tearDown(self) -> None:
+        from database import Base
+
+        self.engine.dispose()
+        Base.metadata.drop_all(bind=self.engine)
+        if self.db_path.exists():
+            self.db_path.unlink()
+
+    def test_missing_columns_are_added_to_legacy_tables(self) -> None:
+        from database import ADDED_COLUMNS, init_db
+
+        with self.engine.begin() as connection:
+            connection.exec_driver_sql(
+                "CREATE TABLE websites (id INTEGER PRIMARY KEY, name VARCHAR(255) NOT NULL, url VARCHAR(1024) NOT NULL, "
+                "fetch_subpages BOOLEAN, interval_minutes INTEGER, last_fetched_at DATETIME, last_snapshot TEXT)"
+            )
+
+        init_db()
+        init_db()
+
+        with self.engine.connect() as connection:
+            for table, columns in ADDED_COLUMNS.items():
+                existing = {row[1] for row in connection.exec_driver_sql(f"PRAGMA table_info({table})")}
+                self.assertLessEqual(set(columns), existing)
+
+    def test_legacy_text_snapshots_are_compressed(self) -> None:
+        from database import SessionLocal, init_db
+        from models import Website
+
+        with self.engine.begin() as connection:
+            connection.exec_driver_sql(
+                "CREATE TABLE websites (id INTEGER PRIMARY KEY, name VARCHAR(255) NOT NULL, url VARCHAR(1024) NOT NULL, "
+                "fetch_subpages BOOLEAN, interval_minutes INTEGER, last_fetched_at DATETIME, last_snapshot TEXT)"
+            )
+            connection.exec_driver_sql(
+                "INSERT INTO websites (id, name, url, last_snapshot) VALUES (1, '示例', 'https://example.com', ?)",
+                ('{"main_html": "<p>旧版快照</p>"}',),
+            )
+
+        init_db()
+
+        with self.engine.connect() as connection:
+            self.assertEqual(
+                connection.exec_driver_sql("SELECT typeof(last_snapshot) FROM websites").scalar(), "blob"
+            )
+        session = SessionLocal()
+        try:
+            self.assertEqual(session.get(Website, 1).last_snapshot, '{"main_html": "<p>旧版快照</p>"}')
+        finally:
+            SessionLocal.remove()
+
+    def test_connections_use_wal_journal(self) -> None:
+        with self.engine.connect() as connection:
+            self.assertEqual(connection.exec_driver_sql("PRAGMA journal_mode").scalar(), "wal")
+            self.assertEqual(connection.exec_driver_sql("PRAGMA synchronous").scalar(), 1)
+
+
 if __name__ == "__main__":  # pragma: no cover
     unittest.main()
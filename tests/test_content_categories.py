@@ -4,6 +4,7 @@ from pathlib import Path
 from database import Base, SessionLocal, engine
 import app
 from models import ContentCategory, WatchContent
+from query_cache import query_cache
 
 
 class ContentCategoryRoutesTestCase(unittest.TestCase):
@@ -13,6 +14,7 @@ class ContentCategoryRoutesTestCase(unittest.TestCase):
         if self.db_path.exists():
             self.db_path.unlink()
         Base.metadata.create_all(bind=engine)
+        query_cache.clear()
         self.original_setup_flag = app._setup_complete
         app._setup_complete = True
         app.app.testing = True
@@ -1,9 +1,18 @@
+import smtplib
 from types import SimpleNamespace
 
+import pytest
+
 import email_utils
 from email_utils import EmailSettings, _resolve_transport_options, send_email
 
 
+@pytest.fixture(autouse=True)
+def _empty_smtp_pool():
+    yield
+    email_utils._SMTP_POOL.close_all()
+
+
 def test_resolve_transport_options_uses_ssl_for_port_465():
     use_tls, use_ssl = _resolve_transport_options(465, encryption_enabled=True, ssl_override=None)
     assert not use_tls
@@ -142,3 +151,131 @@ def test_send_email_uses_starttls(monkeypatch):
     assert tracker["login"] == ("user", "secret")
     assert tracker["sendmail"]["sender"] == "no-reply@example.com"
     assert tracker["sendmail"]["recipients"] == ["alice@example.com"]
+
+
+class _PoolServer:
+    def __init__(self, log: list[str], host: str, port: int) -> None:
+        self.log = log
+        self.noop_status = 250
+        self.refuse: set[str] = set()
+        self.messages: list[bytes] = []
+        log.append("connect")
+
+    def ehlo(self):
+        pass
+
+    def starttls(self):
+        pass
+
+    def login(self, username: str, password: str):
+        self.log.append("login")
+
+    def noop(self):
+        self.log.append("noop")
+        return self.noop_status, b"OK"
+
+    def sendmail(self, sender: str, recipients, message: bytes):
+        self.log.append("sendmail")
+        self.messages.append(message)
+        refused = {recipient: (550, b"no such user") for recipient in recipients if recipient in self.refuse}
+        if refused:
+            raise smtplib.SMTPRecipientsRefused(refused)
+
+    def rset(self):
+        self.log.append("rset")
+
+    def quit(self):
+        self.log.append("quit")
+
+
+def _pool_settings(monkeypatch) -> tuple[list[str], list[_PoolServer]]:
+    log: list[str] = []
+    servers: list[_PoolServer] = []
+
+    def _connect(host: str, port: int):
+        servers.append(_PoolServer(log, host, port))
+        return servers[-1]
+
+    monkeypatch.setattr(
+        email_utils,
+        "smtplib",
+        SimpleNamespace(
+            SMTP=_connect,
+            SMTP_SSL=_connect,
+            SMTPException=smtplib.SMTPException,
+            SMTPServerDisconnected=smtplib.SMTPServerDisconnected,
+            SMTPResponseException=smtplib.SMTPResponseException,
+            SMTPRecipientsRefused=smtplib.SMTPRecipientsRefused,
+        ),
+    )
+    monkeypatch.setattr(
+        email_utils,
+        "_load_email_settings",
+        lambda: EmailSettings("smtp.example.com", 587, "user", "secret", True, "no-reply@example.com"),
+    )
+    return log, servers
+
+
+def test_send_email_reuses_the_authenticated_connection(monkeypatch):
+    log, _ = _pool_settings(monkeypatch)
+
+    send_email("First", ["alice@example.com"], "<p>1</p>")
+    send_email("Second", ["bob@example.com"], "<p>2</p>")
+
+    assert log == ["connect", "login", "sendmail", "noop", "sendmail"]
+    email_utils._SMTP_POOL.close_all()
+    assert log[-1] == "quit"
+
+
+def test_send_email_reconnects_when_pooled_connection_is_stale(monkeypatch):
+    log, servers = _pool_settings(monkeypatch)
+    send_email("First", ["alice@example.com"], "<p>1</p>")
+    servers[0].noop_status = 421
+    send_email("Second", ["alice@example.com"], "<p>2</p>")
+    assert len(servers) == 2
+
+    monkeypatch.setattr(email_utils._SMTP_POOL, "max_idle", -1.0)
+    send_email("Third", ["alice@example.com"], "<p>3</p>")
+    assert len(servers) == 3
+    assert log.count("quit") == 2
+
+
+def test_changed_password_does_not_reuse_the_old_login(monkeypatch):
+    log, servers = _pool_settings(monkeypatch)
+    send_email("First", ["alice@example.com"], "<p>1</p>")
+
+    monkeypatch.setattr(
+        email_utils,
+        "_load_email_settings",
+        lambda: EmailSettings("smtp.example.com", 587, "user", "changed", True, "no-reply@example.com"),
+    )
+    send_email("Second", ["alice@example.com"], "<p>2</p>")
+
+    assert len(servers) == 2
+    assert log.count("login") == 2
+    email_utils.close_smtp_connections()
+    assert log.count("quit") == 2
+
+
+def test_refused_message_resets_and_keeps_the_connection(monkeypatch):
+    log, servers = _pool_settings(monkeypatch)
+    send_email("First", ["alice@example.com"], "<p>1</p>")
+    servers[0].refuse.add("nobody@example.com")
+
+    with pytest.raises(smtplib.SMTPRecipientsRefused):
+        send_email("Second", ["nobody@example.com"], "<p>2</p>")
+    send_email("Third", ["alice@example.com"], "<p>3</p>")
+
+    assert len(servers) == 1
+    assert log[-4:] == ["sendmail", "rset", "noop", "sendmail"]
+
+
+def test_message_is_serialised_once_with_crlf_line_endings(monkeypatch):
+    _, servers = _pool_settings(monkeypatch)
+    send_email("监控任务 有新内容", ["alice@example.com"], "<p>正文</p>\n<p>第二行</p>", "正文\n第二行")
+
+    message = servers[0].messages[0]
+    assert isinstance(message, bytes)
+    assert b"\r\n" in message
+    assert b"\n" not in message.replace(b"\r\n", b"")
+    assert b"Subject: =?utf-8?" in message
@@ -0,0 +1,95 @@
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import embedding_store
+import nlp
+from database import Base, SessionLocal, engine
+from embedding_store import load_content_vectors
+from models import ContentCategory, WatchContent, WatchContentEmbedding
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - optional dependency
+    np = None  # type: ignore[assignment]
+
+
+class _FakeModel:
+    def __init__(self) -> None:
+        self.batches: list[list[str]] = []
+
+    def encode(self, sentences, **kwargs):  # noqa: ANN001, ANN003
+        self.batches.append(list(sentences))
+        vectors = np.array([[len(text), 1.0, 0.0] for text in sentences], dtype=np.float32)
+        return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+@unittest.skipIf(np is None, "numpy is not installed")
+class WatchContentEmbeddingStoreTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        self.db_path = Path("data.db")
+        engine.dispose()
+        if self.db_path.exists():
+            self.db_path.unlink()
+        Base.metadata.create_all(bind=engine)
+        self.model = _FakeModel()
+        embedding_store._MEMORY_CACHE.clear()
+        self.addCleanup(embedding_store._MEMORY_CACHE.clear)
+        patcher = mock.patch.object(nlp, "get_model", return_value=self.model)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self) -> None:
+        SessionLocal.remove()
+        engine.dispose()
+        Base.metadata.drop_all(bind=engine)
+        if self.db_path.exists():
+            self.db_path.unlink()
+
+    def test_vectors_are_persisted_and_recomputed_only_on_text_change(self) -> None:
+        session = SessionLocal()
+        category = ContentCategory(name="政策")
+        first = WatchContent(text="补贴", category=category)
+        second = WatchContent(text="创新发展", category=category)
+        session.add_all([category, first, second])
+        session.commit()
+
+        matrix = load_content_vectors(session, [first, second])
+        self.assertEqual(matrix.shape, (2, 3))
+        self.assertEqual(self.model.batches, [["补贴", "创新发展"]])
+        self.assertEqual(session.query(WatchContentEmbedding).count(), 2)
+
+        self.model.batches.clear()
+        again = load_content_vectors(session, [first, second])
+        np.testing.assert_allclose(again, matrix)
+        self.assertEqual(self.model.batches, [])
+
+        second.text = "科技创新发展"
+        session.commit()
+        load_content_vectors(session, [first, second])
+        self.assertEqual(self.model.batches, [["科技创新发展"]])
+
+        scores = nlp.similarity_matrix(["补贴"], ["补贴", "科技创新发展"], candidate_vectors=again)
+        self.assertAlmostEqual(scores[0][0], 1.0, places=5)
+        self.assertEqual(self.model.batches[-1], ["补贴"])
+
+    def test_recent_vectors_are_served_from_memory(self) -> None:
+        session = SessionLocal()
+        content = WatchContent(text="补贴", category=ContentCategory(name="政策"))
+        session.add(content)
+        session.commit()
+        matrix = load_content_vectors(session, [content])
+
+        session.query(WatchContentEmbedding).delete()
+        session.commit()
+        with mock.patch.object(embedding_store, "Session", side_effect=AssertionError("不应访问数据库")):
+            np.testing.assert_allclose(load_content_vectors(session, [content]), matrix)
+        self.assertEqual(self.model.batches, [["补贴"]])
+
+    def test_returns_none_without_model(self) -> None:
+        with mock.patch.object(nlp, "get_model", return_value=None):
+            self.assertIsNone(load_content_vectors(SessionLocal(), [WatchContent(text="补贴")]))
+
+
+if __name__ == "__main__":  # pragma: no cover
+    unittest.main()
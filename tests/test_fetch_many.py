@@ -0,0 +1,166 @@
+from __future__ import annotations
+
+import io
+import threading
+import time
+
+import pytest
+import requests
+
+import crawler
+from crawler import CrawlError, TaskCancelledError, fetch_many_html
+
+
+def test_fetch_many_html_keeps_order_and_errors(monkeypatch) -> None:
+    active = 0
+    peak = 0
+    lock = threading.Lock()
+
+    def _fake_fetch(self, url):  # noqa: ANN001
+        nonlocal active, peak
+        with lock:
+            active += 1
+            peak = max(peak, active)
+        time.sleep(0.05)
+        with lock:
+            active -= 1
+        if url.endswith("bad"):
+            raise CrawlError("失败")
+        return f"<html>{url}</html>"
+
+    monkeypatch.setattr(crawler.BrowserPool, "fetch", _fake_fetch)
+    urls = [f"https://example.com/{index}" for index in range(5)] + ["https://example.com/bad"]
+
+    results = fetch_many_html(urls)
+
+    assert results[:5] == [f"<html>{url}</html>" for url in urls[:5]]
+    assert isinstance(results[5], CrawlError)
+    assert peak > 1
+
+
+def test_fetch_many_html_stops_when_cancelled(monkeypatch) -> None:
+    monkeypatch.setattr(crawler.BrowserPool, "fetch", lambda self, url: "<html></html>")
+
+    results = fetch_many_html(["https://example.com/a"], should_stop=lambda: True)
+
+    assert isinstance(results[0], TaskCancelledError)
+    assert fetch_many_html([]) == []
+
+
+def test_browser_pool_is_reused_per_worker(monkeypatch) -> None:
+    pools: list[int] = []
+    original_init = crawler.BrowserPool.__init__
+
+    def _tracking_init(self, *args, **kwargs):  # noqa: ANN001
+        original_init(self, *args, **kwargs)
+        pools.append(id(self))
+
+    monkeypatch.setattr(crawler.BrowserPool, "__init__", _tracking_init)
+    monkeypatch.setattr(crawler.BrowserPool, "fetch", lambda self, url: url)
+    monkeypatch.setattr(crawler, "SUBPAGE_FETCH_CONCURRENCY", 2)
+
+    urls = [f"https://example.com/{index}" for index in range(6)]
+    assert fetch_many_html(urls) == urls
+    assert len(pools) == 2
+
+
+def test_callers_pool_is_used_on_the_calling_thread(monkeypatch) -> None:
+    calls: list[tuple[object, int]] = []
+
+    def _fake_fetch(self, url):  # noqa: ANN001
+        calls.append((self, threading.get_ident()))
+        time.sleep(0.01)
+        return url
+
+    monkeypatch.setattr(crawler.BrowserPool, "fetch", _fake_fetch)
+    monkeypatch.setattr(crawler, "SUBPAGE_FETCH_CONCURRENCY", 2)
+    shared = crawler.BrowserPool.for_website(None)
+    urls = [f"https://example.com/{index}" for index in range(6)]
+
+    assert fetch_many_html(urls, pool=shared) == urls
+    assert {ident for pool, ident in calls if pool is shared} == {threading.get_ident()}
+    assert len({id(pool) for pool, _ in calls}) == 2
+
+
+def _response(body: bytes, content_type: str) -> requests.Response:
+    response = requests.Response()
+    response.status_code = 200
+    response.headers["Content-Type"] = content_type
+    response.encoding = requests.utils.get_encoding_from_headers(response.headers)
+    response.raw = io.BytesIO(body)
+    return response
+
+
+def test_requests_fetch_streams_and_honours_meta_charset(monkeypatch) -> None:
+    html = '<html><head><meta charset="gbk"></head><body>关于补贴的通知</body></html>'
+    response = _response(html.encode("gbk"), "text/html")
+    monkeypatch.setattr(crawler._http_session(), "get", lambda *args, **kwargs: response)
+    monkeypatch.setattr(crawler, "get_profile_headers", lambda url: {})
+
+    assert crawler._fetch_html_with_requests("https://example.com/", use_proxy=False) == html
+
+
+def test_requests_fetch_prefers_header_encoding() -> None:
+    body = "<html><body>政策</body></html>".encode("utf-8")
+    assert crawler._read_response_text(_response(body, "text/html; charset=utf-8")) == body.decode("utf-8")
+
+
+def test_http_session_is_reused_per_thread_without_cookies() -> None:
+    session = crawler._http_session()
+    assert crawler._http_session() is session
+
+    other: list[requests.Session] = []
+    thread = threading.Thread(target=lambda: other.append(crawler._http_session()))
+    thread.start()
+    thread.join()
+    assert other[0] is not session
+
+    assert session.cookies.get_policy().allowed_domains() == ()
+
+
+def test_requests_fetch_detects_undeclared_encoding() -> None:
+    body = ("<html><body>" + "关于补贴发放的政策通知" * 5 + "</body></html>").encode("gbk")
+    assert "关于补贴发放的政策通知" in crawler._read_response_text(_response(body, "text/html"))
+
+
+def test_iter_many_html_yields_before_later_pages_finish(monkeypatch) -> None:
+    release = threading.Event()
+
+    def _fake_fetch(self, url):  # noqa: ANN001
+        if url.endswith("slow"):
+            assert release.wait(5)
+        return url
+
+    monkeypatch.setattr(crawler.BrowserPool, "fetch", _fake_fetch)
+    monkeypatch.setattr(crawler, "SUBPAGE_FETCH_CONCURRENCY", 2)
+    pages = crawler.iter_many_html(["https://example.com/fast", "https://example.com/slow"])
+
+    assert next(pages) == "https://example.com/fast"
+    release.set()
+    assert list(pages) == ["https://example.com/slow"]
+
+
+def test_small_error_bodies_are_drained_to_keep_the_connection() -> None:
+    small = _response(b"forbidden", "text/html")
+    small.headers["Content-Length"] = "9"
+    crawler._discard_response(small)
+    assert not small.raw.closed
+
+    unknown = _response(b"forbidden", "text/html")
+    crawler._discard_response(unknown)
+    assert unknown.raw.closed
+
+
+def test_oversized_bodies_are_abandoned(monkeypatch) -> None:
+    monkeypatch.setattr(crawler, "MAX_RESPONSE_BYTES", 100)
+    declared = _response(b"<p>x</p>", "text/html")
+    declared.headers["Content-Length"] = "101"
+    with pytest.raises(CrawlError):
+        crawler._read_response_text(declared)
+    assert declared.raw.closed
+
+    streamed = _response(b"x" * 101, "text/html")
+    with pytest.raises(CrawlError):
+        crawler._read_response_text(streamed)
+    assert streamed.raw.closed
+    assert crawler._read_response_text(_response(b"x" * 100, "text/html")) == "x" * 100
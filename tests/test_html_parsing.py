@@ -0,0 +1,186 @@
+from __future__ import annotations
+
+import pytest
+
+import crawler
+
+PAGE = """
+<html>
+  <head>
+    <title> Page Title </title>
+    <meta property="og:title" content="OG Title">
+  </head>
+  <body>
+    <div class="Top-Menu"><a href="/menu">栏目</a></div>
+    <nav><a href="/nav">导航</a></nav>
+    <div role="navigation">快速入口</div>
+    <script>var ignored = 1;</script>
+    <h2>  </h2>
+    <h3>关于 <b>补贴</b> 的通知</h3>
+    <p>第一段内容。</p>
+    <a href="detail/1.html">详情</a>
+    <a href="">空链接</a>
+    <a>无链接</a>
+  </body>
+</html>
+"""
+
+
+@pytest.fixture(params=["lexbor", "beautifulsoup"])
+def parser_backend(request, monkeypatch):
+    if request.param == "lexbor":
+        if crawler.LexborHTMLParser is None:
+            pytest.skip("selectolax 未安装")
+    else:
+        monkeypatch.setattr(crawler, "LexborHTMLParser", None)
+    return request.param
+
+
+def test_extract_links_resolves_non_empty_hrefs(parser_backend) -> None:
+    links = crawler.extract_links(PAGE, "https://example.com/list/")
+    assert links == [
+        "https://example.com/menu",
+        "https://example.com/nav",
+        "https://example.com/list/detail/1.html",
+    ]
+
+
+def test_extract_links_fallback_only_builds_anchor_tags(monkeypatch) -> None:
+    monkeypatch.setattr(crawler, "LexborHTMLParser", None)
+    soups = []
+    make_soup = crawler._make_soup
+
+    def _recording_make_soup(html, parse_only=None):  # noqa: ANN001
+        soups.append(make_soup(html, parse_only))
+        return soups[-1]
+
+    monkeypatch.setattr(crawler, "_make_soup", _recording_make_soup)
+    crawler.extract_links(PAGE, "https://example.com/list/")
+    assert {tag.name for tag in soups[0].find_all(True)} == {"a"}
+
+
+def test_extract_links_fast_paths_match_urljoin_and_skip_non_pages(parser_backend) -> None:
+    html = """
+    <a href="https://other.org/a">绝对</a>
+    <a href="//cdn.example.com/b">协议相对</a>
+    <a href="/c?x=1">根相对</a>
+    <a href="/a/../d">点段</a>
+    <a href="../e">上级</a>
+    <a href="#top">锚点</a>
+    <a href="JavaScript:void(0)">脚本</a>
+    <a href="mailto:a@example.com">邮件</a>
+    <a href="tel:+86-10-12345678">电话</a>
+    <a href=" data:text/html,hi">数据</a>
+    <a href="/c?x=1">重复</a>
+    """
+    assert crawler.extract_links(html, "https://example.com/list/index.html") == [
+        "https://other.org/a",
+        "https://cdn.example.com/b",
+        "https://example.com/c?x=1",
+        "https://example.com/d",
+        "https://example.com/e",
+    ]
+
+
+def test_url_resolver_matches_urljoin_for_relative_hrefs() -> None:
+    hrefs = ["a.html", "detail/1.html", "a?x=1", "a#f", "a/./b", "a/../b", "../a", "?q", "#t", "foo:bar", "a//b", "中文.html"]
+    for base_url in ["https://example.com", "https://example.com/list/", "https://example.com/list/index.html?x=1"]:
+        resolve = crawler._url_resolver(base_url)
+        assert [resolve(href) for href in hrefs] == [crawler.urljoin(base_url, href) for href in hrefs]
+
+
+def test_url_resolver_matches_urljoin_for_hrefs_it_rewrites() -> None:
+    hrefs = [
+        "./a.html", "./", "../", "../../a?x=1", "a/b/../c", "?", "#", "?#f", "a?", "a#", "a?#f", "/c?", "/#",
+        "a;p", "/a;p?q", "a\tb.html", "/a\nb", "//", "///a", "//?x", "https://", "https:///a", "https://?x",
+        "HTTPS://Example.COM/A", "https://Example.COM/a/../b", "https://Example.COM/a?", "//CDN.Example.com/b#",
+        "http://Example.COM/a", "Https://example.com/a", "a", "=", "b/c.html", "/d",
+    ]
+    bases = [
+        "https://Example.com", "https://example.com/list/", "http://example.com/a/b?x=1",
+        "https://a.com//x/y", "https://a.com/./x/../y", "https://a.com/x/.", "https://a.com/x/..",
+    ]
+    for base_url in bases:
+        resolve = crawler._url_resolver(base_url)
+        assert [resolve(href) for href in hrefs] == [crawler.urljoin(base_url, href) for href in hrefs]
+
+
+def test_extract_body_text_strips_navigation(parser_backend) -> None:
+    assert crawler.extract_body_text(PAGE) == "关于 补贴 的通知 第一段内容。 详情 空链接 无链接"
+
+
+def test_extract_body_text_drops_nested_boilerplate_once(parser_backend) -> None:
+    html = """
+    <body>
+      <div id="MainNav"><ul class="menu-list"><li class="breadcrumb">首页</li></ul></div>
+      <div class="Pagination-Bar">上一页</div>
+      <div role="contentinfo">版权</div>
+      <p>正文</p>
+    </body>
+    """
+    assert crawler.extract_body_text(html) == "正文"
+
+
+def _display_title(html: str) -> str:
+    tree = crawler._parse_html(html)
+    if isinstance(tree, crawler.BeautifulSoup):
+        return crawler._extract_display_title(tree)
+    return crawler._extract_display_title_lexbor(tree)
+
+
+def test_display_title_prefers_first_non_empty_heading(parser_backend) -> None:
+    assert _display_title(PAGE) == "关于 补贴 的通知"
+
+
+def test_display_title_falls_back_to_meta_then_title(parser_backend) -> None:
+    meta_html = '<html><head><title>Only Title</title><meta name="twitter:title" content=" Meta "></head></html>'
+    assert _display_title(meta_html) == "Meta"
+    assert _display_title("<html><head><title> Only Title </title></head><body></body></html>") == "Only Title"
+    _, summary = crawler._summarize_without_preferences(PAGE)
+    assert summary.startswith("关于 补贴 的通知")
+
+
+def test_summarize_page_shares_one_tree_with_link_extraction(parser_backend, monkeypatch) -> None:
+    tree = crawler._parse_html(PAGE)
+    links = crawler.extract_links_from_tree(tree, "https://example.com/list/")
+    assert links == crawler.extract_links(PAGE, "https://example.com/list/")
+
+    def _fail(html):  # noqa: ANN001
+        raise AssertionError("页面不应被重复解析")
+
+    monkeypatch.setattr(crawler, "_parse_html", _fail)
+    title, summary, text = crawler.summarize_page(PAGE, tree=tree)
+    assert text == "关于 补贴 的通知 第一段内容。 详情 空链接 无链接"
+    assert summary == text
+    assert title
+
+
+def test_first_image_url_is_resolved(parser_backend) -> None:
+    html = "<html><body><p>正文</p><img src='a.png'><img src='b.png'></body></html>"
+    assert crawler._extract_first_image_url(html, "https://example.com/x/") == "https://example.com/x/a.png"
+    assert crawler._extract_first_image_url("<p>无图片</p>", None) is None
+    assert crawler._extract_first_image_url("<img alt='无地址'>", None) is None
+    assert crawler._extract_first_image_url("<img src=' //cdn.example.com/p.png'>", "https://example.com/") == (
+        "https://cdn.example.com/p.png"
+    )
+    assert crawler._extract_first_image_url("<img src='/p.png'>", "https://example.com/x/") == "https://example.com/p.png"
+
+
+def test_display_title_ranks_candidates_in_one_pass(parser_backend) -> None:
+    html = """
+    <html><head>
+      <title>文档标题</title><title>第二个标题</title>
+      <meta name="twitter:title" content="推特标题">
+      <meta property="og:title" content="OG 标题">
+    </head><body>
+      <div role="heading">角色标题</div>
+      <h4>四级标题</h4>
+      <h2><script>ignored()</script>二级<style>p {}</style>标题</h2>
+      <h3>三级标题</h3>
+    </body></html>
+    """
+    assert _display_title(html) == "二级 标题"
+    assert _display_title(html.replace("<h2>", "<h5>").replace("</h2>", "</h5>")) == "三级标题"
+    without_headings = '<html><head><title>文档标题</title><meta name="twitter:title" content="推特标题"><meta property="og:title" content=" "></head></html>'
+    assert _display_title(without_headings) == "推特标题"
+    assert _display_title("<html><head><title>文档标题</title><title>第二个</title></head></html>") == "文档标题"
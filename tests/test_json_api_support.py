@@ -113,3 +113,15 @@ def test_collect_api_items_falls_back_to_url_when_no_title_path():
     assert warnings == []
     assert items[0]["title"] == "World"
     assert items[1]["title"] == "https://example.com/detail/4"
+
+
+def test_fetch_json_content_parses_large_numbers(monkeypatch):
+    import crawler
+
+    text = '{"data": [{"id": 123456789012345678901234567890, "title": "通知"}]}'
+    monkeypatch.setattr(crawler, "_fetch_html_with_requests", lambda url, **kwargs: text)
+
+    raw, data = crawler.fetch_json_content("https://example.com/api")
+
+    assert raw == text
+    assert data["data"][0] == {"id": 123456789012345678901234567890, "title": "通知"}
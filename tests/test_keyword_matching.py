@@ -2,7 +2,9 @@ from types import SimpleNamespace
 
 import pytest
 
-from crawler import score_contents
+import crawler
+
+from crawler import score_contents, score_contents_batch
 
 
 def _content(text: str):
@@ -30,3 +32,139 @@ def test_score_contents_falls_back_to_similarity_when_no_keyword_match(monkeypat
     assert len(scores) == 1
     assert scores[0][0] is contents[0]
     assert scores[0][1] < 1.0
+
+
+def test_score_contents_batch_embeds_all_articles_in_one_call(monkeypatch: pytest.MonkeyPatch):
+    calls = []
+
+    def _fake_matrix(texts, candidates, candidate_vectors=None):
+        calls.append((list(texts), list(candidates)))
+        return [[0.3 + 0.1 * row for _ in candidates] for row, _ in enumerate(texts)]
+
+    monkeypatch.setattr("crawler.similarity_matrix", _fake_matrix)
+    contents = [_content("补贴"), _content("创新发展")]
+    results = score_contents_batch(
+        [("关于补贴的通知", "关于补贴的通知"), ("其他公告", "其他公告"), ("第三篇", "第三篇")],
+        contents,
+    )
+
+    assert len(calls) == 1
+    assert calls[0][0] == ["关于补贴的通知", "其他公告", "第三篇"]
+    assert [score for _, score in results[0]] == [1.0, pytest.approx(0.3)]
+    assert [score for _, score in results[1]] == [pytest.approx(0.4), pytest.approx(0.4)]
+    assert [score for _, score in results[2]] == [pytest.approx(0.5), pytest.approx(0.5)]
+
+
+def test_score_contents_batch_only_scores_unmatched_contents(monkeypatch: pytest.MonkeyPatch):
+    calls = []
+
+    def _fake_matrix(texts, candidates, candidate_vectors=None):
+        calls.append(list(candidates))
+        return [[0.1 * (column + 1) for column, _ in enumerate(candidates)] for _ in texts]
+
+    monkeypatch.setattr("crawler.similarity_matrix", _fake_matrix)
+    contents = [_content("补贴"), _content("  "), _content("创新发展"), _content("税收")]
+    articles = [("关于补贴的通知", ""), ("关于补贴与税收", "")]
+
+    results = score_contents_batch(articles, contents)
+    assert calls == [["创新发展", "税收"]]
+    assert [score for _, score in results[0]] == [1.0, 0.0, pytest.approx(0.1), pytest.approx(0.2)]
+    assert [score for _, score in results[1]] == [1.0, 0.0, pytest.approx(0.1), 1.0]
+
+    score_contents_batch(articles, contents, content_vectors=object())
+    assert calls[-1] == ["补贴", "  ", "创新发展", "税收"]
+
+
+def test_similarity_matrix_fallback_matches_similarity():
+    from nlp import similarity, similarity_matrix
+
+    matrix = similarity_matrix(["abc", "xyz"], ["abd", "xyz"])
+    assert matrix[1][1] == 1.0
+    assert matrix[0] == similarity("abc", ["abd", "xyz"])
+    assert similarity_matrix([], ["a"]) == []
+
+
+def test_similarity_matrix_fallback_reuses_candidate_index():
+    from difflib import SequenceMatcher
+
+    from nlp import similarity_matrix
+
+    texts = ["关于补贴的通知", "Policy UPDATE", "", "补贴发放政策调整", "完全无关"]
+    candidates = ["补贴", "policy", "创新发展", ""]
+    expected = [[SequenceMatcher(None, text.lower(), candidate.lower()).ratio() for candidate in candidates] for text in texts]
+    assert similarity_matrix(texts, candidates) == expected
+
+
+def test_fallback_similarity_skips_pairs_without_shared_characters(monkeypatch: pytest.MonkeyPatch):
+    from difflib import SequenceMatcher
+
+    import nlp
+
+    monkeypatch.setattr(nlp, "get_model", lambda: None)
+    ratios = []
+
+    class _CountingMatcher(SequenceMatcher):
+        def ratio(self) -> float:
+            ratios.append((self.a, self.b))
+            return super().ratio()
+
+    monkeypatch.setattr(nlp, "SequenceMatcher", _CountingMatcher)
+    assert nlp.similarity_matrix(["补贴发放", "Policy"], ["补贴", "创新"]) == [[2 / 3, 0.0], [0.0, 0.0]]
+    assert ratios == [("补贴发放", "补贴")]
+
+
+def test_encoder_input_is_normalized_and_truncated(monkeypatch: pytest.MonkeyPatch):
+    np = pytest.importorskip("numpy")
+    import nlp
+
+    seen = []
+
+    class _FakeModel:
+        def encode(self, sentences, **kwargs):  # noqa: ANN001, ANN003
+            seen.extend(sentences)
+            return np.ones((len(sentences), 2), dtype=np.float32) / np.sqrt(2)
+
+    monkeypatch.setattr(nlp, "get_model", lambda: _FakeModel())
+    score_contents("标题", "  ABC   def " + "长" * 2000, [_content("无关")])
+    assert seen[0].startswith("abc def 长")
+    assert len(seen[0]) <= nlp.SIMILARITY_TEXT_LIMIT
+    assert seen[1] == "无关"
+
+
+def test_fallback_similarity_scores_the_full_summary(monkeypatch: pytest.MonkeyPatch):
+    from difflib import SequenceMatcher
+
+    import nlp
+
+    monkeypatch.setattr(nlp, "get_model", lambda: None)
+    summary = "a  " * 200 + "创新"
+    expected = SequenceMatcher(None, summary, "创新发展").ratio()
+    assert expected > 0.0
+    assert score_contents("标题", summary, [_content("创新发展")])[0][1] == expected
+    assert score_contents_batch([("标题", summary)], [_content("创新发展")])[0][0][1] == expected
+
+
+def test_keyword_patterns_are_built_once_per_content(monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr("crawler.similarity_matrix", lambda texts, candidates, candidate_vectors=None: [[0.0 for _ in candidates] for _ in texts])
+    crawler._keyword_pattern.cache_clear()
+    calls = []
+    extract = crawler._extract_keywords
+    monkeypatch.setattr(crawler, "_extract_keywords", lambda text: calls.append(text) or extract(text))
+    contents = [_content("补贴 , Policy"), _content("a.b"), _content("   ")]
+
+    results = score_contents_batch([("关于补贴", ""), ("", "new POLICY"), ("axb", "")] * 3, contents)
+
+    assert sorted(calls) == ["a.b", "补贴 , Policy"]
+    assert [[score for _, score in row] for row in results[:3]] == [[1.0, 0.0, 0.0], [1.0, 0.0, 0.0], [0.0, 0.0, 0.0]]
+
+
+def test_keyword_matcher_is_shared_across_articles():
+    crawler._keyword_matcher.cache_clear()
+    contents = [_content("补贴"), _content("创新 发展"), _content("")]
+    for title in ("补贴发放", "发展规划", "其他"):
+        crawler._keyword_scores(title, None, contents)
+
+    matcher = crawler._keyword_matcher(("补贴", "创新 发展", ""))
+    assert crawler._keyword_matcher.cache_info().misses == 1
+    assert matcher("关于创新与补贴\n") == {0, 1}
+    assert matcher("无关") == set()
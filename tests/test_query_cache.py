@@ -0,0 +1,133 @@
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from sqlalchemy import event
+
+import app
+import email_utils
+from database import Base, SessionLocal, engine
+from models import ContentCategory, NotificationSetting, WatchContent, Website
+from query_cache import query_cache
+
+
+class LookupQueryCacheTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        self.db_path = Path("data.db")
+        engine.dispose()
+        if self.db_path.exists():
+            self.db_path.unlink()
+        Base.metadata.create_all(bind=engine)
+        query_cache.clear()
+        self.statements: list[str] = []
+        event.listen(engine, "before_cursor_execute", self._record_statement)
+
+    def tearDown(self) -> None:
+        event.remove(engine, "before_cursor_execute", self._record_statement)
+        query_cache.clear()
+        SessionLocal.remove()
+        engine.dispose()
+        Base.metadata.drop_all(bind=engine)
+        if self.db_path.exists():
+            self.db_path.unlink()
+
+    def _record_statement(self, conn, cursor, statement, parameters, context, executemany) -> None:  # noqa: ANN001
+        self.statements.append(statement)
+
+    def test_website_choices_are_served_from_cache_until_invalidated(self) -> None:
+        session = SessionLocal()
+        session.add(Website(name="Example", url="https://example.com", interval_minutes=30))
+        session.commit()
+        session.close()
+        SessionLocal.remove()
+
+        session = SessionLocal()
+        first = app._load_website_choices(session)
+        SessionLocal.remove()
+        self.assertEqual([(item.name, item.interval_minutes) for item in first], [("Example", 30)])
+
+        self.statements.clear()
+        session = SessionLocal()
+        second = app._load_website_choices(session)
+        self.assertEqual([(item.name, item.interval_minutes) for item in second], [("Example", 30)])
+        self.assertEqual(list(session.identity_map.values()), [])
+        SessionLocal.remove()
+        self.assertEqual(self.statements, [])
+
+        session = SessionLocal()
+        session.add(Website(name="Second", url="https://example.org"))
+        session.commit()
+        SessionLocal.remove()
+        query_cache.invalidate("websites")
+
+        session = SessionLocal()
+        refreshed = app._load_website_choices(session)
+        SessionLocal.remove()
+        self.assertEqual(sorted(item.name for item in refreshed), ["Example", "Second"])
+
+    def test_content_categories_include_cached_contents(self) -> None:
+        session = SessionLocal()
+        category = ContentCategory(name="政策")
+        session.add(category)
+        session.add(WatchContent(text="补贴", category=category))
+        session.commit()
+        SessionLocal.remove()
+
+        session = SessionLocal()
+        app._load_content_categories(session)
+        SessionLocal.remove()
+
+        self.statements.clear()
+        session = SessionLocal()
+        categories = app._load_content_categories(session)
+        self.assertEqual([item.name for item in categories], ["政策"])
+        self.assertEqual([content.text for content in categories[0].contents], ["补贴"])
+        SessionLocal.remove()
+        self.assertEqual(self.statements, [])
+
+    def test_notification_settings_are_cached_until_saved_again(self) -> None:
+        session = SessionLocal()
+        session.add(NotificationSetting(channel="dingtalk", webhook_url="https://hook/1"))
+        session.commit()
+        SessionLocal.remove()
+
+        self.assertEqual(email_utils._get_dingtalk_webhook(), "https://hook/1")
+        self.statements.clear()
+        self.assertEqual(email_utils._get_dingtalk_webhook(), "https://hook/1")
+        self.assertEqual(self.statements, [])
+
+        original_setup_flag = app._setup_complete
+        app._setup_complete = True
+        self.addCleanup(setattr, app, "_setup_complete", original_setup_flag)
+        app.app.testing = True
+        response = app.app.test_client().post(
+            "/notifications",
+            data={"config_type": "dingtalk", "webhook_url": "https://hook/2"},
+        )
+        self.assertEqual(response.status_code, 302)
+        SessionLocal.remove()
+        self.assertEqual(email_utils._get_dingtalk_webhook(), "https://hook/2")
+
+
+    def test_saving_smtp_settings_closes_pooled_connections(self) -> None:
+        original_setup_flag = app._setup_complete
+        app._setup_complete = True
+        self.addCleanup(setattr, app, "_setup_complete", original_setup_flag)
+        app.app.testing = True
+        with mock.patch.object(app, "close_smtp_connections") as close_connections:
+            response = app.app.test_client().post(
+                "/notifications",
+                data={
+                    "config_type": "email",
+                    "smtp_host": "smtp.example.com",
+                    "smtp_port": "465",
+                    "smtp_username": "user",
+                    "smtp_password": "changed",
+                },
+            )
+        SessionLocal.remove()
+        self.assertEqual(response.status_code, 302)
+        close_connections.assert_called_once_with()
+
+if __name__ == "__main__":  # pragma: no cover
+    unittest.main()
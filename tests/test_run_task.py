@@ -0,0 +1,371 @@
+import json
+import queue
+import threading
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from sqlalchemy import event
+
+import crawler
+from database import Base, SessionLocal, engine
+from models import (
+    ContentCategory,
+    CrawlLog,
+    CrawlLogDetail,
+    CrawlResult,
+    MonitorTask,
+    NotificationLog,
+    WatchContent,
+    Website,
+)
+
+_real_send_task_notifications = crawler._send_task_notifications
+
+MAIN_PAGE = """
+<html><body>
+  <h1>通知公告</h1>
+  <a href="/notice/1.html">关于补贴的通知</a>
+  {extra}
+</body></html>
+"""
+DETAIL_PAGE = "<html><body><h1>{title}</h1><p>{title}正文。</p></body></html>"
+
+
+class RunTaskTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        self.db_path = Path("data.db")
+        engine.dispose()
+        if self.db_path.exists():
+            self.db_path.unlink()
+        Base.metadata.create_all(bind=engine)
+
+        session = SessionLocal()
+        website = Website(name="Example", url="https://example.com/", fetch_subpages=True)
+        category = ContentCategory(name="政策")
+        content = WatchContent(text="补贴", category=category)
+        task = MonitorTask(name="监控", website=website, notification_method="none")
+        task.watch_contents.append(content)
+        session.add_all([website, category, content, task])
+        session.commit()
+        self.task_id = task.id
+        self.website_id = website.id
+        SessionLocal.remove()
+
+        self.pages = {
+            "https://example.com/notice/1.html": DETAIL_PAGE.format(title="关于补贴的通知"),
+            "https://example.com/notice/2.html": DETAIL_PAGE.format(title="关于补贴发放的公告"),
+        }
+        self.main_page = MAIN_PAGE.format(extra="")
+        self.fetched: list[str] = []
+        self.checked_out: list[int] = []
+        patches = [
+            mock.patch.object(crawler, "fetch_html", side_effect=self._fetch_main),
+            mock.patch.object(crawler.BrowserPool, "fetch", autospec=True, side_effect=self._fetch_sub),
+            mock.patch.object(crawler, "_send_task_notifications"),
+        ]
+        for patcher in patches:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def tearDown(self) -> None:
+        crawler.wait_for_notifications()
+        SessionLocal.remove()
+        engine.dispose()
+        Base.metadata.drop_all(bind=engine)
+        if self.db_path.exists():
+            self.db_path.unlink()
+
+    def _fetch_main(self, url, website=None, pool=None):  # noqa: ANN001
+        self.fetched.append(url)
+        self.checked_out.append(engine.pool.checkedout())
+        return self.main_page
+
+    def _fetch_sub(self, pool, url):  # noqa: ANN001
+        self.fetched.append(url)
+        self.checked_out.append(engine.pool.checkedout())
+        return self.pages[url]
+
+    def _results(self) -> list[str]:
+        session = SessionLocal()
+        urls = [result.discovered_url for result in session.query(CrawlResult).order_by(CrawlResult.id)]
+        SessionLocal.remove()
+        return urls
+
+    def test_only_new_links_are_fetched_on_subsequent_runs(self) -> None:
+        crawler.run_task(self.task_id)
+        self.assertEqual(self._results(), ["https://example.com/notice/1.html"])
+
+        self.fetched.clear()
+        crawler.run_task(self.task_id)
+        self.assertEqual(self.fetched, ["https://example.com/"])
+
+        self.main_page = MAIN_PAGE.format(extra='<a href="/notice/2.html">关于补贴发放的公告</a>')
+        self.fetched.clear()
+        crawler.run_task(self.task_id)
+        self.assertEqual(self.fetched, ["https://example.com/", "https://example.com/notice/2.html"])
+        self.assertEqual(
+            self._results(),
+            ["https://example.com/notice/1.html", "https://example.com/notice/2.html"],
+        )
+
+        session = SessionLocal()
+        statuses = [log.status for log in session.query(CrawlLog).order_by(CrawlLog.id)]
+        snapshot = session.get(Website, self.website_id).last_snapshot
+        SessionLocal.remove()
+        self.assertEqual(statuses, ["success", "completed", "success"])
+
+        session = SessionLocal()
+        task = session.get(MonitorTask, self.task_id)
+        log = session.query(CrawlLog).order_by(CrawlLog.id.desc()).first()
+        self.assertEqual(task.last_run_at, log.run_finished_at)
+        self.assertEqual(task.last_run_at, task.website.last_fetched_at)
+        SessionLocal.remove()
+        self.assertEqual(len(crawler._load_snapshot(snapshot)[1]["link_hashes"]), 2)
+
+    def test_changed_main_page_is_diffed_against_stored_link_hashes(self) -> None:
+        crawler.run_task(self.task_id)
+
+        self.main_page = MAIN_PAGE.format(extra='<a href="/notice/2.html">关于补贴发放的公告</a>')
+        self.fetched.clear()
+        with mock.patch.object(crawler, "extract_links", side_effect=AssertionError("旧页面不应被重新解析")):
+            crawler.run_task(self.task_id)
+
+        self.assertEqual(self.fetched, ["https://example.com/", "https://example.com/notice/2.html"])
+
+    def test_identical_snapshot_is_not_rewritten(self) -> None:
+        crawler.run_task(self.task_id)
+        crawler.run_task(self.task_id)
+        rewrites: list[str] = []
+
+        def _record(target, value, oldvalue, initiator):  # noqa: ANN001
+            rewrites.append(value)
+
+        event.listen(Website.last_snapshot, "set", _record)
+        self.addCleanup(event.remove, Website.last_snapshot, "set", _record)
+        crawler.run_task(self.task_id)
+        self.assertEqual(rewrites, [])
+
+        session = SessionLocal()
+        website = session.get(Website, self.website_id)
+        self.assertEqual(website.snapshot_digest, crawler._html_digest(website.last_snapshot))
+        last_status = session.query(CrawlLog).order_by(CrawlLog.id.desc()).first().status
+        SessionLocal.remove()
+        self.assertEqual(last_status, "completed")
+
+    def test_results_are_inserted_only_with_the_final_commit(self) -> None:
+        self.main_page = MAIN_PAGE.format(extra='<a href="/notice/2.html">关于补贴发放的公告</a>')
+        with mock.patch.object(crawler, "build_snapshot", side_effect=RuntimeError("快照写入失败")):
+            crawler.run_task(self.task_id)
+        self.assertEqual(self._results(), [])
+
+        crawler.run_task(self.task_id)
+        session = SessionLocal()
+        rows = session.query(CrawlResult).order_by(CrawlResult.id).all()
+        self.assertEqual([row.content.text for row in rows], ["补贴", "补贴"])
+        self.assertTrue(all(row.task_id == self.task_id and row.created_at for row in rows))
+        SessionLocal.remove()
+
+    def test_preview_image_is_read_from_the_summary_parse(self) -> None:
+        self.pages["https://example.com/notice/1.html"] = (
+            "<html><body><h1>关于补贴的通知</h1><img src='img/a.png'><p>正文。</p></body></html>"
+        )
+        with mock.patch.object(crawler, "_extract_first_image_url", side_effect=AssertionError("不应重新解析页面")):
+            crawler.run_task(self.task_id)
+        crawler.wait_for_notifications()
+
+        payload_items = crawler._send_task_notifications.call_args.args[2]
+        self.assertEqual(payload_items[0]["pic"], "https://example.com/notice/img/a.png")
+
+    def test_notification_payload_is_merged_without_reloading_contents(self) -> None:
+        self.main_page = MAIN_PAGE.format(extra='<a href="/notice/2.html">关于补贴发放的公告</a>')
+        statements: list[str] = []
+
+        def _record(conn, cursor, statement, *args):  # noqa: ANN001, ANN002
+            statements.append(statement)
+
+        event.listen(engine, "before_cursor_execute", _record)
+        self.addCleanup(event.remove, engine, "before_cursor_execute", _record)
+        crawler.run_task(self.task_id)
+
+        crawler.wait_for_notifications()
+        final_commit = max(index for index, sql in enumerate(statements) if sql.startswith("INSERT INTO crawl_results"))
+        self.assertFalse([sql for sql in statements[final_commit:] if "FROM watch_contents" in sql])
+        payload_items = crawler._send_task_notifications.call_args.args[2]
+        self.assertEqual([item["matches"] for item in payload_items], ["补贴(1.00)", "补贴(1.00)"])
+
+    def test_log_details_are_buffered_and_written_in_order(self) -> None:
+        commits: list[int] = []
+        original_commit = crawler.SessionLocal.session_factory.class_.commit
+
+        def _counting_commit(session):  # noqa: ANN001
+            commits.append(1)
+            return original_commit(session)
+
+        with mock.patch.object(crawler.SessionLocal.session_factory.class_, "commit", _counting_commit):
+            crawler.run_task(self.task_id)
+
+        session = SessionLocal()
+        messages = [
+            detail.message
+            for detail in session.query(CrawlLogDetail).order_by(CrawlLogDetail.created_at, CrawlLogDetail.id)
+        ]
+        SessionLocal.remove()
+        self.assertTrue(messages[0].startswith("开始执行任务"))
+        self.assertIn("子链接抓取成功：https://example.com/notice/1.html", messages)
+        self.assertLess(len(commits), len(messages))
+
+    def test_failed_subpages_do_not_force_a_commit_each(self) -> None:
+        extra = "".join(f'<a href="/missing/{index}.html">缺失{index}</a>' for index in range(8))
+        self.main_page = MAIN_PAGE.format(extra=extra)
+        commits: list[int] = []
+        original_commit = crawler.SessionLocal.session_factory.class_.commit
+
+        def _counting_commit(session):  # noqa: ANN001
+            commits.append(1)
+            return original_commit(session)
+
+        with mock.patch.object(crawler.SessionLocal.session_factory.class_, "commit", _counting_commit):
+            crawler.run_task(self.task_id)
+
+        session = SessionLocal()
+        warnings = session.query(CrawlLogDetail).filter(CrawlLogDetail.level == "warning").count()
+        SessionLocal.remove()
+        self.assertEqual(warnings, 8)
+        self.assertLess(len(commits), warnings)
+
+    def test_main_page_changes_are_scored_with_cached_embeddings(self) -> None:
+        session = SessionLocal()
+        session.get(Website, self.website_id).fetch_subpages = False
+        session.commit()
+        SessionLocal.remove()
+
+        with mock.patch.object(crawler, "load_content_vectors", wraps=crawler.load_content_vectors) as loader:
+            crawler.run_task(self.task_id)
+            crawler.run_task(self.task_id)
+
+        self.assertEqual(self._results(), ["https://example.com/"])
+        self.assertEqual(loader.call_count, 1)
+
+    def test_notifications_are_sent_and_logged_off_the_crawl_thread(self) -> None:
+        session = SessionLocal()
+        task = session.get(MonitorTask, self.task_id)
+        task.notification_method = "email"
+        task.notification_email = "a@example.com, b@example.com"
+        session.commit()
+        SessionLocal.remove()
+
+        sender_threads: list[int] = []
+
+        def _send_email(**kwargs):  # noqa: ANN003
+            sender_threads.append(threading.get_ident())
+
+        with mock.patch.object(crawler, "_send_task_notifications", _real_send_task_notifications), \
+                mock.patch.object(crawler, "send_email", side_effect=_send_email) as send_email:
+            crawler.run_task(self.task_id)
+            crawler.wait_for_notifications()
+
+        session = SessionLocal()
+        logs = [(log.channel, log.status, log.target) for log in session.query(NotificationLog)]
+        SessionLocal.remove()
+        self.assertEqual(send_email.call_args.kwargs["recipients"], ["a@example.com", "b@example.com"])
+        self.assertEqual(logs, [("email", "success", "a@example.com, b@example.com")])
+        self.assertNotEqual(sender_threads, [threading.get_ident()])
+
+        session = SessionLocal()
+        messages = [
+            detail.message
+            for detail in session.query(CrawlLogDetail).order_by(CrawlLogDetail.created_at, CrawlLogDetail.id)
+        ]
+        SessionLocal.remove()
+        self.assertEqual(messages[-1], "邮件通知发送成功")
+        self.assertLess(messages.index("发现匹配结果 1 条"), messages.index("准备发送邮件通知至：a@example.com, b@example.com"))
+
+    def test_dingtalk_log_stores_the_message_that_was_sent(self) -> None:
+        session = SessionLocal()
+        session.get(MonitorTask, self.task_id).notification_method = "dingtalk"
+        session.commit()
+        SessionLocal.remove()
+
+        with mock.patch.object(crawler, "_send_task_notifications", _real_send_task_notifications), \
+                mock.patch.object(crawler, "send_dingtalk_message", return_value="https://hook") as send:
+            crawler.run_task(self.task_id)
+            crawler.wait_for_notifications()
+
+        session = SessionLocal()
+        log = session.query(NotificationLog).one()
+        SessionLocal.remove()
+        message = send.call_args.args[0]
+        self.assertEqual(message["feedCard"]["links"][0]["messageURL"], "https://example.com/notice/1.html")
+        self.assertEqual((log.status, log.target), ("success", "https://hook"))
+        self.assertEqual(json.loads(log.payload)["payload"], message)
+
+    def test_full_notification_queue_drops_instead_of_blocking(self) -> None:
+        full_queue: queue.Queue = queue.Queue(maxsize=1)
+        full_queue.put((0, 0, []))
+        alive_worker = mock.Mock(**{"is_alive.return_value": True})
+
+        with mock.patch.object(crawler, "_NOTIFICATION_QUEUE", full_queue), \
+                mock.patch.object(crawler, "_NOTIFICATION_WORKER", alive_worker), \
+                self.assertLogs(crawler.LOGGER, level="WARNING") as logs:
+            crawler._queue_task_notifications(self.task_id, 1, [{"title": "通知"}])
+
+        self.assertEqual(full_queue.qsize(), 1)
+        self.assertIn("dropping 1 notifications", logs.output[0])
+
+    def test_waiting_for_notifications_gives_up_after_timeout(self) -> None:
+        stuck_queue: queue.Queue = queue.Queue()
+        stuck_queue.put((self.task_id, 7, [{"title": "通知"}]))
+
+        with mock.patch.object(crawler, "_NOTIFICATION_QUEUE", stuck_queue), \
+                self.assertLogs(crawler.LOGGER, level="WARNING") as logs:
+            self.assertFalse(crawler.wait_for_notifications(timeout=0.05))
+
+        self.assertEqual(stuck_queue.unfinished_tasks, 0)
+        self.assertIn(f"for task {self.task_id} (log 7)", logs.output[0])
+        self.assertTrue(crawler.wait_for_notifications(timeout=0.05))
+
+    def test_no_connection_is_held_while_fetching(self) -> None:
+        self.main_page = MAIN_PAGE.format(extra='<a href="/notice/2.html">关于补贴发放的公告</a>')
+        crawler.run_task(self.task_id)
+        self.main_page = MAIN_PAGE.format(extra='<a href="/notice/3.html">关于补贴的通知</a>')
+        self.pages["https://example.com/notice/3.html"] = DETAIL_PAGE.format(title="关于补贴的通知")
+        crawler.run_task(self.task_id)
+
+        self.assertEqual(len(self.checked_out), 5)
+        self.assertEqual(set(self.checked_out), {0})
+        self.assertEqual(len(self._results()), 3)
+
+    def test_task_website_and_contents_are_loaded_with_one_query(self) -> None:
+        statements: list[tuple[bool, str]] = []
+
+        def _record(conn, cursor, statement, *args):  # noqa: ANN001, ANN002
+            if statement.startswith("SELECT"):
+                statements.append((bool(self.fetched), statement))
+
+        event.listen(engine, "before_cursor_execute", _record)
+        self.addCleanup(event.remove, engine, "before_cursor_execute", _record)
+        crawler.run_task(self.task_id)
+
+        task_loads = [sql for _, sql in statements if "FROM monitor_tasks" in sql]
+        self.assertEqual(len(task_loads), 1)
+        self.assertIn("websites", task_loads[0])
+        self.assertIn("watch_contents", task_loads[0])
+        lazy_loads = [sql for _, sql in statements if "FROM websites" in sql or "FROM watch_contents" in sql]
+        self.assertEqual(lazy_loads, [])
+        self.assertFalse([sql for fetched, sql in statements if fetched and "monitor_tasks" in sql])
+
+    def test_failed_run_finalises_its_own_log_entry(self) -> None:
+        with mock.patch.object(crawler, "fetch_html", side_effect=crawler.CrawlError("连接超时")):
+            crawler.run_task(self.task_id)
+
+        session = SessionLocal()
+        logs = session.query(CrawlLog).all()
+        levels = [detail.level for detail in logs[0].entries]
+        SessionLocal.remove()
+        self.assertEqual([(log.status, log.message) for log in logs], [("failed", "连接超时")])
+        self.assertIn("error", levels)
+
+
+if __name__ == "__main__":  # pragma: no cover
+    unittest.main()
@@ -1,8 +1,11 @@
 import unittest
 from datetime import datetime
 from pathlib import Path
+from unittest import mock
 
 import app
+import blob_store
+from crawler import build_snapshot, parse_snapshot
 from database import Base, SessionLocal, engine
 from models import Website
 
@@ -56,6 +59,26 @@ class WebsiteSnapshotRoutesTestCase(unittest.TestCase):
         self.assertIsNone(refreshed.last_snapshot)
         self.assertIsNone(refreshed.last_fetched_at)
 
+    def test_clearing_one_website_keeps_blobs_shared_with_another(self) -> None:
+        shared = [{"url": "https://example.com/notice", "html": "<p>共享通知</p>", "title": "通知"}]
+        session = SessionLocal()
+        first = Website(name="First", url="https://first.example.com", last_snapshot=build_snapshot("<p>一</p>", shared))
+        second = Website(name="Second", url="https://second.example.com", last_snapshot=build_snapshot("<p>二</p>", shared))
+        session.add_all([first, second])
+        session.commit()
+        first_id, second_id = first.id, second.id
+        session.close()
+
+        with mock.patch.object(blob_store, "BLOB_GC_GRACE_SECONDS", 0):
+            self.client.post(f"/websites/{first_id}/snapshot/clear")
+            session = SessionLocal()
+            snapshot = session.get(Website, second_id).last_snapshot
+            session.close()
+            self.assertEqual(parse_snapshot(snapshot)[1][0]["html"], "<p>共享通知</p>")
+
+            self.client.post(f"/websites/{second_id}/delete")
+        self.assertEqual(parse_snapshot(snapshot)[1], [])
+
 
 if __name__ == "__main__":  # pragma: no cover
     unittest.main()
@@ -0,0 +1,69 @@
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import models
+from database import Base, SessionLocal, engine
+from models import Website
+
+
+class CompressedSnapshotStorageTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        self.db_path = Path("data.db")
+        engine.dispose()
+        if self.db_path.exists():
+            self.db_path.unlink()
+        Base.metadata.create_all(bind=engine)
+
+    def tearDown(self) -> None:
+        SessionLocal.remove()
+        engine.dispose()
+        Base.metadata.drop_all(bind=engine)
+        if self.db_path.exists():
+            self.db_path.unlink()
+
+    def _store(self, snapshot: str) -> int:
+        session = SessionLocal()
+        website = Website(name="Example", url="https://example.com", last_snapshot=snapshot)
+        session.add(website)
+        session.commit()
+        website_id = website.id
+        SessionLocal.remove()
+        return website_id
+
+    def _load(self, website_id: int) -> str | None:
+        session = SessionLocal()
+        value = session.get(Website, website_id).last_snapshot
+        SessionLocal.remove()
+        return value
+
+    def _raw(self, website_id: int):
+        with engine.connect() as connection:
+            return connection.exec_driver_sql(
+                "SELECT last_snapshot FROM websites WHERE id = ?", (website_id,)
+            ).scalar_one()
+
+    def test_snapshot_is_compressed_on_disk(self) -> None:
+        snapshot = '{"main_html": "' + "<p>政策通知</p>" * 500 + '"}'
+        website_id = self._store(snapshot)
+
+        raw = self._raw(website_id)
+        self.assertIsInstance(raw, bytes)
+        self.assertLess(len(raw), len(snapshot.encode("utf-8")) // 5)
+        self.assertEqual(self._load(website_id), snapshot)
+
+    def test_zlib_fallback_and_legacy_text_are_readable(self) -> None:
+        with mock.patch.object(models, "zstandard", None):
+            website_id = self._store("<html>旧版快照</html>")
+            self.assertFalse(self._raw(website_id).startswith(models._ZSTD_MAGIC))
+        self.assertEqual(self._load(website_id), "<html>旧版快照</html>")
+
+        with engine.begin() as connection:
+            connection.exec_driver_sql(
+                "UPDATE websites SET last_snapshot = ? WHERE id = ?", ("{\"legacy\": true}", website_id)
+            )
+        self.assertEqual(self._load(website_id), '{"legacy": true}')
+
+
+if __name__ == "__main__":  # pragma: no cover
+    unittest.main()
@@ -4,6 +4,9 @@ import json
 
 import pytest
 
+import blob_store
+import crawler
+
 from crawler import (
     build_snapshot,
     etree,
@@ -76,6 +79,47 @@ def test_summarize_html_prefers_configured_selectors() -> None:
     assert "站点标题" not in title
 
 
+def test_title_and_content_selectors_share_one_parse(monkeypatch) -> None:
+    calls = []
+    make_soup = crawler._make_soup
+
+    def _counting_make_soup(html, parse_only=None):  # noqa: ANN001
+        calls.append(html)
+        return make_soup(html, parse_only)
+
+    monkeypatch.setattr(crawler, "_make_soup", _counting_make_soup)
+    monkeypatch.setattr(crawler, "_parse_html", lambda html: make_soup(html))
+    website = Website(
+        title_selector_config="css=h2\nxpath=//h2",
+        content_selector_config="xpath=//div[@class='body']\ncss=.body",
+    )
+    html = "<html><body><h2>标题</h2><div class='body'><p>正文</p></div></body></html>"
+
+    title, summary, _ = crawler.summarize_page(html, website)
+
+    assert (title, summary) == ("标题", "正文")
+    assert len(calls) == 1
+
+
+def test_region_and_title_selectors_share_one_parse(monkeypatch) -> None:
+    calls = []
+    make_soup = crawler._make_soup
+
+    def _counting_make_soup(html, parse_only=None):  # noqa: ANN001
+        calls.append(html)
+        return make_soup(html, parse_only)
+
+    monkeypatch.setattr(crawler, "_make_soup", _counting_make_soup)
+    monkeypatch.setattr(crawler, "_parse_html", lambda html: make_soup(html))
+    website = Website(title_selector_config="css=h2")
+    html = "<html><body><h2>标题</h2><p>正文</p></body></html>"
+    document = crawler._SelectorDocument(html)
+
+    assert _extract_region_html(document, _parse_selector_config("css=.missing")) is None
+    assert crawler.summarize_page(html, website, document=document)[0] == "标题"
+    assert len(calls) == 1
+
+
 def test_build_and_parse_snapshot_preserve_titles() -> None:
     main_html = "<html><body><h1>主标题</h1><p>内容A</p></body></html>"
     sub_html = "<html><body><h1>子标题</h1><p>内容B</p></body></html>"
@@ -102,6 +146,40 @@ def test_build_and_parse_snapshot_preserve_titles() -> None:
     assert "内容B" in (entries[0]["text"] or "")
 
 
+def test_subpage_bodies_are_kept_in_blob_store(monkeypatch) -> None:
+    sub_html = "<html><body><h1>子标题</h1><p>内容B</p></body></html>"
+    snapshot = build_snapshot(
+        "<html><body><p>主页</p></body></html>",
+        [{"url": "https://example.com/sub", "html": sub_html, "title": "子标题"}],
+    )
+
+    assert sub_html not in snapshot
+    refs = crawler.snapshot_blob_refs(snapshot)
+    assert len(refs) == 1
+
+    _, entries, _, _ = parse_snapshot(snapshot)
+    assert entries[0]["html"] == sub_html
+
+    _, deferred, _, _ = parse_snapshot(snapshot, titles=False, load_blobs=False)
+    assert deferred[0]["html"] is None
+    assert deferred[0]["text"] == entries[0]["text"]
+
+    monkeypatch.setattr(blob_store, "BLOB_GC_GRACE_SECONDS", 0)
+    assert blob_store.sweep_blobs(set(), refs) == 1
+    assert parse_snapshot(snapshot)[1] == []
+
+
+def test_blob_sweep_keeps_live_and_recently_written_blobs(monkeypatch) -> None:
+    live = blob_store.put_blob(b"live")
+    fresh = blob_store.put_blob(b"fresh")
+    assert blob_store.sweep_blobs({live}) == 0
+
+    monkeypatch.setattr(blob_store, "BLOB_GC_GRACE_SECONDS", 0)
+    assert blob_store.sweep_blobs({live}) == 1
+    assert blob_store.get_blob(live) == b"live"
+    assert blob_store.get_blob(fresh) is None
+
+
 def test_parse_snapshot_legacy_payloads_fill_missing_titles() -> None:
     main_html = "<html><body><h1>旧标题</h1><p>旧内容</p></body></html>"
     sub_html = "<html><body><h2>旧子标题</h2><p>子内容</p></body></html>"
@@ -161,3 +239,131 @@ def test_extract_region_html_supports_mixed_selectors() -> None:
     assert "news-list" in region_html
     assert "条目二" in region_html
     assert "页脚信息" not in region_html
+
+
+def test_snapshot_serialization_roundtrips_non_ascii_and_large_numbers() -> None:
+    snapshot = build_snapshot("<html><body><p>政策通知</p></body></html>", [], "标题")
+    assert "政策通知" in snapshot
+    assert json.loads(snapshot)["main_title"] == "标题"
+
+    oversized = {"value": 2**70, "text": "中文"}
+    assert json.loads(crawler._json_dumps(oversized)) == oversized
+    assert crawler._json_loads(crawler._json_dumps(oversized)) == oversized
+    assert crawler._json_loads('{"a": "\\ud800"}') == {"a": "\ud800"}
+
+
+def test_snapshot_fingerprint_detects_new_links_without_old_html() -> None:
+    old_links = ["https://example.com/a", "https://example.com/b"]
+    snapshot = build_snapshot(
+        "<a href='/a'>A</a><a href='/b'>B</a>",
+        [],
+        link_hashes={crawler._link_hash(link) for link in old_links},
+        fingerprint_scope="scope",
+    )
+
+    parsed, fingerprint = crawler._load_snapshot(snapshot)
+    assert parsed == parse_snapshot(snapshot)
+    assert fingerprint["fingerprint_scope"] == "scope"
+    assert fingerprint["main_hash"] == crawler._html_digest("<a href='/a'>A</a><a href='/b'>B</a>")
+
+    new_html = "<a href='/b'>B</a><a href='/c'>C</a><a href='/c'>C</a>"
+    assert crawler.compare_links(
+        None,
+        new_html,
+        "https://example.com/",
+        previous_link_hashes=fingerprint["link_hashes"],
+    ) == ["https://example.com/c"]
+
+
+def test_legacy_snapshot_has_empty_fingerprint() -> None:
+    assert crawler._load_snapshot("<html></html>")[1] == {}
+    assert crawler._load_snapshot(None) == ((None, [], None, None), {})
+
+
+def test_parse_snapshot_can_skip_title_derivation(monkeypatch) -> None:
+    payload = json.dumps(
+        {
+            "main_html": "<h1>主标题</h1><p>正文</p>",
+            "main_text": "主标题 正文",
+            "subpages": [{"url": "https://example.com/a", "html": "<h1>子页</h1>", "text": "子页"}],
+        },
+        ensure_ascii=False,
+    )
+
+    def _fail(*args, **kwargs):  # noqa: ANN002, ANN003
+        raise AssertionError("titles should not be derived")
+
+    monkeypatch.setattr(crawler, "summarize_page", _fail)
+    main_html, entries, main_title, main_text = parse_snapshot(payload, titles=False)
+
+    assert main_html == "<h1>主标题</h1><p>正文</p>"
+    assert main_title is None
+    assert main_text == "主标题 正文"
+    assert entries == [{"url": "https://example.com/a", "html": "<h1>子页</h1>", "title": None, "text": "子页"}]
+
+
+def test_compare_links_diffs_legacy_html_in_page_order() -> None:
+    old_html = "<a href='/a'>A</a><a href='/b'>B</a>"
+    new_html = "<a href='/d'>D</a><a href='/a'>A</a><a href='/c'>C</a><a href='/d'>D</a>"
+    assert crawler.compare_links(old_html, new_html, "https://example.com/") == [
+        "https://example.com/d",
+        "https://example.com/c",
+    ]
+    assert crawler.compare_links(None, new_html, "https://example.com/") == [
+        "https://example.com/d",
+        "https://example.com/a",
+        "https://example.com/c",
+    ]
+
+
+def test_vectorized_sentence_selection_matches_python_loop(monkeypatch) -> None:
+    pytest.importorskip("numpy")
+    text = "\n".join(
+        ["公告。"] * 5
+        + ["关于 补贴 发放 的 通知 补贴 政策 调整。", "空白", "!!!"]
+        + [f"第{index}条 补贴 说明 policy update {index}。" for index in range(20)]
+    )
+    vectorized = crawler._generate_main_idea(text, "备用")
+    monkeypatch.setattr(crawler, "np", None)
+    assert crawler._generate_main_idea(text, "备用") == vectorized
+
+
+def test_xpath_rules_are_compiled_once() -> None:
+    if etree is None:
+        pytest.skip("lxml 未安装")
+    crawler._compile_xpath.cache_clear()
+    selectors = [("xpath", "//h2[@class='t']"), ("xpath", "//h2[")]
+    html = "<html><body><h2 class='t'>标题</h2></body></html>"
+
+    for _ in range(3):
+        assert crawler._extract_text_by_selectors(html, selectors) == "标题"
+    assert crawler._compile_xpath.cache_info().misses == 1
+    assert crawler._extract_text_by_selectors(html, selectors[1:]) is None
+
+
+def test_build_snapshot_reuses_extracted_texts(monkeypatch) -> None:
+    def _fail(html):  # noqa: ANN001
+        raise AssertionError("正文不应被重复提取")
+
+    monkeypatch.setattr(crawler, "extract_body_text", _fail)
+    snapshot = build_snapshot(
+        "<p>主页</p>",
+        [{"url": "https://example.com/a", "html": "<p>子页</p>", "title": "子页", "text": "子页"}],
+        "主页",
+        main_text="主页",
+    )
+
+    main_html, entries, main_title, main_text = parse_snapshot(snapshot)
+    assert (main_html, main_title, main_text) == ("<p>主页</p>", "主页", "主页")
+    assert entries[0]["text"] == "子页"
+
+
+def test_configured_title_skips_main_idea_scoring(monkeypatch) -> None:
+    def _fail(text, fallback_title):  # noqa: ANN001
+        raise AssertionError("已配置标题时不应计算主旨")
+
+    monkeypatch.setattr(crawler, "_generate_main_idea", _fail)
+    website = Website(title_selector_config="css=h2", content_selector_config="css=.body")
+    html = "<html><body><h1>站点</h1><h2>通知标题</h2><div class='body'><p>正文内容。</p></div></body></html>"
+
+    assert crawler.summarize_page(html, website) == ("通知标题", "正文内容。", "站点 通知标题 正文内容。")
@@ -0,0 +1,93 @@
+import unittest
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import app
+from database import Base, SessionLocal, engine
+from models import CrawlLog, MonitorTask, Website
+from query_cache import query_cache
+
+
+class TaskListRowsTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        self.db_path = Path("data.db")
+        engine.dispose()
+        if self.db_path.exists():
+            self.db_path.unlink()
+        Base.metadata.create_all(bind=engine)
+        query_cache.clear()
+        self.original_setup_flag = app._setup_complete
+        self.original_render = app.render_template
+        app._setup_complete = True
+        app.app.testing = True
+        self.client = app.app.test_client()
+        self.captured: dict[str, object] = {}
+
+        def fake_render(template: str, **context: object) -> str:
+            self.captured = context
+            return ""
+
+        app.render_template = fake_render
+
+    def tearDown(self) -> None:
+        app.render_template = self.original_render
+        query_cache.clear()
+        SessionLocal.remove()
+        engine.dispose()
+        Base.metadata.drop_all(bind=engine)
+        if self.db_path.exists():
+            self.db_path.unlink()
+        app._setup_complete = self.original_setup_flag
+
+    def test_rows_use_latest_and_last_finished_logs(self) -> None:
+        started = datetime(2024, 1, 1, 8, 0, 0)
+        session = SessionLocal()
+        website = Website(name="Example", url="https://example.com", interval_minutes=60)
+        running_task = MonitorTask(name="running", website=website, created_at=started)
+        idle_task = MonitorTask(name="idle", website=website, created_at=started + timedelta(minutes=1))
+        never_task = MonitorTask(name="never", website=website, created_at=started + timedelta(minutes=2))
+        session.add_all([website, running_task, idle_task, never_task])
+        session.flush()
+        session.add_all(
+            [
+                CrawlLog(
+                    task_id=running_task.id,
+                    run_started_at=started,
+                    run_finished_at=started + timedelta(minutes=5),
+                    status="failed",
+                ),
+                CrawlLog(task_id=running_task.id, run_started_at=started + timedelta(hours=1)),
+                CrawlLog(
+                    task_id=idle_task.id,
+                    run_started_at=started,
+                    run_finished_at=started + timedelta(minutes=3),
+                    status="completed",
+                ),
+                CrawlLog(
+                    task_id=idle_task.id,
+                    run_started_at=started + timedelta(hours=2),
+                    run_finished_at=started + timedelta(hours=2, minutes=1),
+                    status="success",
+                ),
+            ]
+        )
+        session.commit()
+        session.close()
+
+        response = self.client.get("/tasks")
+        self.assertEqual(response.status_code, 200)
+
+        rows = {row["task"].name: row for row in self.captured["task_rows"]}  # type: ignore[index]
+        self.assertTrue(rows["running"]["is_running"])
+        self.assertEqual(rows["running"]["last_run_at"], started + timedelta(minutes=5))
+        self.assertEqual(rows["running"]["last_result_label"], "失败")
+        self.assertFalse(rows["idle"]["is_running"])
+        self.assertEqual(rows["idle"]["last_run_at"], started + timedelta(hours=2, minutes=1))
+        self.assertEqual(rows["idle"]["last_result_label"], "成功")
+        self.assertFalse(rows["never"]["is_running"])
+        self.assertIsNone(rows["never"]["last_run_at"])
+        self.assertEqual(rows["never"]["last_result_label"], "未执行")
+
+
+if __name__ == "__main__":  # pragma: no cover
+    unittest.main()
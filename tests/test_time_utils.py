@@ -0,0 +1,23 @@
+from datetime import datetime
+
+import pytest
+
+from time_utils import parse_iso_datetime
+
+
+def test_parse_iso_datetime_accepts_date_and_datetime_input():
+    assert parse_iso_datetime("2024-05-01") == datetime(2024, 5, 1)
+    assert parse_iso_datetime("2024-05-01T08:30") == datetime(2024, 5, 1, 8, 30)
+
+
+def test_parse_iso_datetime_caches_repeated_values():
+    parse_iso_datetime.cache_clear()
+    first = parse_iso_datetime("2024-06-01")
+    second = parse_iso_datetime("2024-06-01")
+    assert first is second
+    assert parse_iso_datetime.cache_info().hits == 1
+
+
+def test_parse_iso_datetime_rejects_malformed_input():
+    with pytest.raises(ValueError):
+        parse_iso_datetime("not-a-date")
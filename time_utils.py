@@ -2,6 +2,7 @@
 from __future__ import annotations
 
 from datetime import datetime, timedelta, timezone
+from functools import lru_cache
 from typing import Optional
 
 try:
@@ -48,3 +49,12 @@ def format_local_datetime(dt: Optional[datetime], fmt: str = "%Y-%m-%d %H:%M:%S
     if local_dt is None:
         return ""
     return local_dt.strftime(fmt)
+
+
+@lru_cache(maxsize=256)
+def parse_iso_datetime(value: str) -> datetime:
+    """Parse ``YYYY-MM-DD`` or full ISO-8601 input, caching repeated filter values.
+
+    Raises ``ValueError`` for malformed input so callers can report it.
+    """
+    return datetime.fromisoformat(value.strip())